@@ -0,0 +1,356 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import asyncio
+import ipaddress
+import itertools
+import json
+import os
+import platform
+import time
+from dataclasses import asdict, dataclass, field
+from importlib import metadata
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from pyasic.config import MinerConfig
+from pyasic.miners.factory import MinerFactory
+from pyasic.misc import open_fds, sockets
+from pyasic.network import MinerNetwork
+from pyasic.rpc.base import BaseMinerRPCAPI
+from pyasic.simulator import SIMULATORS, MinerSimulator, SimulatorBehavior
+
+CONFIG_FORMATS = [
+    "am_modern",
+    "am_old",
+    "wm",
+    "goldshell",
+    "avalon",
+    "inno",
+    "bosminer",
+    "boser",
+    "epic",
+    "auradine",
+    "mara",
+    "bitaxe",
+    "luxos",
+]
+
+
+@dataclass
+class BenchResult:
+    """The result of one benchmark.
+
+    Attributes:
+        name: The name of the benchmark.
+        ops: The number of operations run.
+        seconds: The wall time of the benchmark.
+        latencies: The time each operation took, in seconds.
+        rss: The peak resident memory in bytes while running, if available.
+        fds: The peak number of open file descriptors while running, if available.
+    """
+
+    name: str
+    ops: int
+    seconds: float
+    latencies: List[float] = field(default_factory=list, repr=False)
+    rss: Optional[int] = None
+    fds: Optional[int] = None
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds if self.seconds else 0.0
+
+    @property
+    def p50(self) -> Optional[float]:
+        return percentile(self.latencies, 0.5)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return percentile(self.latencies, 0.99)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "ops": self.ops,
+            "seconds": self.seconds,
+            "ops_per_sec": self.ops_per_sec,
+            "p50": self.p50,
+            "p99": self.p99,
+            "rss": self.rss,
+            "fds": self.fds,
+        }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def rss() -> Optional[int]:
+    """Get the resident memory of this process in bytes, or `None` if it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _Usage:
+    # samples memory and file descriptors in the background, since the peak
+    # of a concurrent benchmark is long gone once it finishes
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.rss = None
+        self.fds = None
+        self._task = None
+
+    def sample(self) -> None:
+        self.rss = _peak(self.rss, rss())
+        self.fds = _peak(self.fds, open_fds())
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "_Usage":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self._task.cancel()
+        self.sample()
+
+
+def _peak(current: Optional[int], new: Optional[int]) -> Optional[int]:
+    if new is None:
+        return current
+    return new if current is None else max(current, new)
+
+
+async def bench_async(
+    name: str,
+    func: Callable[..., Awaitable],
+    args: Iterable,
+    concurrency: int = 200,
+) -> BenchResult:
+    """Run `func` once for each item of `args`, with up to `concurrency` calls at once.
+
+    Parameters:
+        name: The name of the benchmark.
+        func: The coroutine function to benchmark.
+        args: The argument of each call.
+        concurrency: How many calls to run at once.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(arg) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await func(arg)
+            latencies.append(time.perf_counter() - start)
+
+    async with _Usage() as usage:
+        start = time.perf_counter()
+        await asyncio.gather(*[timed(arg) for arg in args])
+        seconds = time.perf_counter() - start
+    return BenchResult(
+        name, len(latencies), seconds, latencies, rss=usage.rss, fds=usage.fds
+    )
+
+
+def bench_sync(name: str, func: Callable[[], object], count: int) -> BenchResult:
+    """Run `func` `count` times in a row.
+
+    Parameters:
+        name: The name of the benchmark.
+        func: The function to benchmark.
+        count: The number of calls to make.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        call = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call)
+    seconds = time.perf_counter() - start
+    return BenchResult(name, count, seconds, latencies, rss=rss(), fds=open_fds())
+
+
+async def run_benchmarks(
+    count: int = 500,
+    miner: Union[str, Dict[str, float]] = None,
+    rounds: int = 3,
+    iterations: int = 1000,
+    concurrency: int = 200,
+    behavior: SimulatorBehavior = None,
+    network: str = "127.1.0.0/16",
+    seed: int = 0,
+    host: str = "127.0.0.1",
+) -> dict:
+    """Benchmark scanning, identifying, polling and exporting a simulated farm.
+
+    Parameters:
+        count: The number of simulated miners.
+        miner: The type of miner to simulate, or a dict of types to their share of the farm.
+            Defaults to an even mix of every simulated type.
+        rounds: How many times to scan, identify and poll the farm.
+        iterations: How many times to run each parsing and rendering benchmark.
+        concurrency: How many miners to identify or poll at once.
+        behavior: The latency and failures of every simulated miner.
+        network: The network to take simulated miner IPs from.
+        seed: A seed for a reproducible farm.
+        host: The address the farm listens on, see [`MinerSimulator`][pyasic.simulator.MinerSimulator].
+
+    Returns:
+        A report with the environment and a list of [`BenchResult`][pyasic.bench.BenchResult] dicts.
+    """
+    if miner is None:
+        miner = {kind: 1 for kind in SIMULATORS}
+    farm = MinerSimulator.generate(
+        count, miner=miner, network=network, behavior=behavior, seed=seed, host=host
+    )
+    kinds = {cls: kind for kind, cls in SIMULATORS.items()}
+    results = []
+
+    async with farm:
+        miner_network = MinerNetwork([ipaddress.ip_address(ip) for ip in farm.ips])
+        scan = await bench_async(
+            "scan", lambda _: miner_network.scan(), range(rounds), concurrency=1
+        )
+        scan.ops = scan.ops * count
+        results.append(scan)
+
+        async def probe(ip) -> None:
+            _, writer = await sockets.open_connection(ip, 80, probe=True)
+            writer.close()
+            await writer.wait_closed()
+
+        results.append(
+            await bench_async("probe_connect", probe, farm.ips * rounds, concurrency)
+        )
+
+        factory = MinerFactory()
+        miners = []
+
+        async def identify(_) -> None:
+            miners[:] = await factory.get_multiple_miners(farm.ips, limit=concurrency)
+
+        identify_result = await bench_async(
+            "get_multiple_miners", identify, range(rounds), concurrency=1
+        )
+        identify_result.ops = identify_result.ops * count
+        results.append(identify_result)
+
+        by_kind = {}
+        for m in miners:
+            by_kind.setdefault(kinds[type(farm.get(m.ip))], []).append(m)
+        data = []
+
+        async def poll(m) -> None:
+            data.append(await m.get_data(capture_errors=True))
+
+        for kind, kind_miners in sorted(by_kind.items()):
+            results.append(
+                await bench_async(
+                    f"get_data[{kind}]", poll, kind_miners * rounds, concurrency
+                )
+            )
+
+    payloads = []
+    for simulated in {type(m): m for m in farm.miners.values()}.values():
+        for command in ["summary", "stats", "devs", "pools"]:
+            if hasattr(simulated, f"rpc_{command}"):
+                payload = simulated.rpc_request({"command": command})
+                payloads.append(json.dumps(payload).encode("utf-8") + b"\x00")
+    results.append(
+        bench_sync(
+            "_load_api_data",
+            _cycle(BaseMinerRPCAPI._load_api_data, payloads),
+            iterations,
+        )
+    )
+    if data:
+        results.append(bench_sync("as_json", _cycle(_as_json, data), iterations))
+        results.append(
+            bench_sync("as_influxdb", _cycle(_as_influxdb, data), iterations)
+        )
+
+    config = farm.get(farm.ips[0]).state.config
+    for fmt in CONFIG_FORMATS:
+        results.append(
+            bench_sync(f"config.as_{fmt}", getattr(config, f"as_{fmt}"), iterations)
+        )
+    results.append(
+        bench_sync(
+            "MinerConfig.from_am_modern",
+            lambda: MinerConfig.from_am_modern(config.as_am_modern()),
+            iterations,
+        )
+    )
+
+    return {
+        "environment": environment(),
+        "parameters": {
+            "count": count,
+            "miner": miner,
+            "rounds": rounds,
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "behavior": asdict(behavior) if behavior is not None else None,
+            "seed": seed,
+        },
+        "results": [r.as_dict() for r in results],
+    }
+
+
+def environment() -> dict:
+    try:
+        version = metadata.version("pyasic")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "pyasic": version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "event_loop": _event_loop(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _event_loop() -> Optional[str]:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return type(loop).__module__.split(".")[0]
+
+
+def _cycle(func: Callable, items: list) -> Callable[[], object]:
+    items = itertools.cycle(items)
+    return lambda: func(next(items))
+
+
+def _as_json(data) -> str:
+    return data.as_json()
+
+
+def _as_influxdb(data) -> str:
+    return data.as_influxdb()
@@ -0,0 +1,132 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Benchmark pyasic against a simulated farm.
+
+    python -m pyasic.bench --count 1000 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from pyasic import settings
+from pyasic.bench import run_benchmarks
+from pyasic.misc import sockets
+from pyasic.simulator import SIMULATORS, SimulatorBehavior
+
+
+def parse_args(args: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyasic.bench",
+        description="Benchmark scanning, polling and exporting simulated miners.",
+    )
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument(
+        "--miner",
+        action="append",
+        metavar="TYPE[=WEIGHT]",
+        help=f"Repeat to mix types, from {', '.join(SIMULATORS)}. Defaults to all.",
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--network", default="127.1.0.0/16")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Use 0.0.0.0 to serve every miner from one listener per port, on every interface.",
+    )
+    parser.add_argument(
+        "--uvloop", action="store_true", help="Run on uvloop, if it is installed."
+    )
+    parser.add_argument(
+        "--probe-reset",
+        action="store_true",
+        help="Close probe connections with a reset, see the socket_probe_reset setting.",
+    )
+    parser.add_argument(
+        "--source-address", help="The local address to open connections from."
+    )
+    parser.add_argument(
+        "--json", metavar="PATH", help="Write the report as JSON, - for stdout."
+    )
+    return parser.parse_args(args)
+
+
+def format_report(report: dict) -> str:
+    def ms(value) -> str:
+        return "-" if value is None else f"{value * 1000:.3f}"
+
+    def mb(value) -> str:
+        return "-" if value is None else f"{value / 1024 / 1024:.1f}"
+
+    lines = [
+        f"{'benchmark':<28}{'ops':>8}{'ops/s':>14}{'p50 ms':>11}{'p99 ms':>11}{'rss MB':>9}{'fds':>7}"
+    ]
+    for r in report["results"]:
+        lines.append(
+            f"{r['name']:<28}{r['ops']:>8}{r['ops_per_sec']:>14.1f}{ms(r['p50']):>11}"
+            f"{ms(r['p99']):>11}{mb(r['rss']):>9}{str(r['fds'] or '-'):>7}"
+        )
+    return "\n".join(lines)
+
+
+def main(args: list = None) -> None:
+    args = parse_args(args)
+    miner = None
+    if args.miner:
+        miner = {}
+        for spec in args.miner:
+            kind, _, weight = spec.partition("=")
+            miner[kind] = float(weight or 1)
+    settings.update("socket_probe_reset", args.probe_reset)
+    settings.update("socket_source_address", args.source_address)
+    report = (sockets.run if args.uvloop else asyncio.run)(
+        run_benchmarks(
+            count=args.count,
+            miner=miner,
+            rounds=args.rounds,
+            iterations=args.iterations,
+            concurrency=args.concurrency,
+            behavior=SimulatorBehavior(
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                drop_rate=args.drop_rate,
+                payload_padding=args.padding,
+            ),
+            network=args.network,
+            seed=args.seed,
+            host=args.host,
+        )
+    )
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        return
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,10 @@
 #  See the License for the specific language governing permissions and         -
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
-from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field, fields
+from typing import List
 
 from pyasic.config.fans import FanModeConfig
 from pyasic.config.mining import MiningModeConfig
@@ -43,6 +46,32 @@ class MinerConfig:
         """Converts the MinerConfig object to a dictionary."""
         return asdict(self)
 
+    def content_hash(self) -> str:
+        """Generates a hash of the contents of the config, which is the same for any two equal configs."""
+        return hashlib.sha256(
+            json.dumps(self.as_dict(), sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def diff(self, other: "MinerConfig", user_suffix: str = None) -> List[str]:
+        """Gets the names of the sections (pools, fan_mode, temperature, mining_mode) of this config which differ from another config.
+
+        Pools are compared by URL, user, and quota only, since passwords and pool group names are not reported consistently by miners.
+
+        Parameters:
+            other: The config to compare against, usually the current config of a miner.
+            user_suffix: A suffix to append to the pool users of this config before comparing, as it would be when sent to the miner.
+        """
+        changed = []
+        for section in fields(self):
+            if section.name == "pools":
+                if self.pools._diff_key(user_suffix) != other.pools._diff_key():
+                    changed.append(section.name)
+            elif asdict(getattr(self, section.name)) != asdict(
+                getattr(other, section.name)
+            ):
+                changed.append(section.name)
+        return changed
+
     def as_am_modern(self, user_suffix: str = None) -> dict:
         """Generates the configuration in the format suitable for modern Antminers."""
         return {
@@ -448,6 +448,16 @@ class PoolConfig(MinerConfigValue):
             group_pools.append(pool)
         return cls(groups=[PoolGroup(pools=group_pools)])
 
+    def _diff_key(self, user_suffix: str = None) -> list:
+        # miners don't report passwords or group names consistently, and pad empty pools
+        suffix = user_suffix if user_suffix is not None else ""
+        key = []
+        for group in self.groups:
+            pools = [(p.url, f"{p.user}{suffix}") for p in group.pools if p.url]
+            if len(pools) > 0:
+                key.append((group.quota, pools))
+        return key
+
     def as_am_modern(self, user_suffix: str = None) -> dict:
         if len(self.groups) > 0:
             return {"pools": self.groups[0].as_am_modern(user_suffix=user_suffix)}
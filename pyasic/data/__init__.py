@@ -26,6 +26,7 @@ from pyasic.config.mining import MiningModePowerTune
 from pyasic.data.pools import PoolMetrics, Scheme
 
 from .boards import HashBoard
+from .collection import FieldError
 from .device import DeviceInfo
 from .error_codes import BraiinsOSError, InnosiliconError, WhatsminerError, X19Error
 from .fans import Fan
@@ -73,6 +74,8 @@ class MinerData:
         efficiency: Efficiency of the miner in J/TH (Watts per TH/s).  Calculated automatically.
         is_mining: Whether the miner is mining.
         pools: A list of PoolMetrics instances, each representing metrics for a pool.
+        timed_out: The names of the data items which were not gathered before the deadline of `get_data()` passed.  Not included in exports such as `as_dict()` or `as_csv()`.
+        field_errors: A list of [`FieldError`][pyasic.data.FieldError]s for data items which failed when `get_data()` was called with `capture_errors`.  Not included in exports such as `as_dict()` or `as_csv()`.
     """
 
     # general
@@ -148,9 +151,21 @@ class MinerData:
     # pools
     pools: list[PoolMetrics] = field(default_factory=list)
 
+    # collection, about how the data was gathered rather than the miner, so it isn't exported
+    timed_out: List[str] = field(
+        default_factory=list, repr=False, metadata={"export": False}
+    )
+    field_errors: List[FieldError] = field(
+        default_factory=list, repr=False, metadata={"export": False}
+    )
+
     @classmethod
     def fields(cls):
-        return [f.name for f in fields(cls) if not f.name.startswith("_")]
+        return [
+            f.name
+            for f in fields(cls)
+            if not f.name.startswith("_") and f.metadata.get("export", True)
+        ]
 
     @staticmethod
     def dict_factory(x):
@@ -219,6 +234,9 @@ class MinerData:
                 setattr(cp, key, item + other_item)
             if isinstance(item, bool):
                 setattr(cp, key, item & other_item)
+        # collection details belong to a single poll of a single miner
+        cp.timed_out = []
+        cp.field_errors = []
         return cp
 
     @property
@@ -392,10 +410,14 @@ class MinerData:
         pass
 
     def keys(self) -> list:
-        return [f.name for f in fields(self)]
+        return [f.name for f in fields(self) if f.metadata.get("export", True)]
 
     def asdict(self) -> dict:
-        return asdict(self, dict_factory=self.dict_factory)
+        data = asdict(self, dict_factory=self.dict_factory)
+        for f in fields(self):
+            if not f.metadata.get("export", True):
+                del data[f.name]
+        return data
 
     def as_dict(self) -> dict:
         """Get this dataclass as a dictionary.
@@ -0,0 +1,69 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+
+import traceback
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class FieldError:
+    """A Dataclass recording a data item which failed to be gathered.
+
+    Attributes:
+        field: The name of the data item, such as `hashrate`.
+        error_type: The name of the type of the exception raised.
+        error: The message of the exception raised.
+        traceback: The formatted traceback of the exception raised.
+        duration: The time in seconds spent on the data item before it failed.
+    """
+
+    field: str
+    error_type: str = None
+    error: str = None
+    traceback: str = None
+    duration: float = None
+
+    @classmethod
+    def from_exception(
+        cls, field: str, exception: BaseException, duration: float = None
+    ) -> "FieldError":
+        return cls(
+            field=field,
+            error_type=type(exception).__name__,
+            error=str(exception),
+            traceback="".join(
+                traceback.format_exception(
+                    type(exception), exception, exception.__traceback__
+                )
+            ),
+            duration=duration,
+        )
+
+    def get(self, __key: str, default: Any = None):
+        try:
+            val = self.__getitem__(__key)
+            if val is None:
+                return default
+            return val
+        except KeyError:
+            return default
+
+    def __getitem__(self, item: str):
+        try:
+            return getattr(self, item)
+        except AttributeError:
+            raise KeyError(f"{item}")
@@ -0,0 +1,419 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from pyasic.config import MinerConfig
+from pyasic.data import MinerData
+from pyasic.errors import APIError
+from pyasic.miners.base import AnyMiner
+from pyasic.miners.data import DataOptions
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConfigChange:
+    """A change in the config of a miner which was not made through the [`ConfigCache`][pyasic.fleet.ConfigCache].
+
+    Attributes:
+        ip: The IP of the miner.
+        old: The previously cached config.
+        new: The config the miner now has.
+        old_hash: The content hash of the previously cached config.
+        new_hash: The content hash of the config the miner now has.
+    """
+
+    ip: str
+    old: MinerConfig
+    new: MinerConfig
+    old_hash: str
+    new_hash: str
+
+
+@dataclass
+class ApplyConfigResult:
+    """The result of sending a config to a single miner with [`apply_config()`][pyasic.fleet.apply_config].
+
+    Attributes:
+        ip: The IP of the miner.
+        success: Whether the config was sent without an error.
+        user_suffix: The user suffix used for the miner.
+        error: A description of why sending the config failed, if it did.
+        duration: The time in seconds sending the config took.
+    """
+
+    ip: str
+    success: bool = False
+    user_suffix: Optional[str] = None
+    error: Optional[str] = None
+    duration: Optional[float] = None
+
+
+# rendered in place of the user suffix, then swapped for the suffix of each miner
+_SUFFIX_PLACEHOLDER = "\x00user_suffix\x00"
+
+
+def _compile_suffix(rendered: Any) -> Callable[[str], Any]:
+    """Compile a format rendered with the placeholder suffix into a function filling in a suffix.
+
+    Only the containers on the path to a pool user are rebuilt per miner, the rest is shared.
+    """
+    if isinstance(rendered, str) and _SUFFIX_PLACEHOLDER in rendered:
+        parts = rendered.split(_SUFFIX_PLACEHOLDER)
+        return lambda user_suffix: user_suffix.join(parts)
+    if isinstance(rendered, dict):
+        patches = {k: _compile_suffix(v) for k, v in rendered.items()}
+        patches = {k: f for k, f in patches.items() if f is not None}
+        if len(patches) > 0:
+
+            def fill_dict(user_suffix: str) -> dict:
+                filled = dict(rendered)
+                for k, f in patches.items():
+                    filled[k] = f(user_suffix)
+                return filled
+
+            return fill_dict
+    if isinstance(rendered, (list, tuple)):
+        patches = [_compile_suffix(v) for v in rendered]
+        if any(f is not None for f in patches):
+
+            def fill_list(user_suffix: str) -> Union[list, tuple]:
+                return type(rendered)(
+                    f(user_suffix) if f is not None else v
+                    for v, f in zip(rendered, patches)
+                )
+
+            return fill_list
+    return None
+
+
+class _RenderedConfig(MinerConfig):
+    """A `MinerConfig` which only renders each `as_*` format once for many miners.
+
+    Formats are rendered with a placeholder user suffix, and each call only swaps
+    in the suffix it was called with.  This is still a `MinerConfig`, since
+    backends keep the config they were sent.
+    """
+
+    def __init__(self, config: MinerConfig):
+        super().__init__(
+            pools=config.pools,
+            fan_mode=config.fan_mode,
+            temperature=config.temperature,
+            mining_mode=config.mining_mode,
+        )
+        self._rendered: Dict[str, Tuple[Any, Optional[Callable[[str], Any]]]] = {}
+
+    def _render(self, fmt: str, user_suffix: str = None) -> Any:
+        if fmt not in self._rendered:
+            rendered = getattr(MinerConfig, fmt)(self, user_suffix=_SUFFIX_PLACEHOLDER)
+            self._rendered[fmt] = rendered, _compile_suffix(rendered)
+        rendered, fill = self._rendered[fmt]
+        if fill is None:
+            return rendered
+        return fill(user_suffix or "")
+
+
+def _make_render(fmt: str) -> Callable:
+    def render(self: _RenderedConfig, user_suffix: str = None) -> Any:
+        return self._render(fmt, user_suffix=user_suffix)
+
+    render.__name__ = fmt
+    return render
+
+
+for _fmt in [f for f in vars(MinerConfig) if f.startswith("as_") and f != "as_dict"]:
+    setattr(_RenderedConfig, _fmt, _make_render(_fmt))
+
+
+async def apply_config(
+    miners: List[AnyMiner],
+    config: MinerConfig,
+    user_suffix_fn: Callable[[AnyMiner], Optional[str]] = None,
+    concurrency: int = 100,
+    only_if_changed: bool = False,
+) -> Dict[str, ApplyConfigResult]:
+    """Send the same config to many miners.
+
+    Each config format (`as_am_modern()`, `as_wm()`, etc.) is rendered once for all miners using it,
+    and only the pool user suffix is filled in per miner.
+
+    Parameters:
+        miners: The miners to send the config to.
+        config: The config to send.
+        user_suffix_fn: A function returning the user suffix to use for a miner, such as its hostname.
+        concurrency: The number of miners to send the config to at the same time.
+        only_if_changed: Only send the config to miners where it differs from their current config, see [`send_config()`][pyasic.miners.base.MinerProtocol.send_config].
+
+    Returns:
+        A dict of IP to [`ApplyConfigResult`][pyasic.fleet.ApplyConfigResult] for every miner.
+    """
+    rendered = _RenderedConfig(config)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {
+        str(miner.ip): ApplyConfigResult(
+            ip=str(miner.ip),
+            user_suffix=user_suffix_fn(miner) if user_suffix_fn is not None else None,
+        )
+        for miner in miners
+    }
+
+    async def _apply(miner: AnyMiner):
+        result = results[str(miner.ip)]
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                await miner.send_config(
+                    rendered,
+                    user_suffix=result.user_suffix,
+                    only_if_changed=only_if_changed,
+                )
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                logger.warning("%s - Failed to send config: %s", miner, result.error)
+            else:
+                result.success = True
+            result.duration = time.monotonic() - start
+
+    await asyncio.gather(*[_apply(miner) for miner in miners])
+    return results
+
+
+_EMPTY_HASH: Optional[str] = None
+
+
+def _empty_hash() -> str:
+    global _EMPTY_HASH
+    if _EMPTY_HASH is None:
+        _EMPTY_HASH = MinerConfig().content_hash()
+    return _EMPTY_HASH
+
+
+@dataclass
+class _CacheEntry:
+    config: Optional[MinerConfig] = None
+    hash: Optional[str] = None
+    fetched: float = 0
+    # set after our own send_config, so the next fetch is a new baseline instead of drift
+    expect_change: bool = False
+
+
+class ConfigCache:
+    """A cache of miner configs, refreshed on a slower schedule than data polling.
+
+    The content hash of each config is kept, and `on_change` is called with a
+    [`ConfigChange`][pyasic.fleet.config.ConfigChange] when a refresh finds a config
+    that changed out-of-band, i.e. not by [`send_config()`][pyasic.fleet.ConfigCache.send_config].
+
+    Parameters:
+        refresh_interval: How long in seconds a cached config is used before it is fetched again.
+        on_change: A function or coroutine function called with a `ConfigChange` when a config changes.
+
+    Attributes:
+        hits: The number of times a cached config was used.
+        misses: The number of times a config had to be fetched.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 300,
+        on_change: Callable[[ConfigChange], None] = None,
+    ):
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, miner: AnyMiner) -> bool:
+        entry = self._entries.get(str(miner.ip))
+        return entry is not None and entry.config is not None
+
+    def get_hash(self, miner: AnyMiner) -> Optional[str]:
+        """Get the content hash of the cached config of a miner, if there is one."""
+        entry = self._entries.get(str(miner.ip))
+        return entry.hash if entry is not None else None
+
+    def invalidate(self, miner: AnyMiner = None) -> None:
+        """Force the config of a miner, or all miners if none is passed, to be fetched on the next access."""
+        entries = (
+            self._entries.values()
+            if miner is None
+            else [self._entries.get(str(miner.ip), _CacheEntry())]
+        )
+        for entry in entries:
+            entry.fetched = 0
+
+    async def get(self, miner: AnyMiner, force: bool = False) -> MinerConfig:
+        """Get the config of a miner, fetching it if it is not cached or is older than `refresh_interval`.
+
+        Parameters:
+            miner: The miner to get the config of.
+            force: Whether to fetch the config even if the cached config is still fresh.
+
+        Returns:
+            The config of the miner.
+
+        Raises:
+            APIError: If the config could not be read and there is no cached config to fall back on.
+        """
+        ip = str(miner.ip)
+        lock = self._locks.setdefault(ip, asyncio.Lock())
+        async with lock:
+            entry = self._entries.setdefault(ip, _CacheEntry())
+            if (
+                not force
+                and entry.config is not None
+                and time.monotonic() - entry.fetched < self.refresh_interval
+            ):
+                self.hits += 1
+                return entry.config
+
+            self.misses += 1
+            config = await miner.get_config()
+            config_hash = config.content_hash() if config is not None else None
+            if config_hash is None or (
+                entry.hash not in (None, config_hash) and config_hash == _empty_hash()
+            ):
+                # the read failed, and the backend returned nothing or fell back to a default config,
+                # so keep the cached config and try again on the next access
+                if entry.config is None:
+                    raise APIError(f"{miner} - Failed to read config.")
+                logger.warning("%s - Failed to read config, using cached config", miner)
+                return entry.config
+
+            change = None
+            if (
+                entry.hash is not None
+                and entry.hash != config_hash
+                and not entry.expect_change
+            ):
+                change = ConfigChange(
+                    ip=ip,
+                    old=entry.config,
+                    new=config,
+                    old_hash=entry.hash,
+                    new_hash=config_hash,
+                )
+            entry.config = config
+            entry.hash = config_hash
+            entry.fetched = time.monotonic()
+            entry.expect_change = False
+
+        if change is not None and self.on_change is not None:
+            result = self.on_change(change)
+            if inspect.isawaitable(result):
+                await result
+        return config
+
+    async def send_config(
+        self,
+        miner: AnyMiner,
+        config: MinerConfig,
+        user_suffix: str = None,
+        only_if_changed: bool = False,
+    ) -> bool:
+        """Send a config to a miner, and refresh the cached config on the next access without reporting it as a change.
+
+        Parameters:
+            miner: The miner to send the config to.
+            config: The config to send.
+            user_suffix: A suffix to append to the username when sending to the miner.
+            only_if_changed: Only send the config if it differs from the cached config, and only send the changed sections if the miner supports it.
+
+        Returns:
+            Whether any config was sent to the miner.
+        """
+        current = None
+        if only_if_changed:
+            current = await self._get_or_stale(miner)
+            if current is not None and not config.diff(current, user_suffix):
+                return False
+
+        ip = str(miner.ip)
+        async with self._locks.setdefault(ip, asyncio.Lock()):
+            entry = self._entries.setdefault(ip, _CacheEntry())
+            # refetch even if the send failed, it may have partly applied
+            entry.fetched = 0
+            await miner.send_config(
+                config,
+                user_suffix=user_suffix,
+                only_if_changed=current is not None,
+                current_config=current,
+            )
+            entry.expect_change = True
+        return True
+
+    async def get_data(
+        self,
+        miner: AnyMiner,
+        allow_warning: bool = False,
+        include: List[Union[str, DataOptions]] = None,
+        exclude: List[Union[str, DataOptions]] = None,
+        capture_errors: bool = False,
+    ) -> MinerData:
+        """Get data from a miner like [`get_data()`][pyasic.miners.base.MinerProtocol.get_data], with the config taken from the cache.
+
+        Parameters:
+            miner: The miner to get data from.
+            allow_warning: Allow warning when an API command fails.
+            include: Names of data items you want to gather. Defaults to all data.
+            exclude: Names of data items to exclude.  Exclusion happens after considering included items.
+            capture_errors: Record data items which fail in `MinerData.field_errors` instead of raising an `APIError`.
+
+        Returns:
+            A [`MinerData`][pyasic.data.MinerData] instance containing data from the miner.
+        """
+        config_name = str(DataOptions.CONFIG)
+        wants_config = (
+            include is None or config_name in [str(i) for i in include]
+        ) and not (exclude is not None and config_name in [str(i) for i in exclude])
+        if not wants_config:
+            return await miner.get_data(
+                allow_warning=allow_warning,
+                include=include,
+                exclude=exclude,
+                capture_errors=capture_errors,
+            )
+
+        data, config = await asyncio.gather(
+            miner.get_data(
+                allow_warning=allow_warning,
+                include=include,
+                exclude=[*(exclude or []), DataOptions.CONFIG],
+                capture_errors=capture_errors,
+            ),
+            self._get_or_stale(miner),
+        )
+        if config is not None:
+            data.config = config
+        return data
+
+    async def _get_or_stale(self, miner: AnyMiner) -> Optional[MinerConfig]:
+        try:
+            return await self.get(miner)
+        except Exception as e:
+            logger.warning("%s - Failed to refresh cached config: %s", miner, e)
+            entry = self._entries.get(str(miner.ip))
+            return entry.config if entry is not None else None
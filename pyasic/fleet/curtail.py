@@ -0,0 +1,227 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+from pyasic.config import MinerConfig, MiningModeConfig
+from pyasic.miners.backends import AntminerModern, BOSer, BTMiner
+from pyasic.miners.base import AnyMiner
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CurtailResult:
+    """The result of stopping or resuming a single miner with a [`Curtailment`][pyasic.fleet.Curtailment].
+
+    Attributes:
+        ip: The IP of the miner.
+        success: Whether the command was accepted, and confirmed if confirmation was enabled.
+        sent: The time in seconds from the start of the event until the miner accepted the command.
+        confirmed: The time in seconds from the start of the event until the miner reported the new state.
+        error: A description of why the command failed, if it did.
+    """
+
+    ip: str
+    success: bool = False
+    sent: Optional[float] = None
+    confirmed: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self.confirmed if self.confirmed is not None else self.sent
+
+
+@dataclass
+class CurtailReport:
+    """The results of a curtailment or resume event across all miners.
+
+    Attributes:
+        results: A dict of IP to [`CurtailResult`][pyasic.fleet.curtail.CurtailResult] for every miner.
+        duration: The time in seconds the whole event took.
+    """
+
+    results: Dict[str, CurtailResult] = field(default_factory=dict)
+    duration: float = 0
+
+    @property
+    def failed(self) -> List[str]:
+        return [ip for ip, r in self.results.items() if not r.success]
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Get a percentile of the time it took successful miners to reach the new state.
+
+        Parameters:
+            pct: The percentile to get, from 0 to 100.
+        """
+        latencies = sorted(r.latency for r in self.results.values() if r.success)
+        if len(latencies) == 0:
+            return None
+        # nearest rank
+        rank = max(math.ceil(pct / 100 * len(latencies)), 1)
+        return latencies[rank - 1]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p90(self) -> Optional[float]:
+        return self.percentile(90)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(99)
+
+
+class Curtailment:
+    """Stop and resume many miners as fast as possible, such as for a grid curtailment event.
+
+    Call [`prepare()`][pyasic.fleet.Curtailment.prepare] ahead of time, and periodically while
+    waiting for an event, to fetch auth tokens and the configs needed to stop each miner, so
+    stopping only takes a single command per miner.  All miners are then stopped at once,
+    and each is confirmed with a lightweight `is_mining()` check.
+
+    Parameters:
+        miners: The miners to control.
+        confirm: Whether to wait for each miner to report the new state.
+        confirm_timeout: How long in seconds to wait for a miner to report the new state.
+        confirm_interval: The time in seconds between checks of the miner state.
+    """
+
+    def __init__(
+        self,
+        miners: List[AnyMiner],
+        confirm: bool = True,
+        confirm_timeout: float = 30,
+        confirm_interval: float = 1,
+    ):
+        self.miners = miners
+        self.confirm = confirm
+        self.confirm_timeout = confirm_timeout
+        self.confirm_interval = confirm_interval
+        self._configs: Dict[str, MinerConfig] = {}
+
+    async def prepare(self) -> None:
+        """Fetch auth tokens and the configs needed to stop each miner with a single command."""
+        results = await asyncio.gather(
+            *[self._prepare(miner) for miner in self.miners], return_exceptions=True
+        )
+        for miner, result in zip(self.miners, results):
+            if isinstance(result, BaseException):
+                logger.warning(
+                    "%s - Failed to prepare for curtailment: %s", miner, result
+                )
+
+    async def _prepare(self, miner: AnyMiner) -> None:
+        if isinstance(miner, BTMiner):
+            await miner.rpc.get_token()
+        elif isinstance(miner, BOSer):
+            await miner.web.auth()
+        elif isinstance(miner, AntminerModern):
+            # stock firmware only sleeps by rewriting the whole config
+            self._configs[str(miner.ip)] = await miner.get_config()
+
+    async def curtail(self) -> CurtailReport:
+        """Stop every miner.
+
+        Returns:
+            A [`CurtailReport`][pyasic.fleet.curtail.CurtailReport] with the time each miner took to stop.
+        """
+        return await self._run(mining=False)
+
+    async def resume(self) -> CurtailReport:
+        """Resume every miner.
+
+        Returns:
+            A [`CurtailReport`][pyasic.fleet.curtail.CurtailReport] with the time each miner took to resume.
+        """
+        return await self._run(mining=True)
+
+    async def _run(self, mining: bool) -> CurtailReport:
+        start = time.monotonic()
+        report = CurtailReport(
+            results={
+                str(miner.ip): CurtailResult(ip=str(miner.ip)) for miner in self.miners
+            }
+        )
+        await asyncio.gather(
+            *[
+                self._set_mining(miner, mining, start, report.results[str(miner.ip)])
+                for miner in self.miners
+            ]
+        )
+        report.duration = time.monotonic() - start
+        return report
+
+    async def _set_mining(
+        self, miner: AnyMiner, mining: bool, start: float, result: CurtailResult
+    ) -> None:
+        try:
+            if not await self._send(miner, mining):
+                raise RuntimeError("command was rejected")
+            result.sent = time.monotonic() - start
+            if self.confirm and await self._confirm(miner, mining):
+                result.confirmed = time.monotonic() - start
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            logger.warning(
+                "%s - Failed to %s mining: %s",
+                miner,
+                "resume" if mining else "stop",
+                result.error,
+            )
+        else:
+            result.success = True
+
+    async def _send(self, miner: AnyMiner, mining: bool) -> bool:
+        config = self._configs.get(str(miner.ip))
+        if config is not None:
+            if not mining:
+                config = replace(config, mining_mode=MiningModeConfig.sleep())
+            elif config.mining_mode.mode == "sleep":
+                config = replace(config, mining_mode=MiningModeConfig.normal())
+            await miner.send_config(config)
+            return True
+        if mining:
+            return await miner.resume_mining()
+        return await miner.stop_mining()
+
+    async def _confirm(self, miner: AnyMiner, mining: bool) -> bool:
+        deadline = time.monotonic() + self.confirm_timeout
+        while True:
+            try:
+                state = await miner.is_mining()
+            except Exception:
+                # the miner can be busy applying the change, keep checking
+                state = not mining
+            if state is None:
+                # this miner can't report whether it is mining
+                return False
+            if state == mining:
+                return True
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Miner did not report {'mining' if mining else 'stopped'} in time"
+                )
+            await asyncio.sleep(self.confirm_interval)
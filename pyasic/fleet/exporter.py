@@ -0,0 +1,378 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyasic.data import MinerData
+from pyasic.fleet.config import ConfigCache
+from pyasic.misc import health, instrument, open_fds, parse_cache
+from pyasic.ssh.base import open_connections
+
+logger = logging.getLogger(__name__)
+
+# (name, type, help) of each per miner metric, in the order they are served
+MINER_METRICS: List[Tuple[str, str, str]] = [
+    ("miner_info", "gauge", "Identity of the miner, always 1."),
+    ("last_update_timestamp_seconds", "gauge", "When the data was gathered."),
+    ("hashrate_hashes_per_second", "gauge", "Current hashrate."),
+    ("expected_hashrate_hashes_per_second", "gauge", "Nominal hashrate."),
+    ("is_mining", "gauge", "Whether the miner is mining."),
+    ("fault_light", "gauge", "Whether the fault light is on."),
+    ("wattage_watts", "gauge", "Current power draw."),
+    ("wattage_limit_watts", "gauge", "Power limit."),
+    ("efficiency_joules_per_terahash", "gauge", "Power draw per TH/s."),
+    ("env_temperature_celsius", "gauge", "Environment temperature."),
+    ("uptime_seconds", "gauge", "Uptime of the miner."),
+    ("hashboard_hashrate_hashes_per_second", "gauge", "Hashrate of each board."),
+    ("hashboard_temperature_celsius", "gauge", "PCB temperature of each board."),
+    ("hashboard_chip_temperature_celsius", "gauge", "Chip temperature of each board."),
+    ("hashboard_chips", "gauge", "Working chips on each board."),
+    ("fan_speed_rpm", "gauge", "Speed of each fan."),
+    ("errors", "gauge", "Errors reported by the miner."),
+    ("field_errors", "gauge", "Data items which failed in the last poll."),
+    ("timed_out", "gauge", "Data items which timed out in the last poll."),
+]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsExporter:
+    """Serves fleet data and pyasic internals as Prometheus metrics over HTTP.
+
+    Each miner's samples are rendered once when [`update()`][pyasic.fleet.MetricsExporter.update]
+    is given new data, and the fleet text is only joined again on the first scrape after a change,
+    so scraping a large fleet only costs writing out the cached text.
+
+    Internal metrics include command latency summaries from [`pyasic.misc.instrument`][pyasic.misc.instrument],
+    timeouts and failed data items, circuit breaker states, SSH connections, and cache hit rates.
+
+    Parameters:
+        host: The address to serve on.
+        port: The port to serve on, or 0 to pick a free one.
+        path: The path of the metrics.
+        prefix: The prefix of every metric name.
+        collect: Whether to collect command latencies with an instrumentation hook while serving.
+        config_cache: A [`ConfigCache`][pyasic.fleet.ConfigCache] to report the hit rate of.
+    """
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 9432,
+        path: str = "/metrics",
+        prefix: str = "pyasic",
+        collect: bool = True,
+        config_cache: ConfigCache = None,
+    ):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.prefix = prefix
+        self.config_cache = config_cache
+        self.collector = instrument.Collector() if collect else None
+        self._samples: Dict[str, Dict[str, str]] = {m[0]: {} for m in MINER_METRICS}
+        self._body: Optional[bytes] = None
+        self._timeouts: Dict[str, int] = {}
+        self._field_errors: Dict[str, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def __repr__(self):
+        return f"MetricsExporter: {len(self)} miners on {self.host}:{self.port}"
+
+    def __len__(self):
+        return len(self._samples["miner_info"])
+
+    def update(self, data: MinerData) -> None:
+        """Replace the metrics of a miner with new data."""
+        ip = str(data.ip)
+        samples = self._render_miner(data)
+        for name, by_ip in self._samples.items():
+            rendered = samples.get(name)
+            if rendered:
+                by_ip[ip] = rendered
+            else:
+                by_ip.pop(ip, None)
+        for name in data.timed_out:
+            self._timeouts[name] = self._timeouts.get(name, 0) + 1
+        for error in data.field_errors:
+            self._field_errors[error.field] = self._field_errors.get(error.field, 0) + 1
+        self._body = None
+
+    def update_many(self, data: Iterable[MinerData]) -> None:
+        for d in data:
+            self.update(d)
+
+    def remove(self, ip: str) -> None:
+        """Stop serving the metrics of a miner."""
+        for by_ip in self._samples.values():
+            by_ip.pop(str(ip), None)
+        self._body = None
+
+    def clear(self) -> None:
+        for by_ip in self._samples.values():
+            by_ip.clear()
+        self._body = None
+
+    def render(self) -> bytes:
+        """Get the full exposition text."""
+        return self.render_fleet() + self.render_internal()
+
+    def render_fleet(self) -> bytes:
+        """Get the exposition text of every miner, joining it again only if it changed."""
+        if self._body is None:
+            parts = []
+            for name, kind, description in MINER_METRICS:
+                by_ip = self._samples[name]
+                if by_ip:
+                    parts.append(self._header(name, kind, description))
+                    parts.extend(by_ip.values())
+            self._body = "".join(parts).encode("utf-8")
+        return self._body
+
+    def render_internal(self) -> bytes:
+        """Get the exposition text of pyasic itself."""
+        lines = [
+            self._header("miners", "gauge", "Miners being exported."),
+            f"{self.prefix}_miners {len(self)}\n",
+        ]
+        if self.collector is not None:
+            lines += self._render_commands()
+        for name, counts, description in [
+            ("timeouts_total", self._timeouts, "Data items not gathered in time."),
+            ("field_errors_total", self._field_errors, "Data items which failed."),
+        ]:
+            lines.append(self._header(name, "counter", description))
+            for field, count in counts.items():
+                lines.append(
+                    f'{self.prefix}_{name}{{field="{_escape(field)}"}} {count}\n'
+                )
+
+        states = {state: 0 for state in health.CircuitState}
+        for host in health.unhealthy_hosts():
+            states[host.state] += 1
+        lines.append(self._header("circuits", "gauge", "Hosts by circuit state."))
+        for state in [health.CircuitState.OPEN, health.CircuitState.HALF_OPEN]:
+            lines.append(f'{self.prefix}_circuits{{state="{state}"}} {states[state]}\n')
+
+        lines.append(
+            self._header("ssh_connections", "gauge", "Pooled SSH connections.")
+        )
+        lines.append(f"{self.prefix}_ssh_connections {open_connections()}\n")
+        fds = open_fds()
+        if fds is not None:
+            lines.append(self._header("open_fds", "gauge", "Open file descriptors."))
+            lines.append(f"{self.prefix}_open_fds {fds}\n")
+
+        caches = [("parse_cache", parse_cache.stats)]
+        if self.config_cache is not None:
+            caches.append(("config_cache", self.config_cache))
+        for name, cache in caches:
+            for result in ["hits", "misses"]:
+                lines.append(
+                    self._header(
+                        f"{name}_{result}_total", "counter", f"{name} {result}."
+                    )
+                )
+                lines.append(
+                    f"{self.prefix}_{name}_{result}_total {getattr(cache, result)}\n"
+                )
+        return "".join(lines).encode("utf-8")
+
+    async def start(self) -> None:
+        if self.collector is not None:
+            instrument.add_hook(self.collector)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.collector is not None:
+            instrument.remove_hook(self.collector)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MetricsExporter":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            method, target = head.decode("latin-1").split(" ", 2)[:2]
+            if method not in ("GET", "HEAD") or target.split("?")[0] != self.path:
+                writer.write(
+                    b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+                )
+            else:
+                start = time.perf_counter()
+                fleet = self.render_fleet()
+                internal = self.render_internal()
+                headers = (
+                    f"HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                    f"Content-Length: {len(fleet) + len(internal)}\r\nConnection: close\r\n\r\n"
+                )
+                writer.write(headers.encode("latin-1"))
+                if method == "GET":
+                    writer.write(fleet)
+                    writer.write(internal)
+                logger.debug(
+                    "%s - Rendered metrics in %.3fs", self, time.perf_counter() - start
+                )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _header(self, name: str, kind: str, description: str) -> str:
+        return f"# HELP {self.prefix}_{name} {description}\n# TYPE {self.prefix}_{name} {kind}\n"
+
+    def _render_commands(self) -> List[str]:
+        name = f"{self.prefix}_command_duration_seconds"
+        lines = [
+            self._header(
+                "command_duration_seconds", "summary", "Duration of miner commands."
+            )
+        ]
+        counters = {
+            "command_sent_bytes_total": [],
+            "command_received_bytes_total": [],
+            "command_errors_total": [],
+        }
+        for stats in list(self.collector.stats.values()):
+            labels = (
+                f'kind="{_escape(stats.kind)}",backend="{_escape(stats.backend)}",'
+                f'command="{_escape(stats.command)}"'
+            )
+            for q in (0.5, 0.9, 0.99):
+                value = stats.latency.percentile(q)
+                lines.append(f'{name}{{{labels},quantile="{q}"}} {_number(value)}\n')
+            lines.append(f"{name}_sum{{{labels}}} {_number(stats.latency.total)}\n")
+            lines.append(f"{name}_count{{{labels}}} {stats.latency.count}\n")
+            counters["command_sent_bytes_total"].append(f"{{{labels}}} {stats.sent}\n")
+            counters["command_received_bytes_total"].append(
+                f"{{{labels}}} {stats.received}\n"
+            )
+            counters["command_errors_total"].append(f"{{{labels}}} {stats.errors}\n")
+        descriptions = {
+            "command_sent_bytes_total": "Bytes sent by miner commands.",
+            "command_received_bytes_total": "Bytes received by miner commands.",
+            "command_errors_total": "Miner commands which failed.",
+        }
+        for counter, samples in counters.items():
+            lines.append(self._header(counter, "counter", descriptions[counter]))
+            lines.extend(f"{self.prefix}_{counter}{s}" for s in samples)
+        return lines
+
+    def _render_miner(self, data: MinerData) -> Dict[str, str]:
+        p = self.prefix
+        ip = f'ip="{_escape(str(data.ip))}"'
+        info = ",".join(
+            f'{key}="{_escape(str(value))}"'
+            for key, value in [
+                ("ip", data.ip),
+                ("mac", data.mac),
+                ("make", data.make),
+                ("model", data.model),
+                ("firmware", data.firmware),
+                ("fw_ver", data.fw_ver),
+                ("hostname", data.hostname),
+            ]
+            if value is not None
+        )
+        samples = {"miner_info": f"{p}_miner_info{{{info}}} 1\n"}
+
+        def single(name: str, value) -> None:
+            if value is not None:
+                samples[name] = f"{p}_{name}{{{ip}}} {_number(value)}\n"
+
+        single("last_update_timestamp_seconds", data.timestamp)
+        single("hashrate_hashes_per_second", _hashes(data.hashrate))
+        single("expected_hashrate_hashes_per_second", _hashes(data.expected_hashrate))
+        single("is_mining", data.is_mining)
+        single("fault_light", data.fault_light)
+        single("wattage_watts", data.wattage)
+        single("wattage_limit_watts", data.wattage_limit)
+        single("efficiency_joules_per_terahash", data.efficiency)
+        single("env_temperature_celsius", data.env_temp)
+        single("uptime_seconds", data.uptime)
+        single("errors", len(data.errors))
+        single("field_errors", len(data.field_errors))
+        single("timed_out", len(data.timed_out))
+
+        boards = {
+            "hashboard_hashrate_hashes_per_second": [],
+            "hashboard_temperature_celsius": [],
+            "hashboard_chip_temperature_celsius": [],
+            "hashboard_chips": [],
+        }
+        for board in data.hashboards:
+            if board.missing:
+                continue
+            labels = f'{ip},slot="{board.slot}"'
+            for name, value in [
+                ("hashboard_hashrate_hashes_per_second", _hashes(board.hashrate)),
+                ("hashboard_temperature_celsius", board.temp),
+                ("hashboard_chip_temperature_celsius", board.chip_temp),
+                ("hashboard_chips", board.chips),
+            ]:
+                if value is not None:
+                    boards[name].append(f"{p}_{name}{{{labels}}} {_number(value)}\n")
+        fans = [
+            f'{p}_fan_speed_rpm{{{ip},fan="{idx}"}} {_number(fan.speed)}\n'
+            for idx, fan in enumerate(data.fans)
+            if fan.speed is not None
+        ]
+        for name, lines in [*boards.items(), ("fan_speed_rpm", fans)]:
+            if lines:
+                samples[name] = "".join(lines)
+        return samples
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _hashes(value) -> Optional[float]:
+    # hashrates are AlgoHashRate values with a unit, or plain floats in TH/s
+    if value is None:
+        return None
+    unit = getattr(value, "unit", None)
+    if unit is not None:
+        return float(value.rate) * int(unit)
+    return float(value) * 10**12
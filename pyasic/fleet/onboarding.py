@@ -0,0 +1,215 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+from pyasic.miners.base import AnyMiner
+from pyasic.miners.factory import MinerFactory, miner_factory
+from pyasic.miners.listener import MinerListener
+from pyasic.misc.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class FleetRegistry:
+    """An in-memory registry of identified miners, keyed by MAC address."""
+
+    def __init__(self):
+        self._miners: Dict[str, AnyMiner] = {}
+        self._macs: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._miners)
+
+    def __iter__(self) -> Iterator[AnyMiner]:
+        return iter(list(self._miners.values()))
+
+    def __contains__(self, mac: str) -> bool:
+        return mac.upper() in self._miners
+
+    def get(self, mac: str) -> Optional[AnyMiner]:
+        """Get the miner with a MAC address, if it is registered."""
+        return self._miners.get(mac.upper())
+
+    def get_by_ip(self, ip: str) -> Optional[AnyMiner]:
+        """Get the miner currently at an IP, if it is registered."""
+        mac = self._macs.get(str(ip))
+        return self._miners.get(mac) if mac is not None else None
+
+    def register(self, mac: str, miner: AnyMiner) -> None:
+        """Register a miner under a MAC address, replacing the miner previously registered with it."""
+        mac = mac.upper()
+        old = self._miners.get(mac)
+        if old is not None:
+            self._macs.pop(str(old.ip), None)
+        # another miner may have been handed the same IP by DHCP
+        old_mac = self._macs.get(str(miner.ip))
+        if old_mac is not None and old_mac != mac:
+            self._miners.pop(old_mac, None)
+        self._miners[mac] = miner
+        self._macs[str(miner.ip)] = mac
+
+    def remove(self, mac: str) -> Optional[AnyMiner]:
+        """Remove a miner from the registry, returning it if it was registered."""
+        miner = self._miners.pop(mac.upper(), None)
+        if miner is not None:
+            self._macs.pop(str(miner.ip), None)
+        return miner
+
+
+class MinerOnboarding:
+    """Identify miners as they report themselves to a [`MinerListener`][pyasic.miners.listener.MinerListener], and register them by MAC.
+
+    Reports are collected into batches of up to `batch_size` miners, or whatever arrived within
+    `batch_interval` seconds of the first report in the batch.  Batches are started at no more than
+    `rate` miners per second, and identification through the [`MinerFactory`][pyasic.miners.factory.MinerFactory]
+    is limited to `concurrency` miners at once, so powering on many racks at once doesn't flood the network.
+    Miners already registered at the same IP are not identified again.
+
+    Parameters:
+        listener: The listener to take miner reports from, a new listener is created if not passed.
+        registry: The registry to add identified miners to, a new registry is created if not passed.
+        factory: The factory used to identify miners.
+        concurrency: The number of miners identified at the same time.
+        rate: The number of identifications started per second.
+        batch_size: The largest number of miners identified in one batch.
+        batch_interval: How long in seconds to collect reports for a batch.
+    """
+
+    def __init__(
+        self,
+        listener: MinerListener = None,
+        registry: FleetRegistry = None,
+        factory: MinerFactory = miner_factory,
+        concurrency: int = 50,
+        rate: float = 20,
+        batch_size: int = 50,
+        batch_interval: float = 0.5,
+    ):
+        self.listener = listener if listener is not None else MinerListener()
+        self.registry = registry if registry is not None else FleetRegistry()
+        self.factory = factory
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._limiter = RateLimiter(rate)
+        self._pending: Set[str] = set()
+
+    async def run(self) -> AsyncIterator[AnyMiner]:
+        """Yield each miner once it is identified and registered, until [`cancel()`][pyasic.fleet.MinerOnboarding.cancel] is called."""
+        reports: asyncio.Queue = asyncio.Queue()
+        ready: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+
+        async def listen():
+            try:
+                async for report in self.listener.listen():
+                    mac, ip = report["MAC"], report["IP"]
+                    existing = self.registry.get(mac)
+                    if existing is not None and str(existing.ip) == ip:
+                        continue
+                    if mac in self._pending:
+                        continue
+                    self._pending.add(mac)
+                    reports.put_nowait((mac, ip))
+            finally:
+                reports.put_nowait(None)
+
+        async def identify():
+            try:
+                done = False
+                while not done:
+                    batch, done = await self._next_batch(reports)
+                    if not batch:
+                        continue
+                    await self._limiter.wait(len(batch))
+                    task = asyncio.create_task(
+                        self._identify_batch(batch, semaphore, ready)
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                ready.put_nowait(None)
+
+        listener = asyncio.create_task(listen())
+        identifier = asyncio.create_task(identify())
+        try:
+            while True:
+                miner = await ready.get()
+                if miner is None:
+                    break
+                yield miner
+        finally:
+            listener.cancel()
+            identifier.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def _next_batch(
+        self, reports: asyncio.Queue
+    ) -> Tuple[List[Tuple[str, str]], bool]:
+        # wait for the first report, then collect until the batch is full or the interval passes
+        batch = []
+        report = await reports.get()
+        end = time.monotonic() + self.batch_interval
+        while report is not None:
+            batch.append(report)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                report = await asyncio.wait_for(
+                    reports.get(), max(end - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def _identify_batch(
+        self,
+        batch: List[Tuple[str, str]],
+        semaphore: asyncio.Semaphore,
+        ready: asyncio.Queue,
+    ) -> None:
+        await asyncio.gather(
+            *[self._identify(mac, ip, semaphore, ready) for mac, ip in batch]
+        )
+
+    async def _identify(
+        self, mac: str, ip: str, semaphore: asyncio.Semaphore, ready: asyncio.Queue
+    ) -> None:
+        try:
+            async with semaphore:
+                miner = await self.factory.get_miner(ip)
+            if miner is None:
+                logger.warning("%s - Failed to identify miner with MAC %s", ip, mac)
+                return
+            self.registry.register(mac, miner)
+            ready.put_nowait(miner)
+        except Exception as e:
+            logger.warning("%s - Failed to identify miner with MAC %s: %s", ip, mac, e)
+        finally:
+            self._pending.discard(mac)
+
+    async def cancel(self) -> None:
+        """Stop listening for new miners, miners which are still being identified are still yielded."""
+        await self.listener.cancel()
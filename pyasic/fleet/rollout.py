@@ -0,0 +1,274 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from pyasic.miners.base import AnyMiner, BaseMiner
+from pyasic.misc.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class RolloutStatus(str, Enum):
+    PENDING = "pending"
+    SUCCESS = "success"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass
+class RolloutResult:
+    """The result of upgrading a single miner in a [`FirmwareRollout`][pyasic.fleet.FirmwareRollout].
+
+    Attributes:
+        ip: The IP of the miner.
+        status: The [`RolloutStatus`][pyasic.fleet.rollout.RolloutStatus] of the upgrade.
+        old_fw_ver: The firmware version before the upgrade.
+        new_fw_ver: The firmware version the miner came back with.
+        error: A description of why the upgrade failed, if it did.
+        duration: The time in seconds the upgrade and verification took.
+    """
+
+    ip: str
+    status: RolloutStatus = RolloutStatus.PENDING
+    old_fw_ver: Optional[str] = None
+    new_fw_ver: Optional[str] = None
+    error: Optional[str] = None
+    duration: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> RolloutResult:
+        return cls(**{**data, "status": RolloutStatus(data["status"])})
+
+
+class FirmwareRollout:
+    """Upgrade the firmware of many miners in waves, verifying each one comes back on the new firmware.
+
+    Waves start at `wave_size` miners and double after each wave up to `max_wave_size`,
+    so problems are caught on a few miners before the rest of the site is touched.
+    The rollout halts once more than `max_failures` miners have failed.  Miners which
+    can't be upgraded from a firmware file are skipped and don't count as failures.
+
+    Parameters:
+        miners: The miners to upgrade.
+        file: The firmware file to upgrade to.
+        version: The firmware version the miners should report after the upgrade.  If not set, any change in version counts as success.  Miners already on this version are not upgraded.
+        keep_settings: Whether to keep the miner settings, for miners which support it.
+        wave_size: The number of miners in the first wave.
+        max_wave_size: The largest number of miners in a wave.
+        concurrency: The number of miners upgraded at the same time within a wave, defaults to the wave size.
+        bandwidth_limit: The average upload rate in bytes per second to pace upload starts by, a new upload starts at most every `file size / bandwidth_limit` seconds.  Uploads themselves are not throttled, so uploads which overlap can briefly exceed it.
+        max_failures: The number of failed miners after which the rollout halts.
+        verify_timeout: How long in seconds to wait for a miner to come back on the new firmware.
+        verify_interval: The initial delay in seconds between firmware version checks, doubled after each check.
+        checkpoint: A path to a JSON file used to persist progress, an existing checkpoint is resumed from.
+    """
+
+    def __init__(
+        self,
+        miners: List[AnyMiner],
+        file: Union[str, Path],
+        *,
+        version: str = None,
+        keep_settings: bool = True,
+        wave_size: int = 5,
+        max_wave_size: int = 100,
+        concurrency: int = None,
+        bandwidth_limit: int = None,
+        max_failures: int = 0,
+        verify_timeout: float = 900,
+        verify_interval: float = 10,
+        checkpoint: Union[str, Path] = None,
+    ):
+        self.miners = miners
+        self.file = Path(file)
+        self.version = version
+        self.keep_settings = keep_settings
+        self.wave_size = wave_size
+        self.max_wave_size = max(max_wave_size, wave_size)
+        self.concurrency = concurrency
+        self.max_failures = max_failures
+        self.verify_timeout = verify_timeout
+        self.verify_interval = verify_interval
+        self.checkpoint = Path(checkpoint) if checkpoint is not None else None
+
+        self.results: Dict[str, RolloutResult] = {
+            str(miner.ip): RolloutResult(ip=str(miner.ip)) for miner in miners
+        }
+        self.halted = False
+        self._limiter = RateLimiter(bandwidth_limit)
+        self._load_checkpoint()
+
+    @property
+    def failures(self) -> int:
+        return len(
+            [r for r in self.results.values() if r.status == RolloutStatus.FAILED]
+        )
+
+    async def run(self) -> Dict[str, RolloutResult]:
+        """Run the rollout, resuming from the checkpoint if there is one.
+
+        Returns:
+            A dict of IP to [`RolloutResult`][pyasic.fleet.rollout.RolloutResult] for every miner.
+        """
+        pending = [
+            miner
+            for miner in self.miners
+            if self.results[str(miner.ip)].status == RolloutStatus.PENDING
+        ]
+        wave_size = self.wave_size
+        while pending and not self.halted:
+            wave, pending = pending[:wave_size], pending[wave_size:]
+            semaphore = asyncio.Semaphore(self.concurrency or wave_size)
+            await asyncio.gather(
+                *[self._upgrade_miner(miner, semaphore) for miner in wave]
+            )
+            if self.failures > self.max_failures:
+                logger.error(
+                    "Firmware rollout halted after %s failed upgrades.", self.failures
+                )
+                self.halted = True
+            wave_size = min(wave_size * 2, self.max_wave_size)
+            await self._save_checkpoint()
+
+        for miner in pending:
+            self.results[str(miner.ip)].status = RolloutStatus.SKIPPED
+        await self._save_checkpoint()
+        return self.results
+
+    async def _upgrade_miner(self, miner: AnyMiner, semaphore: asyncio.Semaphore):
+        result = self.results[str(miner.ip)]
+        if not self._supports_file(miner):
+            # not a failure, these miners can't be upgraded from a file at all
+            result.status = RolloutStatus.SKIPPED
+            result.error = "upgrade_firmware does not take a firmware file"
+            logger.warning("%s - Firmware upgrade skipped: %s", miner, result.error)
+            return
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                result.old_fw_ver = await miner.get_fw_ver()
+                if self.version is not None and result.old_fw_ver == self.version:
+                    # already on the target firmware
+                    result.new_fw_ver = result.old_fw_ver
+                else:
+                    await self._limiter.wait(self.file.stat().st_size)
+                    kwargs = self._upgrade_kwargs(miner)
+                    self._check_upgrade(await miner.upgrade_firmware(**kwargs))
+                    result.new_fw_ver = await self._wait_for_upgrade(
+                        miner, result.old_fw_ver
+                    )
+            except Exception as e:
+                result.status = RolloutStatus.FAILED
+                result.error = f"{type(e).__name__}: {e}"
+                logger.warning("%s - Firmware upgrade failed: %s", miner, result.error)
+            else:
+                result.status = RolloutStatus.SUCCESS
+            result.duration = time.monotonic() - start
+
+    @staticmethod
+    def _check_upgrade(response) -> None:
+        # backends raise on a failed upgrade, or report it with False or {"success": False}
+        if response is False:
+            raise RuntimeError("upgrade_firmware returned False")
+        if isinstance(response, dict) and response.get("success") is False:
+            raise RuntimeError(f"upgrade_firmware failed: {response}")
+
+    @staticmethod
+    def _supports_file(miner: AnyMiner) -> bool:
+        if type(miner).upgrade_firmware is BaseMiner.upgrade_firmware:
+            return False
+        return "file" in inspect.signature(miner.upgrade_firmware).parameters
+
+    def _upgrade_kwargs(self, miner: AnyMiner) -> dict:
+        params = inspect.signature(miner.upgrade_firmware).parameters
+        kwargs = {"file": self.file}
+        if "keep_settings" in params:
+            kwargs["keep_settings"] = self.keep_settings
+        if self.version is not None and "version" in params:
+            kwargs["version"] = self.version
+        return kwargs
+
+    async def _wait_for_upgrade(
+        self, miner: AnyMiner, old_fw_ver: Optional[str]
+    ) -> str:
+        deadline = time.monotonic() + self.verify_timeout
+        delay = self.verify_interval
+        while True:
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            try:
+                fw_ver = await miner.get_fw_ver()
+            except Exception:
+                # the miner is most likely still rebooting
+                fw_ver = None
+            if fw_ver is not None:
+                if self.version is not None and fw_ver == self.version:
+                    return fw_ver
+                if self.version is None and fw_ver != old_fw_ver:
+                    return fw_ver
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Miner did not come back on the new firmware (reported {fw_ver})"
+                )
+            delay = min(delay * 2, 60)
+
+    def _load_checkpoint(self) -> None:
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return
+        with open(self.checkpoint) as f:
+            data = json.load(f)
+        for ip, result in data.get("results", {}).items():
+            if ip not in self.results:
+                continue
+            result = RolloutResult.from_dict(result)
+            # only successful upgrades are kept, everything else is retried on resume
+            if result.status == RolloutStatus.SUCCESS:
+                self.results[ip] = result
+
+    async def _save_checkpoint(self) -> None:
+        if self.checkpoint is None:
+            return
+        data = {
+            "file": str(self.file),
+            "version": self.version,
+            "halted": self.halted,
+            "results": {ip: asdict(r) for ip, r in self.results.items()},
+        }
+        # serializing thousands of results blocks, so it is done off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write_checkpoint, self.checkpoint, data
+        )
+
+    @staticmethod
+    def _write_checkpoint(path: Path, data: dict) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        # replaced in one step, so an interrupted write never leaves a partial checkpoint
+        os.replace(tmp, path)
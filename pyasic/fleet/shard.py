@@ -0,0 +1,390 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import statistics
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pyasic import settings
+from pyasic.data import MinerData
+from pyasic.miners.base import AnyMiner
+from pyasic.miners.factory import miner_factory
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShardStats:
+    """How one shard of a [`ShardedPoller`][pyasic.fleet.ShardedPoller] did in the last poll.
+
+    Attributes:
+        shard: The index of the shard.
+        miners: The number of miners assigned to the shard.
+        polled: The number of miners which returned data.
+        failed: The IPs of miners which could not be identified or polled.
+        seconds: The time in seconds the shard took to poll all of its miners.
+        error: A description of why the shard failed, if its worker process died.
+    """
+
+    shard: int
+    miners: int = 0
+    polled: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Miners polled per second, or `None` if the shard had no work."""
+        if not self.miners or self.seconds <= 0:
+            return None
+        return self.miners / self.seconds
+
+
+def _pack(data: List[MinerData]) -> bytes:
+    return zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL), 1)
+
+
+def _unpack(data: bytes) -> List[MinerData]:
+    return pickle.loads(zlib.decompress(data))
+
+
+def _balance(assignments: List[List[str]], stats: List[ShardStats]) -> bool:
+    """Move miners from slow shards to fast ones, in proportion to how fast each shard polled.
+
+    Returns whether any miners were moved.
+    """
+    rates = [s.rate for s in stats]
+    known = [r for r in rates if r is not None]
+    if not known:
+        return False
+    # shards without work are assumed to be as fast as the fastest shard
+    rates = [r if r is not None else max(known) for r in rates]
+    total = sum(len(a) for a in assignments)
+    targets = [int(total * r / sum(rates)) for r in rates]
+    # hand out the miners lost to rounding to the fastest shards
+    for idx in sorted(range(len(rates)), key=lambda i: -rates[i])[
+        : total - sum(targets)
+    ]:
+        targets[idx] += 1
+
+    spare = []
+    for assigned, target in zip(assignments, targets):
+        while len(assigned) > target:
+            spare.append(assigned.pop())
+    if not spare:
+        return False
+    for assigned, target in zip(assignments, targets):
+        while len(assigned) < target:
+            assigned.append(spare.pop())
+    return True
+
+
+async def _poll_shard(
+    conn,
+    miners: Dict[str, AnyMiner],
+    ips: List[str],
+    options: dict,
+    concurrency: int,
+    chunk_size: int,
+) -> None:
+    start = time.perf_counter()
+    # forget miners which were moved to other shards
+    assigned = set(ips)
+    for ip in list(miners):
+        if ip not in assigned:
+            del miners[ip]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def poll(ip: str) -> Tuple[str, Optional[MinerData]]:
+        async with semaphore:
+            try:
+                miner = miners.get(ip)
+                if miner is None:
+                    miner = await miner_factory.get_miner(ip)
+                    if miner is None:
+                        return ip, None
+                    miners[ip] = miner
+                return ip, await miner.get_data(**options)
+            except Exception as e:
+                logger.warning("%s - Failed to poll miner: %s", ip, e)
+                return ip, None
+
+    polled = 0
+    failed = []
+    batch = []
+    for task in asyncio.as_completed([poll(ip) for ip in ips]):
+        ip, data = await task
+        if data is None:
+            failed.append(ip)
+            continue
+        polled += 1
+        batch.append(data)
+        if len(batch) >= chunk_size:
+            conn.send(("data", _pack(batch)))
+            batch = []
+    if batch:
+        conn.send(("data", _pack(batch)))
+    conn.send(("done", polled, failed, time.perf_counter() - start))
+
+
+def _run_shard(conn, options: dict) -> None:
+    """The main function of a shard worker process."""
+    for key, val in options.items():
+        settings.update(key, val)
+    # one loop for the life of the worker, so connection pools are kept between polls
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    miners: Dict[str, AnyMiner] = {}
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if msg is None:
+                break
+            loop.run_until_complete(_poll_shard(conn, miners, *msg))
+    finally:
+        # detection leaves slow probes running in the background, clean those up
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+        conn.close()
+
+
+class _Shard:
+    def __init__(self, index: int, ctx):
+        self.index = index
+        parent, child = ctx.Pipe()
+        self.conn = parent
+        self.process = ctx.Process(
+            target=_run_shard,
+            args=(child, dict(settings._settings)),
+            name=f"pyasic-shard-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def recv(self) -> tuple:
+        msg = self.conn.recv()
+        if msg[0] == "data":
+            return "data", _unpack(msg[1])
+        return msg
+
+    def stop(self, timeout: float) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class ShardedPoller:
+    """Poll a large fleet from several worker processes, each with its own event loop and connection pools.
+
+    The miners are split between `shards` worker processes, which identify their miners once and
+    keep them between polls.  Data is streamed back to this process in compressed batches as it
+    is gathered, so parsing and building [`MinerData`][pyasic.data.MinerData] is spread across cores.
+
+    After each poll, if the slowest shard took more than `rebalance` times as long as the median
+    shard, miners are moved between shards in proportion to how fast each shard got through its miners.
+
+    Worker processes are spawned, so scripts using this have to guard their entry point with
+    `if __name__ == "__main__":`.  Settings are copied to the workers when they are started.
+
+    Parameters:
+        ips: The IPs of the miners to poll.
+        shards: The number of worker processes, defaults to the number of CPUs.
+        concurrency: The number of miners each shard polls at the same time.
+        chunk_size: The number of results sent back to this process at once.
+        rebalance: The ratio of slowest to median shard time over which miners are rebalanced, `None` to never rebalance.
+        include: Names of data items to gather, passed to `get_data()`.
+        exclude: Names of data items to exclude, passed to `get_data()`.
+        deadline: The time budget in seconds for getting data from each miner, passed to `get_data()`.
+        capture_errors: Passed to `get_data()`, returns partial data instead of failing the miner.
+        mp_context: The multiprocessing context, or start method name, to start workers with.
+    """
+
+    def __init__(
+        self,
+        ips: Iterable[str],
+        shards: int = None,
+        concurrency: int = 500,
+        chunk_size: int = 200,
+        rebalance: Optional[float] = 1.25,
+        include: List[str] = None,
+        exclude: List[str] = None,
+        deadline: float = None,
+        capture_errors: bool = True,
+        mp_context: Any = "spawn",
+    ):
+        ips = [str(ip) for ip in ips]
+        if shards is None:
+            shards = os.cpu_count() or 1
+        shards = max(1, min(shards, len(ips)))
+        # round robin, so each shard gets a slice of every subnet
+        self.assignments: List[List[str]] = [ips[i::shards] for i in range(shards)]
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.rebalance = rebalance
+        self.options = {
+            "include": include,
+            "exclude": exclude,
+            "deadline": deadline,
+            "capture_errors": capture_errors,
+        }
+        if isinstance(mp_context, str):
+            mp_context = multiprocessing.get_context(mp_context)
+        self._ctx = mp_context
+        self._shards: List[Optional[_Shard]] = [None] * shards
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats: List[ShardStats] = []
+
+    def __len__(self) -> int:
+        return sum(len(a) for a in self.assignments)
+
+    async def __aenter__(self) -> ShardedPoller:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Start the worker processes which are not running yet."""
+        if self._executor is None:
+            # each shard blocks one thread while waiting on its pipe
+            self._executor = ThreadPoolExecutor(
+                len(self._shards), thread_name_prefix="pyasic-shard"
+            )
+        loop = asyncio.get_running_loop()
+        for idx, shard in enumerate(self._shards):
+            if shard is None or not shard.alive:
+                self._shards[idx] = await loop.run_in_executor(
+                    self._executor, _Shard, idx, self._ctx
+                )
+
+    async def stop(self, timeout: float = 5) -> None:
+        """Stop the worker processes."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *[
+                loop.run_in_executor(self._executor, shard.stop, timeout)
+                for shard in self._shards
+                if shard is not None
+            ]
+        )
+        self._shards = [None] * len(self._shards)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def poll(self) -> Dict[str, MinerData]:
+        """Poll every miner once.
+
+        Returns:
+            The data of each miner which returned data, keyed by IP.
+        """
+        return {data.ip: data async for data in self.poll_iter()}
+
+    async def poll_iter(self) -> AsyncIterator[MinerData]:
+        """Poll every miner once, yielding data as soon as it reaches this process.
+
+        The number of miners polled and the IPs which failed are in `stats` afterwards.
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        stats = [
+            ShardStats(shard=idx, miners=len(assigned))
+            for idx, assigned in enumerate(self.assignments)
+        ]
+
+        async def run(shard: _Shard, assigned: List[str], stat: ShardStats) -> None:
+            try:
+                shard.conn.send(
+                    (assigned, self.options, self.concurrency, self.chunk_size)
+                )
+                while True:
+                    msg = await loop.run_in_executor(self._executor, shard.recv)
+                    if msg[0] == "done":
+                        _, stat.polled, stat.failed, stat.seconds = msg
+                        return
+                    for data in msg[1]:
+                        results.put_nowait(data)
+            except EOFError:
+                # the worker is restarted on the next poll
+                logger.error("Shard %s worker exited", shard.index)
+                stat.error = "Worker exited"
+                stat.failed = list(assigned)
+            except OSError as e:
+                logger.error("Shard %s worker failed: %s", shard.index, e)
+                stat.error = f"{type(e).__name__}: {e}"
+                stat.failed = list(assigned)
+            finally:
+                results.put_nowait(None)
+
+        tasks = [
+            asyncio.create_task(run(shard, assigned, stat))
+            for shard, assigned, stat in zip(self._shards, self.assignments, stats)
+        ]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                data = await results.get()
+                if data is None:
+                    remaining -= 1
+                    continue
+                yield data
+        finally:
+            # a worker has to finish sending before it can take the next poll
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.stats = stats
+
+        # a shard which failed says nothing about how fast its miners are
+        if self.rebalance is not None and not any(s.error for s in stats):
+            times = [s.seconds for s in stats if s.miners]
+            if len(times) > 1 and max(times) > self.rebalance * statistics.median(
+                times
+            ):
+                if _balance(self.assignments, stats):
+                    logger.debug(
+                        "Rebalanced shards to %s miners",
+                        [len(a) for a in self.assignments],
+                    )
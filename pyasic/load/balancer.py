@@ -0,0 +1,311 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Tuple, Union
+
+from pyasic.data import MinerData
+from pyasic.errors import APIError
+from pyasic.miners import AnyMiner
+from pyasic.miners.backends import AntminerModern, BOSMiner, BTMiner
+from pyasic.miners.data import DataOptions
+from pyasic.miners.device.models import (
+    S9,
+    S17,
+    T17,
+    S17e,
+    S17Plus,
+    S17Pro,
+    T17e,
+    T17Plus,
+)
+
+logger = logging.getLogger(__name__)
+
+FAN_USAGE = 50  # 50 W per fan
+
+# the only data needed to plan setpoints
+BALANCE_DATA = [
+    DataOptions.HASHRATE,
+    DataOptions.WATTAGE,
+    DataOptions.WATTAGE_LIMIT,
+    DataOptions.HASHBOARDS,
+]
+
+
+class SetpointAction(str, Enum):
+    ON = "on"
+    OFF = "off"
+    TUNE = "tune"
+    FIXED = "fixed"
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass
+class MinerSetpoint:
+    """The planned setpoint of a single miner in a [`BalancePlan`][pyasic.load.BalancePlan].
+
+    Attributes:
+        miner: The miner.
+        action: The [`SetpointAction`][pyasic.load.SetpointAction] to take on the miner.
+        wattage: The expected power draw of the miner after the action.
+        efficiency: The efficiency of the miner in J/TH used to rank it, if it could be measured.
+        reason: Why this setpoint was chosen.
+    """
+
+    miner: AnyMiner
+    action: SetpointAction
+    wattage: int
+    efficiency: Optional[float] = None
+    reason: str = ""
+
+    async def apply(self) -> None:
+        if self.action == SetpointAction.ON:
+            await self.miner.resume_mining()
+        elif self.action == SetpointAction.OFF:
+            await self.miner.stop_mining()
+        elif self.action == SetpointAction.TUNE:
+            await self.miner.resume_mining()
+            await self.miner.set_power_limit(self.wattage)
+
+
+@dataclass
+class BalancePlan:
+    """The setpoints planned to bring a phase to a target wattage.
+
+    Attributes:
+        target: The target wattage of the phase.
+        setpoints: The [`MinerSetpoint`][pyasic.load.MinerSetpoint] of each miner in the phase.
+    """
+
+    target: int
+    setpoints: List[MinerSetpoint] = field(default_factory=list)
+
+    @property
+    def wattage(self) -> int:
+        """The expected total power draw of the phase after the plan is applied."""
+        return sum(s.wattage for s in self.setpoints)
+
+    def explain(self) -> str:
+        """Describe the plan, one line per miner."""
+        lines = [f"Target {self.target}W, planned {self.wattage}W"]
+        for s in self.setpoints:
+            lines.append(f"{s.miner.ip}: {s.action} {s.wattage}W - {s.reason}")
+        return "\n".join(lines)
+
+    async def apply(self) -> int:
+        """Apply the setpoints to the miners.
+
+        Returns:
+            The expected total power draw of the phase.
+        """
+        await asyncio.gather(*[s.apply() for s in self.setpoints])
+        return self.wattage
+
+
+class MinerLoadBalancer:
+    """A load balancer for miners.  Can be passed a list of `AnyMiner`, or a list of phases (lists of `AnyMiner`)."""
+
+    def __init__(
+        self,
+        phases: Union[List[List[AnyMiner]], None] = None,
+    ):
+        self.phases = [_MinerPhaseBalancer(phase) for phase in phases]
+
+    async def plan(
+        self,
+        wattage: int,
+        data: Optional[Dict[str, Union[MinerData, BaseException]]] = None,
+    ) -> List[BalancePlan]:
+        """Plan the setpoints for each phase to reach a total wattage, without applying them.
+
+        Parameters:
+            wattage: The total wattage to split evenly between the phases.
+            data: Data already gathered from the miners with `BALANCE_DATA`, keyed by IP, so they don't have to be polled again.
+
+        Returns:
+            A [`BalancePlan`][pyasic.load.BalancePlan] for each phase.
+        """
+        phase_wattage = wattage // len(self.phases)
+        return list(
+            await asyncio.gather(
+                *[
+                    phase.get_balance_setpoints(phase_wattage, data)
+                    for phase in self.phases
+                ]
+            )
+        )
+
+    async def balance(self, wattage: int) -> int:
+        plans = await self.plan(wattage)
+        return sum(await asyncio.gather(*[plan.apply() for plan in plans]))
+
+
+@dataclass
+class _BalancedMiner:
+    miner: AnyMiner
+    tune: bool
+    shutdown: bool
+    max: int
+    min: int
+
+
+class _MinerPhaseBalancer:
+    def __init__(self, miners: List[AnyMiner]):
+        self.miners: Dict[str, _BalancedMiner] = {
+            str(miner.ip): self._get_limits(miner) for miner in miners
+        }
+
+    @staticmethod
+    def _get_limits(miner: AnyMiner) -> _BalancedMiner:
+        fan_wattage = miner.expected_fans * FAN_USAGE
+        if (
+            isinstance(miner, BTMiner)
+            and not (miner.raw_model.startswith("M2") if miner.raw_model else True)
+        ) or isinstance(miner, BOSMiner):
+            if isinstance(miner, S9):
+                return _BalancedMiner(miner, True, True, 1400, fan_wattage)
+            if isinstance(miner, (S17, S17Plus, S17Pro, S17e, T17, T17Plus, T17e)):
+                return _BalancedMiner(miner, True, True, 2400, fan_wattage)
+            return _BalancedMiner(miner, True, True, 3600, fan_wattage)
+        if isinstance(miner, AntminerModern):
+            return _BalancedMiner(miner, False, True, 3600, fan_wattage)
+        if isinstance(miner, BTMiner):
+            if miner.raw_model and miner.raw_model.startswith("M2"):
+                return _BalancedMiner(miner, False, True, 2400, fan_wattage)
+            return _BalancedMiner(miner, False, True, 3600, fan_wattage)
+        return _BalancedMiner(miner, False, False, 3600, 3600)
+
+    async def balance(self, wattage: int) -> int:
+        plan = await self.get_balance_setpoints(wattage)
+        return await plan.apply()
+
+    async def get_balance_setpoints(
+        self,
+        wattage: int,
+        data: Optional[Dict[str, Union[MinerData, BaseException]]] = None,
+    ) -> BalancePlan:
+        if data is not None:
+            return self._plan(wattage, {ip: data.get(ip) for ip in self.miners})
+        data = await asyncio.gather(
+            *[m.miner.get_data(include=BALANCE_DATA) for m in self.miners.values()],
+            return_exceptions=True,
+        )
+        return self._plan(wattage, dict(zip(self.miners, data)))
+
+    def _plan(self, wattage: int, data: Dict[str, MinerData]) -> BalancePlan:
+        """Plan setpoints greedily by efficiency.
+
+        Miners which can't be controlled are fixed at their measured draw, and every
+        controllable miner starts off at its idle draw.  Miners are then turned on from
+        most to least efficient while they fit in the wattage, at their lowest draw (half
+        of max for tuners, max otherwise).  The remaining wattage is split evenly
+        between the tuners which are on, up to their max.
+        """
+        plan = BalancePlan(target=wattage)
+        fixed: List[MinerSetpoint] = []
+        # each controllable setpoint is kept with the limits of its miner
+        controllable: List[Tuple[MinerSetpoint, _BalancedMiner]] = []
+
+        for ip, limit in self.miners.items():
+            d = data.get(ip)
+            if isinstance(d, BaseException):
+                logger.warning("%s - Failed to get balance data: %s", limit.miner, d)
+                d = None
+            # idle miners report 0 J/TH, which would rank them as the most efficient
+            efficiency = d.efficiency if d is not None and d.efficiency else None
+
+            if not (limit.tune or limit.shutdown):
+                # cant do anything with it, so use a semi-accurate power draw
+                draw = limit.max
+                if d is not None and d.wattage_limit is not None:
+                    draw = int(d.wattage_limit)
+                elif d is not None and d.wattage is not None:
+                    draw = int(d.wattage)
+                fixed.append(
+                    MinerSetpoint(
+                        limit.miner,
+                        SetpointAction.FIXED,
+                        draw,
+                        efficiency,
+                        "cannot be tuned or shut down",
+                    )
+                )
+                continue
+
+            setpoint = MinerSetpoint(
+                limit.miner, SetpointAction.OFF, limit.min, efficiency
+            )
+            controllable.append((setpoint, limit))
+
+        max_wattage = sum(s.wattage for s in fixed) + sum(
+            limit.max for _, limit in controllable
+        )
+        if wattage > max_wattage:
+            raise APIError(
+                f"Wattage setpoint is too high, setpoint: {wattage}W, max: {max_wattage}W"
+            )
+        budget = (
+            wattage
+            - sum(s.wattage for s in fixed)
+            - sum(s.wattage for s, _ in controllable)
+        )
+        if budget < 0:
+            raise APIError(
+                f"Wattage setpoint is too low, setpoint: {wattage}W, min: {wattage - budget}W"
+            )
+
+        # most efficient first, unknown efficiency last, larger miners first on ties
+        ranked = sorted(
+            controllable,
+            key=lambda c: (
+                c[0].efficiency is None,
+                c[0].efficiency or 0,
+                -c[1].max,
+            ),
+        )
+        tuners: List[Tuple[MinerSetpoint, _BalancedMiner]] = []
+        for rank, (setpoint, limit) in enumerate(ranked, start=1):
+            lowest = limit.max // 2 if limit.tune else limit.max
+            cost = lowest - limit.min
+            if cost > budget:
+                setpoint.reason = f"efficiency rank {rank}, {lowest}W does not fit in the remaining {budget}W"
+                continue
+            budget -= cost
+            setpoint.wattage = lowest
+            if limit.tune:
+                setpoint.action = SetpointAction.TUNE
+                tuners.append((setpoint, limit))
+            else:
+                setpoint.action = SetpointAction.ON
+                setpoint.reason = f"efficiency rank {rank}, fits at full power"
+
+        # fill the tuners evenly, the ones with less headroom fill up first
+        tuners.sort(key=lambda c: c[1].max - c[0].wattage)
+        for idx, (setpoint, limit) in enumerate(tuners):
+            share = budget // (len(tuners) - idx)
+            added = min(share, limit.max - setpoint.wattage)
+            setpoint.wattage += added
+            budget -= added
+            setpoint.reason = f"tuned to {setpoint.wattage}W of {limit.max}W max"
+
+        plan.setpoints = fixed + [s for s, _ in controllable]
+        return plan
@@ -0,0 +1,245 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+from pyasic.data import MinerData
+from pyasic.errors import APIError
+from pyasic.load.balancer import (
+    BALANCE_DATA,
+    MinerLoadBalancer,
+    MinerSetpoint,
+    SetpointAction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ControlStep:
+    """The outcome of a single iteration of a [`PowerController`][pyasic.load.PowerController].
+
+    Attributes:
+        target: The wattage target at the time of the step.
+        measured: The total wattage measured from the miners.
+        planned: The total wattage of the plan the step applied, or `None` if the measured wattage was already within the deadband or the target couldn't be planned.
+        changed: The number of miners a new setpoint was sent to.
+        deferred: The number of miners which needed a new setpoint, but were changed too recently.
+    """
+
+    target: int
+    measured: int
+    planned: Optional[int] = None
+    changed: int = 0
+    deferred: int = 0
+
+    @property
+    def error(self) -> int:
+        return self.target - self.measured
+
+
+class PowerController:
+    """Keep the draw of a set of miners at a target wattage, using a [`MinerLoadBalancer`][pyasic.load.MinerLoadBalancer].
+
+    Every `interval` seconds the draw of every miner is measured, and if the total is outside of the
+    deadband the difference is added to a correction which is applied on top of the target when
+    planning, to make up for miners not drawing exactly what they were set to.  The correction is
+    only updated once the miners run the setpoints planned for the current target, so it is reset
+    and left alone on the step where the target changes, and held while any change is deferred.
+    Only miners whose
+    planned setpoint changed are sent a new one, and a miner is not changed again within
+    `min_change_interval` seconds.  Any step in the target is reached within
+    `min_change_interval + interval` seconds, minus the time the miners take to ramp.
+
+    Parameters:
+        balancer: The balancer used to plan setpoints.
+        target: The wattage to track, either a number or a function returning the current target.
+        interval: The time in seconds between iterations.
+        min_change_interval: The minimum time in seconds between changes of a single miner.
+        deadband: The fraction of the target the measured draw can be off by without a correction.
+        gain: The fraction of the error added to the correction each iteration.
+        max_correction: The largest correction as a fraction of the target.
+        min_step: The smallest change in wattage sent to a tuned miner.
+    """
+
+    def __init__(
+        self,
+        balancer: MinerLoadBalancer,
+        target: Union[int, Callable[[], int]],
+        interval: float = 30,
+        min_change_interval: float = 120,
+        deadband: float = 0.02,
+        gain: float = 0.5,
+        max_correction: float = 0.2,
+        min_step: int = 50,
+    ):
+        self.balancer = balancer
+        self.target = target
+        self.interval = interval
+        self.min_change_interval = min_change_interval
+        self.deadband = deadband
+        self.gain = gain
+        self.max_correction = max_correction
+        self.min_step = min_step
+
+        self.correction = 0
+        self._applied: Dict[str, MinerSetpoint] = {}
+        self._changed_at: Dict[str, float] = {}
+        self._last_target: Optional[int] = None
+        self._stop = asyncio.Event()
+
+    @property
+    def miners(self) -> list:
+        return [
+            m.miner for phase in self.balancer.phases for m in phase.miners.values()
+        ]
+
+    def get_target(self) -> int:
+        return int(self.target() if callable(self.target) else self.target)
+
+    async def run(self) -> None:
+        """Run the control loop until [`stop()`][pyasic.load.PowerController.stop] is called."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                await self.step()
+            except Exception as e:
+                logger.error("Power controller step failed: %s", e)
+            remaining = self.interval - (time.monotonic() - started)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        """Stop the control loop after the current iteration."""
+        self._stop.set()
+
+    async def step(self) -> ControlStep:
+        """Run a single iteration of the control loop.
+
+        Returns:
+            A [`ControlStep`][pyasic.load.controller.ControlStep] describing what was measured and changed.
+        """
+        target = self.get_target()
+        target_changed = target != self._last_target
+        if target_changed:
+            # the correction was built for the old target
+            self.correction = 0
+            self._last_target = target
+
+        data = await self._poll()
+        for ip in [ip for ip in self._applied if ip not in data]:
+            # the miner was removed from the balancer
+            del self._applied[ip]
+        for ip in [ip for ip in self._changed_at if ip not in data]:
+            del self._changed_at[ip]
+        measured = self._total(data)
+        result = ControlStep(target=target, measured=measured)
+        settled = not target_changed and bool(self._applied)
+        if settled and abs(result.error) <= target * self.deadband:
+            return result
+
+        # the error only reflects the plan once the miners run the setpoints planned for this target
+        previous = self.correction
+        if settled:
+            limit = target * self.max_correction
+            self.correction = max(
+                -limit, min(limit, self.correction + self.gain * result.error)
+            )
+        try:
+            plans = await self.balancer.plan(round(target + self.correction), data)
+        except APIError as e:
+            # the correction pushed the plan out of range, so plan without it
+            logger.warning("Power controller correction out of range: %s", e)
+            self.correction = previous = 0
+            try:
+                plans = await self.balancer.plan(target, data)
+            except APIError as e:
+                logger.error("Power controller target out of range: %s", e)
+                return result
+        result.planned = sum(plan.wattage for plan in plans)
+
+        now = time.monotonic()
+        changes: List[MinerSetpoint] = []
+        for setpoint in [s for plan in plans for s in plan.setpoints]:
+            ip = str(setpoint.miner.ip)
+            if not self._needs_change(setpoint):
+                continue
+            changed_at = self._changed_at.get(ip)
+            if changed_at is not None and now - changed_at < self.min_change_interval:
+                result.deferred += 1
+                continue
+            changes.append(setpoint)
+
+        applied = await asyncio.gather(
+            *[s.apply() for s in changes], return_exceptions=True
+        )
+        for setpoint, error in zip(changes, applied):
+            ip = str(setpoint.miner.ip)
+            if isinstance(error, BaseException):
+                logger.warning(
+                    "%s - Failed to apply setpoint: %s", setpoint.miner, error
+                )
+                continue
+            self._applied[ip] = setpoint
+            self._changed_at[ip] = now
+            result.changed += 1
+        if result.deferred:
+            # the plan couldn't be applied in full, so hold the correction instead of winding it up
+            self.correction = previous
+        return result
+
+    def _needs_change(self, setpoint: MinerSetpoint) -> bool:
+        if setpoint.action == SetpointAction.FIXED:
+            return False
+        applied = self._applied.get(str(setpoint.miner.ip))
+        if applied is None or applied.action != setpoint.action:
+            return True
+        if setpoint.action == SetpointAction.TUNE:
+            return abs(applied.wattage - setpoint.wattage) >= self.min_step
+        return False
+
+    async def measure(self) -> int:
+        """Measure the total draw of the miners, using the last applied setpoint for any miner that can't be read."""
+        return self._total(await self._poll())
+
+    async def _poll(self) -> Dict[str, Union[MinerData, BaseException]]:
+        # the same data is used to measure and to plan, so each miner is only polled once per step
+        miners = self.miners
+        data = await asyncio.gather(
+            *[miner.get_data(include=BALANCE_DATA) for miner in miners],
+            return_exceptions=True,
+        )
+        return {str(miner.ip): d for miner, d in zip(miners, data)}
+
+    def _total(self, data: Dict[str, Union[MinerData, BaseException]]) -> int:
+        total = 0
+        for ip, d in data.items():
+            wattage = None
+            if not isinstance(d, BaseException) and d is not None:
+                wattage = d.wattage
+            if wattage is None:
+                applied = self._applied.get(ip)
+                wattage = applied.wattage if applied is not None else 0
+            total += wattage
+        return int(total)
@@ -13,34 +13,31 @@
 #  See the License for the specific language governing permissions and         -
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
-
 import logging
 
+LOG_FORMAT = "%(pathname)s:%(lineno)d in %(funcName)s\n[%(levelname)s][%(asctime)s](%(name)s) - %(message)s"
 
-def init_logger():
-    # if PyasicSettings().logfile:
-    #     logging.basicConfig(
-    #         filename="logfile.txt",
-    #         filemode="a",
-    #         format="%(pathname)s:%(lineno)d in %(funcName)s\n[%(levelname)s][%(asctime)s](%(name)s) - %(message)s",
-    #         datefmt="%x %X",
-    #     )
-    # else:
-    logging.basicConfig(
-        format="%(pathname)s:%(lineno)d in %(funcName)s\n[%(levelname)s][%(asctime)s](%(name)s) - %(message)s",
-        datefmt="%x %X",
-    )
+# every module logs to a child of this logger (`logging.getLogger(__name__)`),
+# so applications can configure all of pyasic through it.
+logger = logging.getLogger("pyasic")
 
-    _logger = logging.getLogger()
 
-    # if PyasicSettings().debug:
-    #     _logger.setLevel(logging.DEBUG)
-    #     logging.getLogger("asyncssh").setLevel(logging.DEBUG)
-    # else:
-    _logger.setLevel(logging.WARNING)
-    logging.getLogger("asyncssh").setLevel(logging.WARNING)
+def init_logger(level: int = logging.WARNING) -> logging.Logger:
+    """Send pyasic log records to stderr in the pyasic log format.
 
-    return _logger
+    pyasic does not configure logging on import, this is an opt-in helper for
+    scripts that do not set up logging themselves.
 
+    Parameters:
+        level: The level to log at.
 
-logger = init_logger()
+    Returns:
+        The `pyasic` logger.
+    """
+    if not any(getattr(h, "_pyasic", False) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt="%x %X"))
+        handler._pyasic = True
+        logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
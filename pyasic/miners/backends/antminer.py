@@ -36,6 +36,8 @@ from pyasic.rpc.antminer import AntminerRPCAPI
 from pyasic.ssh.antminer import AntminerModernSSH
 from pyasic.web.antminer import AntminerModernWebAPI, AntminerOldWebAPI
 
+logger = logging.getLogger(__name__)
+
 ANTMINER_MODERN_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -113,7 +115,7 @@ class AntminerModern(BMMiner):
             self.config = MinerConfig.from_am_modern(data)
         return self.config
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         self.config = config
         await self.web.set_miner_conf(config.as_am_modern(user_suffix=user_suffix))
         # if data:
@@ -146,17 +148,18 @@ class AntminerModern(BMMiner):
             )
 
             if result.get("success"):
-                logging.info(
+                logger.info(
                     "Firmware upgrade process completed successfully for AntMiner."
                 )
                 return "Firmware upgrade completed successfully."
             else:
                 error_message = result.get("message", "Unknown error")
-                logging.error(f"Firmware upgrade failed. Response: {error_message}")
-                return f"Firmware upgrade failed. Response: {error_message}"
+                logger.error("Firmware upgrade failed. Response: %s", error_message)
+                raise APIError(f"Firmware upgrade failed. Response: {error_message}")
         except Exception as e:
-            logging.error(
-                f"An error occurred during the firmware upgrade process: {e}",
+            logger.error(
+                "An error occurred during the firmware upgrade process: %s",
+                e,
                 exc_info=True,
             )
             raise
@@ -183,13 +186,13 @@ class AntminerModern(BMMiner):
 
     async def stop_mining(self) -> bool:
         cfg = await self.get_config()
-        cfg.miner_mode = MiningModeConfig.sleep
+        cfg.mining_mode = MiningModeConfig.sleep()
         await self.send_config(cfg)
         return True
 
     async def resume_mining(self) -> bool:
         cfg = await self.get_config()
-        cfg.miner_mode = MiningModeConfig.normal
+        cfg.mining_mode = MiningModeConfig.normal()
         await self.send_config(cfg)
         return True
 
@@ -486,7 +489,7 @@ class AntminerOld(CGMiner):
             self.config = MinerConfig.from_am_old(data)
         return self.config
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         self.config = config
         await self.web.set_miner_conf(config.as_am_old(user_suffix=user_suffix))
 
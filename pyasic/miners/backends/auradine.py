@@ -31,6 +31,8 @@ from pyasic.miners.device.firmware import StockFirmware
 from pyasic.rpc.gcminer import GCMinerRPCAPI
 from pyasic.web.auradine import AuradineWebAPI
 
+logger = logging.getLogger(__name__)
+
 AURADINE_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -181,12 +183,12 @@ class Auradine(StockFirmware):
             web_conf = await self.web.multicommand("pools", "mode", "fan")
             return MinerConfig.from_auradine(web_conf=web_conf)
         except APIError as e:
-            logging.warning(e)
+            logger.warning(e)
         except LookupError:
             pass
         return MinerConfig()
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         self.config = config
 
         conf = config.as_auradine(user_suffix=user_suffix)
@@ -213,7 +215,7 @@ class Auradine(StockFirmware):
             bool: True if the firmware upgrade was successful, False otherwise.
         """
         try:
-            logging.info("Starting firmware upgrade process.")
+            logger.info("Starting firmware upgrade process.")
 
             if not url and not version:
                 raise ValueError(
@@ -226,16 +228,16 @@ class Auradine(StockFirmware):
                 result = await self.web.firmware_upgrade(version=version)
 
             if result.get("STATUS", [{}])[0].get("STATUS") == "S":
-                logging.info("Firmware upgrade process completed successfully.")
+                logger.info("Firmware upgrade process completed successfully.")
                 return True
             else:
-                logging.error(
+                logger.error(
                     f"Firmware upgrade failed: {result.get('error', 'Unknown error')}"
                 )
                 return False
 
         except Exception as e:
-            logging.error(
+            logger.error(
                 f"An error occurred during the firmware upgrade process: {str(e)}"
             )
             return False
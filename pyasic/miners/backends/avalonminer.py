@@ -14,13 +14,13 @@
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
 
-import re
 from typing import List, Optional
 
 from pyasic.data import AlgoHashRate, Fan, HashBoard, HashUnit
 from pyasic.errors import APIError
 from pyasic.miners.backends.cgminer import CGMiner
 from pyasic.miners.data import DataFunction, DataLocations, DataOptions, RPCAPICommand
+from pyasic.misc.parse_cache import parse_once
 
 AVALON_DATA_LOC = DataLocations(
     **{
@@ -113,33 +113,31 @@ class AvalonMiner(CGMiner):
         return False
 
     @staticmethod
-    def parse_stats(stats):
-        _stats_items = re.findall(".+?\\[*?]", stats)
-        stats_items = []
+    @parse_once
+    def parse_stats(stats: str) -> dict:
         stats_dict = {}
-        for item in _stats_items:
+        pos = 0
+        # each item runs up to and including the next "]", and can't span lines
+        while True:
+            close = stats.find("]", pos + 1)
+            if close == -1:
+                break
+            newline = stats.find("\n", pos, close)
+            if newline != -1:
+                pos = newline + 1
+                continue
+            item = stats[pos : close + 1]
+            pos = close + 1
+
             if ": " in item:
-                data = item.replace("]", "").split("[")
-                data_list = [i.split(": ") for i in data[1].strip().split(", ")]
-                data_dict = {}
-                try:
-                    for key, val in [tuple(item) for item in data_list]:
-                        data_dict[key] = val
-                except ValueError:
-                    # --avalon args
-                    for arg_item in data_list:
-                        item_data = arg_item[0].split(" ")
-                        for idx, val in enumerate(item_data):
-                            if idx % 2 == 0 or idx == 0:
-                                data_dict[val] = item_data[idx + 1]
-
-                raw_data = [data[0].strip(), data_dict]
+                raw_data = AvalonMiner._parse_stats_args(item)
             else:
                 raw_data = [
                     value
-                    for value in item.replace("[", " ")
+                    for value in item[:-1]
+                    .replace("[", " ")
                     .replace("]", " ")
-                    .split(" ")[:-1]
+                    .split(" ")
                     if value != ""
                 ]
                 if len(raw_data) == 1:
@@ -148,10 +146,27 @@ class AvalonMiner(CGMiner):
                 raw_data = raw_data[1:]
 
             stats_dict[raw_data[0]] = raw_data[1:]
-            stats_items.append(raw_data)
 
         return stats_dict
 
+    @staticmethod
+    def _parse_stats_args(item: str) -> list:
+        data = item.replace("]", "").split("[")
+        data_list = [i.split(": ") for i in data[1].strip().split(", ")]
+        data_dict = {}
+        try:
+            for key, val in [tuple(item) for item in data_list]:
+                data_dict[key] = val
+        except ValueError:
+            # --avalon args
+            for arg_item in data_list:
+                item_data = arg_item[0].split(" ")
+                for idx, val in enumerate(item_data):
+                    if idx % 2 == 0 or idx == 0:
+                        data_dict[val] = item_data[idx + 1]
+
+        return [data[0].strip(), data_dict]
+
     ##################################################
     ### DATA GATHERING FUNCTIONS (get_{some_data}) ###
     ##################################################
@@ -13,13 +13,11 @@
 #  See the License for the specific language governing permissions and         -
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
-import base64
 import logging
 import time
 from pathlib import Path
 from typing import List, Optional, Union
 
-import aiofiles
 import tomli_w
 
 try:
@@ -41,11 +39,14 @@ from pyasic.miners.data import (
     WebAPICommand,
 )
 from pyasic.miners.device.firmware import BraiinsOSFirmware
+from pyasic.misc.firmware import FirmwareImage
 from pyasic.rpc.bosminer import BOSMinerRPCAPI
 from pyasic.ssh.braiins_os import BOSMinerSSH
 from pyasic.web.braiins_os import BOSerWebAPI, BOSMinerWebAPI
 from pyasic.web.braiins_os.proto.braiins.bos.v1 import SaveAction
 
+logger = logging.getLogger(__name__)
+
 BOSMINER_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -192,7 +193,7 @@ class BOSMiner(BraiinsOSFirmware):
 
         return self.config
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         self.config = config
         parsed_cfg = config.as_bosminer(user_suffix=user_suffix)
 
@@ -207,15 +208,11 @@ class BOSMiner(BraiinsOSFirmware):
                 **parsed_cfg,
             }
         )
-        try:
-            conn = await self.ssh._get_connection()
-        except ConnectionError as e:
-            raise APIError("SSH connection failed when sending config.") from e
-
-        async with conn:
-            await conn.run("/etc/init.d/bosminer stop")
-            await conn.run("echo '" + toml_conf + "' > /etc/bosminer.toml")
-            await conn.run("/etc/init.d/bosminer start")
+        # these must run in order, so send them one at a time over the pooled connection
+        if await self.ssh.send_command("/etc/init.d/bosminer stop") is None:
+            raise APIError("SSH connection failed when sending config.")
+        await self.ssh.send_command("echo '" + toml_conf + "' > /etc/bosminer.toml")
+        await self.ssh.send_command("/etc/init.d/bosminer start")
 
     async def set_power_limit(self, wattage: int) -> bool:
         try:
@@ -227,7 +224,7 @@ class BOSMiner(BraiinsOSFirmware):
         except APIError:
             raise
         except Exception as e:
-            logging.warning(f"{self} - Failed to set power limit: {e}")
+            logger.warning(f"{self} - Failed to set power limit: {e}")
             return False
         else:
             return True
@@ -349,7 +346,7 @@ class BOSMiner(BraiinsOSFirmware):
         except AttributeError:
             return None
         except Exception as e:
-            logging.error(f"{self} - Getting hostname failed: {e}")
+            logger.error(f"{self} - Getting hostname failed: {e}")
             return None
         return hostname
 
@@ -625,40 +622,38 @@ class BOSMiner(BraiinsOSFirmware):
             str: Confirmation message after upgrading the firmware.
         """
         try:
-            logging.info("Starting firmware upgrade process.")
+            logger.info("Starting firmware upgrade process.")
 
             if not file:
                 raise ValueError("File location must be provided for firmware upgrade.")
 
-            # Read the firmware file contents
-            async with aiofiles.open(file, "rb") as f:
-                upgrade_contents = await f.read()
-
-            # Encode the firmware contents in base64
-            encoded_contents = base64.b64encode(upgrade_contents).decode("utf-8")
-
-            # Upload the firmware file to the BOSMiner device
-            logging.info(f"Uploading firmware file from {file} to the device.")
-            await self.ssh.send_command(
-                f"echo {encoded_contents} | base64 -d > /tmp/firmware.tar && sysupgrade /tmp/firmware.tar"
-            )
+            # Stream the firmware file to the BOSMiner device over SSH
+            logger.info("Uploading firmware file from %s to the device.", file)
+            with FirmwareImage.open(file) as firmware:
+                result = await self.ssh.upload(
+                    "cat > /tmp/firmware.tar && sysupgrade /tmp/firmware.tar",
+                    firmware.chunks(),
+                )
+            if result is None:
+                raise APIError(f"Firmware upgrade failed on {self.ip}.")
 
-            logging.info("Firmware upgrade process completed successfully.")
+            logger.info("Firmware upgrade process completed successfully.")
             return "Firmware upgrade completed successfully."
         except FileNotFoundError as e:
-            logging.error(f"File not found during the firmware upgrade process: {e}")
+            logger.error("File not found during the firmware upgrade process: %s", e)
             raise
         except ValueError as e:
-            logging.error(
-                f"Validation error occurred during the firmware upgrade process: {e}"
+            logger.error(
+                "Validation error occurred during the firmware upgrade process: %s", e
             )
             raise
         except OSError as e:
-            logging.error(f"OS error occurred during the firmware upgrade process: {e}")
+            logger.error("OS error occurred during the firmware upgrade process: %s", e)
             raise
         except Exception as e:
-            logging.error(
-                f"An unexpected error occurred during the firmware upgrade process: {e}",
+            logger.error(
+                "An unexpected error occurred during the firmware upgrade process: %s",
+                e,
                 exc_info=True,
             )
             raise
@@ -790,11 +785,23 @@ class BOSer(BraiinsOSFirmware):
 
         return MinerConfig.from_boser(grpc_conf)
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         boser_cfg = config.as_boser(user_suffix=user_suffix)
         for key in boser_cfg:
             await self.web.send_command(key, message=boser_cfg[key])
 
+    async def _send_config_sections(
+        self, config: MinerConfig, sections: List[str], user_suffix: str = None
+    ) -> None:
+        boser_cfg = {}
+        for section in sections:
+            if section == "pools":
+                boser_cfg.update(config.pools.as_boser(user_suffix=user_suffix))
+            else:
+                boser_cfg.update(config[section].as_boser())
+        for key in boser_cfg:
+            await self.web.send_command(key, message=boser_cfg[key])
+
     async def set_power_limit(self, wattage: int) -> bool:
         try:
             result = await self.web.set_power_target(
@@ -18,8 +18,6 @@ import logging
 from pathlib import Path
 from typing import List, Optional
 
-import aiofiles
-
 from pyasic.config import MinerConfig, MiningModeConfig
 from pyasic.data import AlgoHashRate, Fan, HashBoard, HashUnit
 from pyasic.data.error_codes import MinerErrorData, WhatsminerError
@@ -27,8 +25,11 @@ from pyasic.data.pools import PoolMetrics, PoolUrl
 from pyasic.errors import APIError
 from pyasic.miners.data import DataFunction, DataLocations, DataOptions, RPCAPICommand
 from pyasic.miners.device.firmware import StockFirmware
+from pyasic.misc.firmware import FirmwareImage
 from pyasic.rpc.btminer import BTMinerRPCAPI
 
+logger = logging.getLogger(__name__)
+
 BTMINER_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -207,23 +208,32 @@ class BTMiner(StockFirmware):
                 return True
         return False
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+        await self._send_config_sections(
+            config, sections=["pools", "mining_mode"], user_suffix=user_suffix
+        )
+
+    async def _send_config_sections(
+        self, config: MinerConfig, sections: List[str], user_suffix: str = None
+    ) -> None:
         self.config = config
 
         conf = config.as_wm(user_suffix=user_suffix)
         pools_conf = conf["pools"]
 
         try:
-            await self.rpc.update_pools(**pools_conf)
-
-            if conf["mode"] == "normal":
-                await self.rpc.set_normal_power()
-            elif conf["mode"] == "high":
-                await self.rpc.set_high_power()
-            elif conf["mode"] == "low":
-                await self.rpc.set_low_power()
-            elif conf["mode"] == "power_tuning":
-                await self.rpc.adjust_power_limit(conf["power_tuning"]["wattage"])
+            if "pools" in sections:
+                await self.rpc.update_pools(**pools_conf)
+
+            if "mining_mode" in sections:
+                if conf["mode"] == "normal":
+                    await self.rpc.set_normal_power()
+                elif conf["mode"] == "high":
+                    await self.rpc.set_high_power()
+                elif conf["mode"] == "low":
+                    await self.rpc.set_low_power()
+                elif conf["mode"] == "power_tuning":
+                    await self.rpc.adjust_power_limit(conf["power_tuning"]["wattage"])
         except APIError:
             # cannot update, no API access usually
             pass
@@ -238,7 +248,7 @@ class BTMiner(StockFirmware):
             summary = data["summary"][0]
             status = data["status"][0]
         except APIError as e:
-            logging.warning(e)
+            logger.warning(e)
         except LookupError:
             pass
 
@@ -282,7 +292,7 @@ class BTMiner(StockFirmware):
         try:
             await self.rpc.adjust_power_limit(wattage)
         except Exception as e:
-            logging.warning(f"{self} set_power_limit: {e}")
+            logger.warning(f"{self} set_power_limit: {e}")
             return False
         else:
             return True
@@ -701,35 +711,34 @@ class BTMiner(StockFirmware):
             str: Confirmation message after upgrading the firmware.
         """
         try:
-            logging.info("Starting firmware upgrade process for Whatsminer.")
+            logger.info("Starting firmware upgrade process for Whatsminer.")
 
             if not file:
                 raise ValueError("File location must be provided for firmware upgrade.")
 
-            # Read the firmware file contents
-            async with aiofiles.open(file, "rb") as f:
-                upgrade_contents = await f.read()
-
-            result = await self.rpc.update_firmware(upgrade_contents)
+            # Stream the firmware from a shared memory-mapped image
+            with FirmwareImage.open(file) as firmware:
+                result = await self.rpc.update_firmware(firmware)
 
-            logging.info(
+            logger.info(
                 "Firmware upgrade process completed successfully for Whatsminer."
             )
             return result
         except FileNotFoundError as e:
-            logging.error(f"File not found during the firmware upgrade process: {e}")
+            logger.error("File not found during the firmware upgrade process: %s", e)
             raise
         except ValueError as e:
-            logging.error(
-                f"Validation error occurred during the firmware upgrade process: {e}"
+            logger.error(
+                "Validation error occurred during the firmware upgrade process: %s", e
             )
             raise
         except OSError as e:
-            logging.error(f"OS error occurred during the firmware upgrade process: {e}")
+            logger.error("OS error occurred during the firmware upgrade process: %s", e)
             raise
         except Exception as e:
-            logging.error(
-                f"An unexpected error occurred during the firmware upgrade process: {e}",
+            logger.error(
+                "An unexpected error occurred during the firmware upgrade process: %s",
+                e,
                 exc_info=True,
             )
             raise
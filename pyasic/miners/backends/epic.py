@@ -14,6 +14,7 @@
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
 
+import logging
 from pathlib import Path
 from typing import List, Optional
 
@@ -22,11 +23,12 @@ from pyasic.data import AlgoHashRate, Fan, HashBoard, HashUnit
 from pyasic.data.error_codes import MinerErrorData, X19Error
 from pyasic.data.pools import PoolMetrics
 from pyasic.errors import APIError
-from pyasic.logger import logger
 from pyasic.miners.data import DataFunction, DataLocations, DataOptions, WebAPICommand
 from pyasic.miners.device.firmware import ePICFirmware
 from pyasic.web.epic import ePICWebAPI
 
+logger = logging.getLogger(__name__)
+
 EPIC_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -115,29 +117,40 @@ class ePIC(ePICFirmware):
         self.config = cfg
         return self.config
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+        await self._send_config_sections(
+            config,
+            sections=["temperature", "fan_mode", "mining_mode", "pools"],
+            user_suffix=user_suffix,
+        )
+
+    async def _send_config_sections(
+        self, config: MinerConfig, sections: List[str], user_suffix: str = None
+    ) -> None:
         self.config = config
         conf = self.config.as_epic(user_suffix=user_suffix)
 
         try:
             # Temps
-            if not conf.get("temps", {}) == {}:
+            if "temperature" in sections and not conf.get("temps", {}) == {}:
                 await self.web.set_shutdown_temp(conf["temps"]["shutdown"])
                 await self.web.set_critical_temp(conf["temps"]["critical"])
             # Fans
             # set with sub-keys instead of conf["fans"] because sometimes both can be set
-            if not conf["fans"].get("Manual", {}) == {}:
-                await self.web.set_fan({"Manual": conf["fans"]["Manual"]})
-            elif not conf["fans"].get("Auto", {}) == {}:
-                await self.web.set_fan({"Auto": conf["fans"]["Auto"]})
+            if "fan_mode" in sections:
+                if not conf["fans"].get("Manual", {}) == {}:
+                    await self.web.set_fan({"Manual": conf["fans"]["Manual"]})
+                elif not conf["fans"].get("Auto", {}) == {}:
+                    await self.web.set_fan({"Auto": conf["fans"]["Auto"]})
 
             # Mining Mode -- Need to handle that you may not be able to change while miner is tuning
-            if conf["ptune"].get("enabled", True):
+            if "mining_mode" in sections and conf["ptune"].get("enabled", True):
                 await self.web.set_ptune_enable(True)
                 await self.web.set_ptune_algo(conf["ptune"])
 
             ## Pools
-            await self.web.set_pools(conf["pools"])
+            if "pools" in sections:
+                await self.web.set_pools(conf["pools"])
         except APIError:
             pass
 
@@ -13,12 +13,12 @@
 #  See the License for the specific language governing permissions and         -
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
+import logging
 from typing import List
 
 from pyasic.config import MinerConfig, MiningModeConfig
 from pyasic.data import AlgoHashRate, HashBoard, HashUnit
 from pyasic.errors import APIError
-from pyasic.logger import logger
 from pyasic.miners.backends import BFGMiner
 from pyasic.miners.data import (
     DataFunction,
@@ -29,6 +29,8 @@ from pyasic.miners.data import (
 )
 from pyasic.web.goldshell import GoldshellWebAPI
 
+logger = logging.getLogger(__name__)
+
 GOLDSHELL_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -91,7 +93,7 @@ class GoldshellMiner(BFGMiner):
         self.config = MinerConfig.from_goldshell(pools)
         return self.config
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         pools_data = await self.web.pools()
         # have to delete all the pools one at a time first
         for pool in pools_data:
@@ -170,7 +172,7 @@ class GoldshellMiner(BFGMiner):
                         except KeyError:
                             pass
             else:
-                logger.error(self, rpc_devs)
+                logger.error("%s - Unexpected devs response: %s", self, rpc_devs)
 
         if rpc_devdetails is None:
             try:
@@ -188,7 +190,9 @@ class GoldshellMiner(BFGMiner):
                         except KeyError:
                             pass
             else:
-                logger.error(self, rpc_devdetails)
+                logger.error(
+                    "%s - Unexpected devdetails response: %s", self, rpc_devdetails
+                )
 
         return hashboards
 
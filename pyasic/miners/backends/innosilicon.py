@@ -137,7 +137,7 @@ class Innosilicon(CGMiner):
     async def restart_backend(self) -> bool:
         return await self.restart_cgminer()
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         self.config = config
         await self.web.update_pools(config.as_inno(user_suffix=user_suffix))
 
@@ -24,6 +24,8 @@ from pyasic.miners.data import DataFunction, DataLocations, DataOptions, RPCAPIC
 from pyasic.miners.device.firmware import LuxOSFirmware
 from pyasic.rpc.luxminer import LUXMinerRPCAPI
 
+logger = logging.getLogger(__name__)
+
 LUXMINER_DATA_LOC = DataLocations(
     **{
         str(DataOptions.MAC): DataFunction(
@@ -144,11 +146,11 @@ class LUXMiner(LuxOSFirmware):
         """
         try:
             await self.rpc.upgraderun()
-            logging.info(f"{self.ip}: Firmware upgrade initiated successfully.")
+            logger.info(f"{self.ip}: Firmware upgrade initiated successfully.")
             return True
 
         except APIError as e:
-            logging.error(f"{self.ip}: Firmware upgrade failed: {e}")
+            logger.error(f"{self.ip}: Firmware upgrade failed: {e}")
 
         return False
 
@@ -91,7 +91,7 @@ class MaraMiner(MaraFirmware):
             self.config = MinerConfig.from_mara(data)
         return self.config
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         data = await self.web.get_miner_config()
         cfg_data = config.as_mara(user_suffix=user_suffix)
         merged_cfg = merge_dicts(data, cfg_data)
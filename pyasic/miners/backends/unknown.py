@@ -61,7 +61,7 @@ class UnknownMiner(BaseMiner):
     async def resume_mining(self) -> bool:
         return False
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         return None
 
     async def set_power_limit(self, wattage: int) -> bool:
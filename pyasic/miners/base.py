@@ -15,11 +15,12 @@
 # ------------------------------------------------------------------------------
 import asyncio
 import ipaddress
+import time
 import warnings
 from typing import List, Optional, Protocol, Tuple, Type, TypeVar, Union
 
 from pyasic.config import MinerConfig
-from pyasic.data import AlgoHashRate, Fan, HashBoard, MinerData
+from pyasic.data import AlgoHashRate, Fan, FieldError, HashBoard, MinerData
 from pyasic.data.device import DeviceInfo
 from pyasic.data.error_codes import MinerErrorData
 from pyasic.data.pools import PoolMetrics
@@ -28,8 +29,11 @@ from pyasic.device.algorithm import MinerAlgo
 from pyasic.device.firmware import MinerFirmware
 from pyasic.device.makes import MinerMake
 from pyasic.errors import APIError
-from pyasic.logger import logger
-from pyasic.miners.data import DataLocations, DataOptions, RPCAPICommand, WebAPICommand
+from pyasic.miners.data import CollectionPlan, DataLocations, DataOptions
+from pyasic.misc import instrument, offload
+from pyasic.misc.deadline import deadline as time_budget
+from pyasic.misc.deadline import expired, remaining
+from pyasic.misc.parse_cache import parse_cache
 
 
 class MinerProtocol(Protocol):
@@ -140,15 +144,47 @@ class MinerProtocol(Protocol):
         """
         return False
 
-    async def send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
+    async def send_config(
+        self,
+        config: MinerConfig,
+        user_suffix: str = None,
+        only_if_changed: bool = False,
+        current_config: MinerConfig = None,
+    ) -> None:
         """Set the mining configuration of the miner.
 
         Parameters:
             config: A [`MinerConfig`][pyasic.config.MinerConfig] containing the mining config you want to switch the miner to.
             user_suffix: A suffix to append to the username when sending to the miner.
+            only_if_changed: Only send the config if it differs from the current config of the miner, and only send the changed sections if the miner supports it.
+            current_config: The current config of the miner to compare against when using `only_if_changed`, fetched from the miner if not passed.
         """
+        if not only_if_changed:
+            return await self._send_config(config, user_suffix=user_suffix)
+
+        if current_config is None:
+            try:
+                current_config = await self.get_config()
+            except APIError:
+                # can't tell what changed, so send everything
+                return await self._send_config(config, user_suffix=user_suffix)
+
+        changed = config.diff(current_config, user_suffix=user_suffix)
+        if len(changed) == 0:
+            return None
+        return await self._send_config_sections(
+            config, sections=changed, user_suffix=user_suffix
+        )
+
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None) -> None:
         return None
 
+    async def _send_config_sections(
+        self, config: MinerConfig, sections: List[str], user_suffix: str = None
+    ) -> None:
+        # backends which can set sections of the config separately override this
+        return await self._send_config(config, user_suffix=user_suffix)
+
     async def stop_mining(self) -> bool:
         """Stop the mining process of the miner.
 
@@ -404,100 +440,159 @@ class MinerProtocol(Protocol):
     async def _get_pools(self) -> List[PoolMetrics]:
         pass
 
+    def _get_collection_plan(
+        self,
+        include: List[Union[str, DataOptions]] = None,
+        exclude: List[Union[str, DataOptions]] = None,
+    ) -> CollectionPlan:
+        key = (
+            None if include is None else tuple(str(i) for i in include),
+            None if exclude is None else tuple(str(i) for i in exclude),
+        )
+        # plans are cached on the class, since data locations are shared by all instances
+        cls = type(self)
+        plans = cls.__dict__.get("_collection_plans")
+        if plans is None:
+            plans = {}
+            cls._collection_plans = plans
+
+        plan = plans.get(key)
+        if plan is None or plan.data_locations is not self.data_locations:
+            plan = CollectionPlan.compile(self.data_locations, include, exclude)
+            plans[key] = plan
+        return plan
+
     async def _get_data(
         self,
         allow_warning: bool,
         include: List[Union[str, DataOptions]] = None,
         exclude: List[Union[str, DataOptions]] = None,
+        capture_errors: bool = False,
     ) -> dict:
-        # handle include
-        if include is not None:
-            include = [str(i) for i in include]
-        else:
-            # everything
-            include = [str(enum_value.value) for enum_value in DataOptions]
-
-        # handle exclude
-        # prioritized over include, including x and excluding x will exclude x
-        if exclude is not None:
-            for item in exclude:
-                if str(item) in include:
-                    include.remove(str(item))
-
-        rpc_multicommand = set()
-        web_multicommand = set()
-        # create multicommand
-        for data_name in include:
-            try:
-                # get kwargs needed for the _get_xyz function
-                fn_args = getattr(self.data_locations, data_name).kwargs
-
-                # keep track of which RPC/Web commands need to be sent
-                for arg in fn_args:
-                    if isinstance(arg, RPCAPICommand):
-                        rpc_multicommand.add(arg.cmd)
-                    if isinstance(arg, WebAPICommand):
-                        web_multicommand.add(arg.cmd)
-            except KeyError as e:
-                logger.error(type(e), e, data_name)
-                continue
+        plan = self._get_collection_plan(include, exclude)
 
         # create tasks for all commands that need to be sent, or no-op with sleep(0) -> None
-        if len(rpc_multicommand) > 0:
+        if len(plan.rpc_commands) > 0:
             rpc_command_task = asyncio.create_task(
-                self.rpc.multicommand(*rpc_multicommand, allow_warning=allow_warning)
+                self.rpc.multicommand(*plan.rpc_commands, allow_warning=allow_warning)
             )
         else:
             rpc_command_task = asyncio.create_task(asyncio.sleep(0))
-        if len(web_multicommand) > 0:
+        if len(plan.web_commands) > 0:
             web_command_task = asyncio.create_task(
-                self.web.multicommand(*web_multicommand, allow_warning=allow_warning)
+                self.web.multicommand(*plan.web_commands, allow_warning=allow_warning)
             )
         else:
             web_command_task = asyncio.create_task(asyncio.sleep(0))
 
-        # make sure the tasks complete
-        await asyncio.gather(rpc_command_task, web_command_task)
+        # make sure the tasks complete, or cancel them once the deadline passes
+        _, pending = await asyncio.wait(
+            [rpc_command_task, web_command_task], timeout=remaining()
+        )
+        for task in pending:
+            task.cancel()
+        if len(pending) > 0:
+            await asyncio.gather(*pending, return_exceptions=True)
 
         # grab data out of the tasks
-        web_command_data = web_command_task.result()
+        web_command_data = None
+        if web_command_task not in pending:
+            web_command_data = web_command_task.result()
         if web_command_data is None:
             web_command_data = {}
-        api_command_data = rpc_command_task.result()
+        api_command_data = None
+        if rpc_command_task not in pending:
+            api_command_data = rpc_command_task.result()
         if api_command_data is None:
             api_command_data = {}
 
-        miner_data = {}
+        rpc_multicommand = api_command_data.get("multicommand")
+        web_multicommand = web_command_data.get("multicommand")
+        web_empty = web_command_data == {"multicommand": False}
 
-        for data_name in include:
-            try:
-                fn_args = getattr(self.data_locations, data_name).kwargs
-                args_to_send = {k.name: None for k in fn_args}
-                for arg in fn_args:
-                    try:
-                        if isinstance(arg, RPCAPICommand):
-                            if api_command_data.get("multicommand"):
-                                args_to_send[arg.name] = api_command_data[arg.cmd][0]
-                            else:
-                                args_to_send[arg.name] = api_command_data
-                        if isinstance(arg, WebAPICommand):
-                            if web_command_data is not None:
-                                if web_command_data.get("multicommand"):
-                                    args_to_send[arg.name] = web_command_data[arg.cmd]
-                                else:
-                                    if not web_command_data == {"multicommand": False}:
-                                        args_to_send[arg.name] = web_command_data
-                    except LookupError:
-                        args_to_send[arg.name] = None
-            except LookupError:
+        miner_data = {}
+        timed_out = []
+        field_errors = []
+        slicer = offload.Slicer()
+
+        for planned in plan.functions:
+            # the commands this item is parsed from never finished, so it can't be parsed
+            if any(
+                (rpc_command_task if is_rpc else web_command_task) in pending
+                for _, is_rpc, _ in planned.args
+            ):
+                timed_out.append(planned.data_name)
                 continue
+            args_to_send = {}
+            for arg_name, is_rpc, cmd in planned.args:
+                args_to_send[arg_name] = None
+                try:
+                    if is_rpc:
+                        if rpc_multicommand:
+                            args_to_send[arg_name] = api_command_data[cmd][0]
+                        else:
+                            args_to_send[arg_name] = api_command_data
+                    else:
+                        if web_multicommand:
+                            args_to_send[arg_name] = web_command_data[cmd]
+                        elif not web_empty:
+                            args_to_send[arg_name] = web_command_data
+                except LookupError:
+                    args_to_send[arg_name] = None
+            start = time.monotonic()
+            error = None
+            left = remaining()
+            slicer.begin()
             try:
-                function = getattr(self, getattr(self.data_locations, data_name).cmd)
-                miner_data[data_name] = await function(**args_to_send)
+                function = getattr(self, planned.cmd)
+                if left is None:
+                    # without a deadline, skip the extra task
+                    miner_data[planned.data_name] = await function(**args_to_send)
+                else:
+                    # unlike wait_for, a parser gets to run even once the deadline has passed,
+                    # and only times out if it has to wait on its own I/O
+                    task = asyncio.create_task(function(**args_to_send))
+                    await asyncio.wait([task], timeout=max(left, 0))
+                    if not task.done():
+                        task.cancel()
+                        await asyncio.gather(task, return_exceptions=True)
+                        timed_out.append(planned.data_name)
+                        continue
+                    miner_data[planned.data_name] = task.result()
             except Exception as e:
+                error = e
+                if (
+                    left is not None
+                    and isinstance(e, asyncio.TimeoutError)
+                    and expired()
+                ):
+                    timed_out.append(planned.data_name)
+                    continue
+                if capture_errors:
+                    field_errors.append(
+                        FieldError.from_exception(
+                            planned.data_name, e, duration=time.monotonic() - start
+                        )
+                    )
+                    continue
                 raise APIError(
-                    f"Failed to call {data_name} on {self} while getting data."
+                    f"Failed to call {planned.data_name} on {self} while getting data."
                 ) from e
+            finally:
+                if instrument.hooks:
+                    instrument.emit(
+                        "parse",
+                        type(self).__name__,
+                        planned.data_name,
+                        self.ip,
+                        time.monotonic() - start,
+                        error=error,
+                    )
+            await slicer.checkpoint()
+        if len(timed_out) > 0:
+            miner_data["timed_out"] = timed_out
+        if len(field_errors) > 0:
+            miner_data["field_errors"] = field_errors
         return miner_data
 
     async def get_data(
@@ -505,13 +600,21 @@ class MinerProtocol(Protocol):
         allow_warning: bool = False,
         include: List[Union[str, DataOptions]] = None,
         exclude: List[Union[str, DataOptions]] = None,
+        deadline: float = None,
+        capture_errors: bool = False,
     ) -> MinerData:
         """Get data from the miner in the form of [`MinerData`][pyasic.data.MinerData].
 
+        With a `deadline`, or inside of a [`deadline()`][pyasic.misc.deadline.deadline] context, every
+        connection is bounded by the time left, and whatever is still outstanding when it passes is cancelled.
+        The data gathered so far is returned, with the names of the missing data items in `MinerData.timed_out`.
+
         Parameters:
             allow_warning: Allow warning when an API command fails.
             include: Names of data items you want to gather. Defaults to all data.
             exclude: Names of data items to exclude.  Exclusion happens after considering included items.
+            deadline: The time budget in seconds for getting all data.
+            capture_errors: Record data items which fail in `MinerData.field_errors` and return the rest of the data, instead of raising an `APIError`.
 
         Returns:
             A [`MinerData`][pyasic.data.MinerData] instance containing data from the miner.
@@ -532,9 +635,14 @@ class MinerProtocol(Protocol):
             ],
         )
 
-        gathered_data = await self._get_data(
-            allow_warning=allow_warning, include=include, exclude=exclude
-        )
+        # responses are parsed once each, however many data items they are used for
+        with time_budget(deadline), parse_cache():
+            gathered_data = await self._get_data(
+                allow_warning=allow_warning,
+                include=include,
+                exclude=exclude,
+                capture_errors=capture_errors,
+            )
         for item in gathered_data:
             if gathered_data[item] is not None:
                 setattr(data, item, gathered_data[item])
@@ -16,7 +16,7 @@
 
 from dataclasses import dataclass, field, make_dataclass
 from enum import Enum
-from typing import List, Union
+from typing import Iterable, List, Optional, Tuple, Union
 
 
 class DataOptions(Enum):
@@ -83,3 +83,70 @@ DataLocations = make_dataclass(
         for enum_value in DataOptions
     ],
 )
+
+
+@dataclass(frozen=True)
+class PlannedFunction:
+    data_name: str
+    cmd: str
+    # (argument name, whether the argument comes from RPC, command the argument comes from)
+    args: Tuple[Tuple[str, bool, str], ...]
+
+
+@dataclass(frozen=True)
+class CollectionPlan:
+    """An immutable plan for gathering a set of data items from a miner.
+
+    Holds the RPC and web commands to send, and how to route the results of those
+    commands to the data functions, so this only needs to be worked out once per
+    miner class and include/exclude combination instead of on every `get_data` call.
+    """
+
+    data_locations: object
+    rpc_commands: Tuple[str, ...]
+    web_commands: Tuple[str, ...]
+    functions: Tuple[PlannedFunction, ...]
+
+    @classmethod
+    def compile(
+        cls,
+        data_locations: DataLocations,
+        include: Optional[Iterable[Union[str, DataOptions]]] = None,
+        exclude: Optional[Iterable[Union[str, DataOptions]]] = None,
+    ) -> "CollectionPlan":
+        if include is not None:
+            include = list(dict.fromkeys(str(i) for i in include))
+        else:
+            # everything
+            include = [str(enum_value.value) for enum_value in DataOptions]
+
+        # prioritized over include, including x and excluding x will exclude x
+        if exclude is not None:
+            excluded = {str(item) for item in exclude}
+            include = [item for item in include if item not in excluded]
+
+        rpc_commands = {}
+        web_commands = {}
+        functions = []
+        for data_name in include:
+            data_function = getattr(data_locations, data_name)
+            args = []
+            for arg in data_function.kwargs:
+                if isinstance(arg, RPCAPICommand):
+                    rpc_commands[arg.cmd] = None
+                    args.append((arg.name, True, arg.cmd))
+                elif isinstance(arg, WebAPICommand):
+                    web_commands[arg.cmd] = None
+                    args.append((arg.name, False, arg.cmd))
+            functions.append(
+                PlannedFunction(
+                    data_name=data_name, cmd=data_function.cmd, args=tuple(args)
+                )
+            )
+
+        return cls(
+            data_locations=data_locations,
+            rpc_commands=tuple(rpc_commands),
+            web_commands=tuple(web_commands),
+            functions=tuple(functions),
+        )
@@ -17,17 +17,19 @@ from __future__ import annotations
 
 import asyncio
 import enum
+import functools
 import ipaddress
 import json
+import logging
 import re
 import warnings
-from typing import Any, AsyncGenerator, Callable
+from typing import Any, AsyncGenerator, Awaitable, Callable
 
 import anyio
 import httpx
 
 from pyasic import settings
-from pyasic.logger import logger
+from pyasic.errors import APIError
 from pyasic.miners.antminer import *
 from pyasic.miners.auradine import *
 from pyasic.miners.avalonminer import *
@@ -42,6 +44,10 @@ from pyasic.miners.goldshell import *
 from pyasic.miners.iceriver import *
 from pyasic.miners.innosilicon import *
 from pyasic.miners.whatsminer import *
+from pyasic.misc import instrument, replay, sockets
+from pyasic.misc.health import get_health, is_healthy
+
+logger = logging.getLogger(__name__)
 
 
 class MinerTypes(enum.Enum):
@@ -523,20 +529,27 @@ class MinerFactory:
 
     async def get_miner(self, ip: str | ipaddress.ip_address) -> AnyMiner | None:
         ip = str(ip)
+        if not is_healthy(ip):
+            # recently failed to respond, don't wait on it again until the backoff passes
+            return None
 
         miner_type = None
 
+        timeouts = 0
         for _ in range(settings.get("factory_get_retries", 1)):
-            task = asyncio.create_task(self._get_miner_type(ip))
+            task = asyncio.create_task(self._stage(self._get_miner_type, ip))
             try:
                 miner_type = await asyncio.wait_for(
                     task, timeout=settings.get("factory_get_timeout", 3)
                 )
             except asyncio.TimeoutError:
+                timeouts += 1
                 continue
             else:
                 if miner_type is not None:
                     break
+        if timeouts == settings.get("factory_get_retries", 1):
+            get_health(ip).record_failure("Timed out identifying miner")
 
         if miner_type is not None:
             miner_model = None
@@ -560,7 +573,7 @@ class MinerFactory:
 
             if fn is not None:
                 # noinspection PyArgumentList
-                task = asyncio.create_task(fn(ip))
+                task = asyncio.create_task(self._stage(fn, ip))
                 try:
                     miner_model = await asyncio.wait_for(
                         task, timeout=settings.get("factory_get_timeout", 3)
@@ -574,10 +587,22 @@ class MinerFactory:
             )
             return miner
 
+    @staticmethod
+    def _stage(fn: Callable[[str], Awaitable], ip: str) -> Awaitable:
+        if instrument.hooks:
+            return instrument.wrap(
+                functools.partial(fn, ip),
+                "factory",
+                "MinerFactory",
+                fn.__name__.lstrip("_"),
+                ip,
+            )()
+        return fn(ip)
+
     async def _get_miner_type(self, ip: str) -> MinerTypes | None:
         tasks = [
-            asyncio.create_task(self._get_miner_web(ip)),
-            asyncio.create_task(self._get_miner_socket(ip)),
+            asyncio.create_task(self._stage(self._get_miner_web, ip)),
+            asyncio.create_task(self._stage(self._get_miner_socket, ip)),
         ]
 
         return await concurrent_get_first_result(tasks, lambda x: x is not None)
@@ -669,20 +694,34 @@ class MinerFactory:
 
     @staticmethod
     async def _socket_ping(ip: str, cmd: str) -> str | None:
+        request = json.dumps({"command": cmd}).encode("utf-8")
+        try:
+            data = await replay.exchange(
+                "rpc",
+                str(ip),
+                4028,
+                request,
+                lambda: MinerFactory._socket_send(ip, request),
+            )
+        except APIError:
+            return
+        if data:
+            return data.decode("utf-8")
+
+    @staticmethod
+    async def _socket_send(ip: str, request: bytes) -> bytes:
         data = b""
         try:
             reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(str(ip), 4028),
+                sockets.open_connection(str(ip), 4028),
                 timeout=settings.get("factory_get_timeout", 3),
             )
         except (ConnectionError, OSError, asyncio.TimeoutError):
-            return
-
-        cmd = {"command": cmd}
+            return data
 
         try:
             # send the command
-            writer.write(json.dumps(cmd).encode("utf-8"))
+            writer.write(request)
             await writer.drain()
 
             # loop to receive all the data
@@ -695,11 +734,11 @@ class MinerFactory:
                 except asyncio.TimeoutError:
                     pass
                 except ConnectionResetError:
-                    return
+                    return b""
         except asyncio.CancelledError:
             raise
         except (ConnectionError, OSError):
-            return
+            return b""
         finally:
             # Handle cancellation explicitly
             if writer.transport.is_closing():
@@ -709,9 +748,8 @@ class MinerFactory:
             try:
                 await writer.wait_closed()
             except (ConnectionError, OSError):
-                return
-        if data:
-            return data.decode("utf-8")
+                return b""
+        return data
 
     @staticmethod
     def _parse_socket_type(data: str) -> MinerTypes | None:
@@ -757,7 +795,7 @@ class MinerFactory:
                     timeout=settings.get("factory_get_timeout", 3),
                 )
             except (httpx.HTTPError, asyncio.TimeoutError):
-                logger.info(f"{ip}: Web command timeout.")
+                logger.info("%s: Web command timeout.", ip)
                 return
         if data is None:
             return
@@ -772,34 +810,14 @@ class MinerFactory:
             return json_data
 
     async def send_api_command(self, ip: str, command: str) -> dict | None:
-        data = b""
+        request = json.dumps({"command": command}).encode("utf-8")
         try:
-            reader, writer = await asyncio.open_connection(ip, 4028)
-        except (ConnectionError, OSError):
-            return
-        cmd = {"command": command}
-
-        try:
-            # send the command
-            writer.write(json.dumps(cmd).encode("utf-8"))
-            await writer.drain()
-
-            # loop to receive all the data
-            while True:
-                d = await reader.read(4096)
-                if not d:
-                    break
-                data += d
-
-            writer.close()
-            await writer.wait_closed()
-        except asyncio.CancelledError:
-            writer.close()
-            await writer.wait_closed()
-            return
-        except (ConnectionError, OSError):
+            data = await replay.exchange(
+                "rpc", str(ip), 4028, request, lambda: self._socket_send(ip, request)
+            )
+        except APIError:
             return
-        if data == b"Socket connect failed: Connection refused\n":
+        if not data or data == b"Socket connect failed: Connection refused\n":
             return
 
         data = await self._fix_api_data(data)
@@ -15,28 +15,48 @@
 # ------------------------------------------------------------------------------
 
 import asyncio
+import logging
+import socket
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Union
 
+logger = logging.getLogger(__name__)
 
-class MinerListenerProtocol(asyncio.Protocol):
-    def __init__(self):
-        self.responses = {}
+LISTENER_PORTS = (14235, 8888)
+# datagrams are read one per loop iteration, so buffer bursts of reports in the kernel
+LISTENER_RCVBUF = 1024 * 1024
+
+
+class MinerListenerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, queue: asyncio.Queue = None):
+        self.queue = queue if queue is not None else asyncio.Queue()
         self.transport = None
-        self.new_miner = None
 
-    async def get_new_miner(self):
-        try:
-            while self.new_miner is None:
-                await asyncio.sleep(0)
-            return self.new_miner
-        finally:
-            self.new_miner = None
+    async def get_new_miner(self) -> dict:
+        return await self.queue.get()
 
     def connection_made(self, transport):
         self.transport = transport
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, LISTENER_RCVBUF)
+            except OSError:
+                pass
 
     def datagram_received(self, data, _addr):
         if data == b"OK\x00\x00\x00\x00\x00\x00\x00\x00":
             return
+        try:
+            miner = self.parse(data)
+        except (UnicodeDecodeError, IndexError, ValueError):
+            logger.debug("Listener - Unknown datagram from %s: %s", _addr, data)
+            return
+        self.queue.put_nowait(miner)
+
+    @staticmethod
+    def parse(data: bytes) -> dict:
         m = data.decode()
         if "," in m:
             ip, mac = m.split(",")
@@ -47,41 +67,81 @@ class MinerListenerProtocol(asyncio.Protocol):
             ip = d[0][3:]
             mac = d[1][1:]
 
-        self.new_miner = {"IP": ip, "MAC": mac.upper()}
+        return {"IP": ip, "MAC": mac.upper()}
 
     def connection_lost(self, _):
         pass
 
 
 class MinerListener:
-    def __init__(self, bind_addr: str = "0.0.0.0"):
+    """Listen for miners sending their IP when the IP report button is pressed.
+
+    Parameters:
+        bind_addr: The address or list of addresses to listen on.
+        dedup_window: The time in seconds a miner is ignored after it was found, since the report is sent repeatedly.
+    """
+
+    def __init__(
+        self, bind_addr: Union[str, List[str]] = "0.0.0.0", dedup_window: float = 10
+    ):
         self.found_miners = []
         self.stop = asyncio.Event()
         self.bind_addr = bind_addr
+        self.dedup_window = dedup_window
+        self._queue: Optional[asyncio.Queue] = None
+        # ordered oldest first, so expired entries can be popped from the front
+        self._last_seen: OrderedDict[str, float] = OrderedDict()
+
+    @property
+    def bind_addrs(self) -> List[str]:
+        if isinstance(self.bind_addr, str):
+            return [self.bind_addr]
+        return list(self.bind_addr)
 
-    async def listen(self):
+    async def listen(self) -> AsyncIterator[dict]:
+        """Yield a dict with the `IP` and `MAC` of each miner found, until [`cancel()`][pyasic.miners.listener.MinerListener.cancel] is called."""
         loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.stop.clear()
 
-        transport_14235, protocol_14235 = await loop.create_datagram_endpoint(
-            MinerListenerProtocol, local_addr=(self.bind_addr, 14235)
-        )
-        transport_8888, protocol_8888 = await loop.create_datagram_endpoint(
-            MinerListenerProtocol, local_addr=(self.bind_addr, 8888)
-        )
+        transports = []
         try:
-            while not self.stop.is_set():
-                tasks = [
-                    asyncio.create_task(protocol_14235.get_new_miner()),
-                    asyncio.create_task(protocol_8888.get_new_miner()),
-                ]
-                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-                for t in tasks:
-                    if t.done():
-                        yield t.result()
+            for addr in self.bind_addrs:
+                for port in LISTENER_PORTS:
+                    transport, _ = await loop.create_datagram_endpoint(
+                        lambda: MinerListenerProtocol(self._queue),
+                        local_addr=(addr, port),
+                    )
+                    transports.append(transport)
 
+            while not self.stop.is_set():
+                miner = await self._queue.get()
+                # None is put on the queue by cancel() to wake this up
+                if miner is None or self._is_duplicate(miner):
+                    continue
+                self.found_miners.append(miner)
+                yield miner
         finally:
-            transport_14235.close()
-            transport_8888.close()
+            for transport in transports:
+                transport.close()
+            self._queue = None
+
+    def _is_duplicate(self, miner: dict) -> bool:
+        now = time.monotonic()
+        last_seen = self._last_seen.get(miner["MAC"])
+        if last_seen is not None and now - last_seen < self.dedup_window:
+            return True
+        while self._last_seen:
+            mac, seen = next(iter(self._last_seen.items()))
+            if now - seen < self.dedup_window:
+                break
+            self._last_seen.popitem(last=False)
+        self._last_seen[miner["MAC"]] = now
+        self._last_seen.move_to_end(miner["MAC"])
+        return False
 
     async def cancel(self):
-        self.stop = True
+        """Stop listening for miners."""
+        self.stop.set()
+        if self._queue is not None:
+            self._queue.put_nowait(None)
@@ -15,6 +15,7 @@
 # ------------------------------------------------------------------------------
 from __future__ import annotations
 
+import os
 from copy import deepcopy
 
 from pyasic.errors import APIError
@@ -108,3 +109,13 @@ def validate_command_output(data: dict) -> tuple[bool, str | None]:
                     # this is an error
                     return False, f"{key}: " + data[key][0]["STATUS"][0]["Msg"]
         return True, None
+
+
+def open_fds() -> int | None:
+    """Get the number of open file descriptors of this process, or `None` if it can't be read."""
+    for path in ["/proc/self/fd", "/dev/fd"]:
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
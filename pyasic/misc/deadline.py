@@ -0,0 +1,90 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""A time budget shared by every connection made while it is set.
+
+The deadline is kept in a context variable, so it follows tasks created
+inside of it, and every transport bounds its own timeouts by the time left.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("pyasic_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Set a time budget for everything run inside of this context.
+
+    Nested deadlines can only shorten the budget, never extend it.
+
+    Parameters:
+        seconds: The time budget in seconds, or `None` to keep the current deadline.
+
+    Returns:
+        The absolute deadline, as a `time.monotonic()` timestamp.
+    """
+    current = _deadline.get()
+    if seconds is None:
+        yield current
+        return
+    new = time.monotonic() + seconds
+    if current is not None:
+        new = min(new, current)
+    token = _deadline.set(new)
+    try:
+        yield new
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Get the current deadline as a `time.monotonic()` timestamp, or `None` if there is none."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Get the seconds left until the current deadline, or `None` if there is none."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return max(current - time.monotonic(), 0)
+
+
+def expired() -> bool:
+    """Check whether the current deadline has passed."""
+    current = _deadline.get()
+    return current is not None and time.monotonic() >= current
+
+
+def bound_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Bound a timeout by the time left until the current deadline.
+
+    Parameters:
+        timeout: The timeout to use without a deadline, or `None` for no timeout.
+
+    Returns:
+        The smaller of `timeout` and the time left.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if timeout is None:
+        return left
+    return min(timeout, left)
@@ -0,0 +1,166 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FirmwareImage:
+    """A read-only, memory-mapped firmware image.
+
+    Images are shared, so every concurrent upgrade using the same file streams from
+    the same mapping instead of reading its own copy into memory.  Use
+    [`FirmwareImage.open()`][pyasic.misc.firmware.FirmwareImage.open] as a context manager
+    to get an image, the mapping is closed when the last user is done with it.
+    """
+
+    _images: Dict[Tuple[str, int, int], FirmwareImage] = {}
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._key = self._get_key(self.path)
+        if self._key[1] == 0:
+            # mmap can't map an empty file, and an empty image is never valid firmware
+            raise ValueError(f"Firmware file {self.path} is empty.")
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._users = 0
+        self._sha256: Optional[asyncio.Future] = None
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> FirmwareImage:
+        """Get the shared image for a firmware file, mapping it if it is not already in use.
+
+        Parameters:
+            path: The path to the firmware file.
+
+        Returns:
+            A [`FirmwareImage`][pyasic.misc.firmware.FirmwareImage], which should be closed or used as a context manager.
+        """
+        key = cls._get_key(Path(path))
+        image = cls._images.get(key)
+        if image is None:
+            image = cls._images[key] = cls(path)
+        image._users += 1
+        return image
+
+    @staticmethod
+    def _get_key(path: Path) -> Tuple[str, int, int]:
+        # include size and mtime so a replaced file is mapped again
+        stat = os.stat(path)
+        return str(path.resolve()), stat.st_size, stat.st_mtime_ns
+
+    def close(self) -> None:
+        self._users -= 1
+        if self._users > 0:
+            return
+        if self._images.get(self._key) is self:
+            del self._images[self._key]
+        self._mmap.close()
+
+    def __enter__(self) -> FirmwareImage:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._mmap)
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    async def sha256(self) -> str:
+        """Get the SHA256 checksum of the image, only calculated once per image.
+
+        The checksum is calculated in an executor, so hashing a large image doesn't block the event loop.
+        """
+        if self._digest is not None:
+            return self._digest
+        loop = asyncio.get_running_loop()
+        if self._sha256 is None or self._sha256.get_loop() is not loop:
+            self._sha256 = loop.run_in_executor(None, self._hash)
+        # shielded, so one cancelled upgrade doesn't cancel the hash for the others
+        self._digest = await asyncio.shield(self._sha256)
+        return self._digest
+
+    def _hash(self) -> str:
+        return hashlib.sha256(self._mmap).hexdigest()
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Iterate over the image in chunks of `chunk_size` bytes."""
+        for offset in range(0, len(self._mmap), chunk_size):
+            yield self._mmap[offset : offset + chunk_size]
+
+    def reader(self) -> FirmwareReader:
+        """Get a new seekable file-like reader over the image, for use with HTTP uploads."""
+        return FirmwareReader(self)
+
+
+class FirmwareReader(io.RawIOBase):
+    """A file-like view of a [`FirmwareImage`][pyasic.misc.firmware.FirmwareImage] with its own position."""
+
+    def __init__(self, image: FirmwareImage) -> None:
+        self._image = image
+        self._pos = 0
+
+    @property
+    def name(self) -> str:
+        return self._image.name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        start = self._pos
+        if size is None or size < 0:
+            end = len(self._image)
+        else:
+            end = min(start + size, len(self._image))
+        self._pos = max(end, start)
+        return self._image._mmap[start:end]
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._image) + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
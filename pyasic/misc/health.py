@@ -0,0 +1,224 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+from __future__ import annotations
+
+import asyncio
+import errno
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional
+
+import httpx
+
+from pyasic import settings
+from pyasic.misc import deadline
+
+# errors which mean the host itself can't be reached, rather than a service on it
+_UNREACHABLE_ERRNOS = {
+    errno.EHOSTUNREACH,
+    errno.ENETUNREACH,
+    errno.EHOSTDOWN,
+    errno.ETIMEDOUT,
+}
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass
+class HostHealth:
+    """The health of a single host, shared by every RPC, web, and SSH connection to it.
+
+    After `circuit_breaker_threshold` consecutive failures the circuit opens, and connections
+    fail immediately until the backoff has passed.  A single probe connection is then let
+    through, which closes the circuit if it succeeds, or doubles the backoff (up to
+    `circuit_breaker_max_backoff`) if it fails.
+
+    Only hosts with failures are tracked, so a host is forgotten once it recovers, and
+    at most `circuit_breaker_max_hosts` hosts are kept, dropping the least recently failed.
+
+    Attributes:
+        ip: The IP of the host.
+        failures: The number of consecutive failures.
+        last_error: A description of the last failure.
+        retry_at: The `time.monotonic()` time when the next probe is allowed.
+    """
+
+    ip: str
+    failures: int = 0
+    last_error: Optional[str] = None
+    retry_at: float = 0
+    _opened: int = 0
+    _probing: bool = False
+
+    @property
+    def state(self) -> CircuitState:
+        threshold = settings.get("circuit_breaker_threshold", 3)
+        if not threshold or self.failures < threshold:
+            return CircuitState.CLOSED
+        if time.monotonic() < self.retry_at:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    @property
+    def retry_in(self) -> float:
+        return max(self.retry_at - time.monotonic(), 0)
+
+    def allow(self) -> bool:
+        """Check whether a connection to the host should be attempted.
+
+        When the circuit is half-open this claims the probe, so the caller must report
+        the outcome with `record_success()`, `record_failure()`, or `release()`.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened = 0
+        self._probing = False
+        # a healthy host is the same as an unknown one
+        if _hosts.get(self.ip) is self:
+            del _hosts[self.ip]
+
+    def record_failure(self, error: str = None) -> None:
+        tracked = _hosts.get(self.ip)
+        if tracked is not None and tracked is not self:
+            # another connection started tracking this host first
+            tracked.record_failure(error)
+            return
+        _track(self)
+        self.failures += 1
+        self.last_error = error
+        self._probing = False
+        if self.failures >= settings.get("circuit_breaker_threshold", 3):
+            backoff = settings.get("circuit_breaker_backoff", 10) * 2**self._opened
+            backoff = min(backoff, settings.get("circuit_breaker_max_backoff", 300))
+            self.retry_at = time.monotonic() + backoff
+            self._opened += 1
+
+    def release(self) -> None:
+        """Give up a probe without an outcome, such as when the connection was cancelled."""
+        self._probing = False
+
+    def record(self, error: BaseException) -> None:
+        """Record the outcome of a connection which raised an error."""
+        if deadline.expired():
+            # our own time budget ran out, which says nothing about the host
+            self.release()
+        elif is_unreachable(error):
+            self.record_failure(f"{type(error).__name__}: {error}")
+        else:
+            # something answered, so the host is up
+            self.record_success()
+
+
+# hosts with failures, in order of their last failure
+_hosts: Dict[str, HostHealth] = {}
+
+
+def _track(host: HostHealth) -> None:
+    _hosts.pop(host.ip, None)
+    _hosts[host.ip] = host
+    limit = settings.get("circuit_breaker_max_hosts", 10000)
+    while limit and len(_hosts) > limit:
+        del _hosts[next(iter(_hosts))]
+
+
+def get_health(ip: str) -> HostHealth:
+    """Get the [`HostHealth`][pyasic.misc.health.HostHealth] of a host.
+
+    A host without failures is not tracked until a failure is recorded on it.
+    """
+    ip = str(ip)
+    host = _hosts.get(ip)
+    if host is None:
+        host = HostHealth(ip=ip)
+    return host
+
+
+def is_healthy(ip: str) -> bool:
+    """Check whether a host can be connected to, so pollers can skip hosts with an open circuit."""
+    host = _hosts.get(str(ip))
+    return host is None or host.state != CircuitState.OPEN
+
+
+def unhealthy_hosts() -> List[HostHealth]:
+    """Get every host with an open or half-open circuit."""
+    return [h for h in _hosts.values() if h.state != CircuitState.CLOSED]
+
+
+def reset(ip: str = None) -> None:
+    """Forget the health of a host, or of every host if none is passed."""
+    if ip is None:
+        _hosts.clear()
+    else:
+        _hosts.pop(str(ip), None)
+
+
+def is_unreachable(error: BaseException) -> bool:
+    """Check whether an error, or any error it was raised from, means the host can't be reached."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(
+            error, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException)
+        ):
+            return True
+        if isinstance(error, OSError) and error.errno in _UNREACHABLE_ERRNOS:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class HealthCheckTransport(httpx.AsyncHTTPTransport):
+    """An HTTP transport which fails fast for hosts with an open circuit, and records the outcome of each request."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = get_health(request.url.host)
+        if not host.allow():
+            raise httpx.ConnectError(
+                f"{host.ip} is unreachable, retrying in {host.retry_in:.0f}s",
+                request=request,
+            )
+        left = deadline.remaining()
+        if left is not None:
+            request.extensions["timeout"] = {
+                k: left if v is None else min(v, left)
+                for k, v in request.extensions.get("timeout", {}).items()
+            }
+        try:
+            response = await super().handle_async_request(request)
+        except asyncio.CancelledError:
+            host.release()
+            raise
+        except Exception as e:
+            host.record(e)
+            raise
+        host.record_success()
+        return response
@@ -0,0 +1,435 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Hooks to see where a poll spends its time.
+
+Every hook added with [`add_hook()`][pyasic.misc.instrument.add_hook] is called with an
+[`Event`][pyasic.misc.instrument.Event] for each RPC command, web request, gRPC call,
+SSH command, factory detection stage and data parser.  Without hooks, instrumented code
+only checks whether `hooks` is empty, so instrumentation costs next to nothing when unused.
+
+[`collect()`][pyasic.misc.instrument.collect] adds a [`Collector`][pyasic.misc.instrument.Collector]
+hook, which keeps latency histograms and bytes transferred per backend and command.
+A [`LoopLagMonitor`][pyasic.misc.instrument.LoopLagMonitor] measures how long the event loop is blocked.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    """One instrumented operation.
+
+    Attributes:
+        kind: What was done, one of `rpc`, `web`, `grpc`, `ssh`, `factory` or `parse`.
+        backend: The class or protocol which did it, such as `BTMinerRPCAPI`.
+        command: The command, request path, detection stage or data field.
+        ip: The IP of the miner.
+        duration: How long it took, in seconds.
+        sent: The number of bytes sent.
+        received: The number of bytes received.
+        error: The type of the error raised, if any.
+    """
+
+    kind: str
+    backend: str
+    command: str
+    ip: str
+    duration: float
+    sent: int = 0
+    received: int = 0
+    error: Optional[str] = None
+
+
+hooks: List[Callable[[Event], None]] = []
+
+
+def add_hook(hook: Callable[[Event], None]) -> None:
+    """Call `hook` with every instrumented [`Event`][pyasic.misc.instrument.Event].
+
+    Hooks are called inline, so they should be quick, and errors they raise are logged and ignored.
+    """
+    hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Event], None]) -> None:
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def emit(
+    kind: str,
+    backend: str,
+    command: str,
+    ip: str,
+    duration: float,
+    sent: int = 0,
+    received: int = 0,
+    error: Optional[BaseException] = None,
+) -> None:
+    event = Event(
+        kind,
+        backend,
+        str(command),
+        str(ip),
+        duration,
+        sent,
+        received,
+        None if error is None else type(error).__name__,
+    )
+    for hook in list(hooks):
+        try:
+            hook(event)
+        except Exception as e:
+            logger.warning("Instrumentation hook %s failed: %s", hook, e)
+
+
+def wrap(
+    send: Callable[[], Awaitable[Any]],
+    kind: str,
+    backend: str,
+    command: str,
+    ip: str,
+    sent: int = 0,
+) -> Callable[[], Awaitable[Any]]:
+    """Wrap a coroutine function of no arguments to emit an event when it finishes.
+
+    Only call this when `hooks` isn't empty, so uninstrumented calls don't pay for the wrapper.
+    """
+
+    @functools.wraps(send)
+    async def timed() -> Any:
+        start = time.perf_counter()
+        error = None
+        result = None
+        try:
+            result = await send()
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            emit(
+                kind,
+                backend,
+                command,
+                ip,
+                time.perf_counter() - start,
+                sent=sent,
+                received=size(result),
+                error=error,
+            )
+
+    return timed
+
+
+def size(data: Any) -> int:
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data)
+    if hasattr(data, "__bytes__"):
+        # protobuf messages
+        return len(bytes(data))
+    return 0
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """A web transport which emits a `web` event for each request sent through `inner`."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+            await response.aread()
+        except BaseException as e:
+            self._emit(request, start, error=e)
+            raise
+        self._emit(request, start, received=len(response.content))
+        return response
+
+    @staticmethod
+    def _emit(
+        request: httpx.Request,
+        start: float,
+        received: int = 0,
+        error: BaseException = None,
+    ) -> None:
+        try:
+            sent = len(request.content)
+        except httpx.RequestNotRead:
+            sent = 0
+        emit(
+            "web",
+            "web",
+            f"{request.method} {request.url.path}",
+            request.url.host,
+            time.perf_counter() - start,
+            sent=sent,
+            received=received,
+            error=error,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def transport(inner: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """Wrap a web transport to emit events, if there are any hooks."""
+    if hooks:
+        return InstrumentedTransport(inner)
+    return inner
+
+
+class LatencyHistogram:
+    """An HDR style histogram of latencies.
+
+    Values are counted in log-linear buckets of whole microseconds, so percentiles are
+    accurate to within `1 / 2 ** (precision - 1)` of the true value (about 1.6% by default)
+    however wide the range, while only using memory for the buckets which were hit.
+
+    Parameters:
+        precision: The number of bits of each bucketed value to keep.
+    """
+
+    def __init__(self, precision: int = 7):
+        self.precision = precision
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def __repr__(self):
+        return f"LatencyHistogram: {self.count} values, p50={self.percentile(0.5)}, p99={self.percentile(0.99)}"
+
+    def record(self, seconds: float) -> None:
+        index = self._index(max(0, int(seconds * 1_000_000)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Can only merge histograms with the same precision.")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Get the latency in seconds which `q` (from 0 to 1) of the values are at or below."""
+        if not self.count:
+            return None
+        target = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                value = self._value(index) / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.mean,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "p999": self.percentile(0.999),
+            "max": self.max,
+        }
+
+    def _index(self, value: int) -> int:
+        linear = 1 << self.precision
+        if value < linear:
+            return value
+        shift = value.bit_length() - self.precision
+        half = linear >> 1
+        return linear + (shift - 1) * half + (value >> shift) - half
+
+    def _value(self, index: int) -> int:
+        # the middle of the bucket
+        linear = 1 << self.precision
+        if index < linear:
+            return index
+        half = linear >> 1
+        shift, top = divmod(index - linear, half)
+        shift += 1
+        return ((top + half) << shift) + (1 << (shift - 1))
+
+
+@dataclass
+class CommandStats:
+    """The aggregated events of one backend and command.
+
+    Attributes:
+        kind: What was done.
+        backend: The class or protocol which did it.
+        command: The command, request path, detection stage or data field.
+        latency: A histogram of the durations.
+        sent: The total bytes sent.
+        received: The total bytes received.
+        errors: The number of events which failed.
+        cancelled: The number of events which were cancelled, such as the losing detection stages.
+    """
+
+    kind: str
+    backend: str
+    command: str
+    latency: LatencyHistogram
+    sent: int = 0
+    received: int = 0
+    errors: int = 0
+    cancelled: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "backend": self.backend,
+            "command": self.command,
+            **self.latency.as_dict(),
+            "total": self.latency.total,
+            "sent": self.sent,
+            "received": self.received,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+        }
+
+
+class Collector:
+    """A hook which aggregates events into [`CommandStats`][pyasic.misc.instrument.CommandStats] per backend and command.
+
+    Parameters:
+        precision: The precision of each latency histogram.
+    """
+
+    def __init__(self, precision: int = 7):
+        self.precision = precision
+        self.stats: Dict[Tuple[str, str, str], CommandStats] = {}
+
+    def __call__(self, event: Event) -> None:
+        key = (event.kind, event.backend, event.command)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = CommandStats(
+                *key, latency=LatencyHistogram(self.precision)
+            )
+        stats.latency.record(event.duration)
+        stats.sent += event.sent
+        stats.received += event.received
+        if event.error == "CancelledError":
+            stats.cancelled += 1
+        elif event.error is not None:
+            stats.errors += 1
+
+    def reset(self) -> None:
+        self.stats = {}
+
+    def report(self) -> List[dict]:
+        """Get the stats of every backend and command, with the most total time first."""
+        return [
+            s.as_dict()
+            for s in sorted(self.stats.values(), key=lambda s: -s.latency.total)
+        ]
+
+
+@contextmanager
+def collect(precision: int = 7) -> Iterator[Collector]:
+    """Aggregate every event until this context exits."""
+    collector = Collector(precision)
+    add_hook(collector)
+    try:
+        yield collector
+    finally:
+        remove_hook(collector)
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop runs a task sleeping in it, which is how long other work blocked the loop.
+
+    Every `interval` seconds, the time the wake up was late by is recorded in `histogram`.
+    Lag shows as inflated timeouts for every miner in flight, so it is worth watching while
+    tuning how much parsing is [offloaded][pyasic.misc.offload].
+
+    Parameters:
+        interval: The time in seconds between samples.
+        precision: The precision of the histogram.
+    """
+
+    def __init__(self, interval: float = 0.05, precision: int = 7):
+        self.interval = interval
+        self.histogram = LatencyHistogram(precision)
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f"LoopLagMonitor: {self.histogram}"
+
+    async def __aenter__(self) -> LoopLagMonitor:
+        self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    def start(self) -> None:
+        """Start sampling on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling, the samples taken are kept."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def reset(self) -> None:
+        self.histogram = LatencyHistogram(self.histogram.precision)
+
+    def report(self) -> dict:
+        return self.histogram.as_dict()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.histogram.record(max(0.0, loop.time() - start - self.interval))
@@ -0,0 +1,130 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Parse large responses in an executor, so the event loop keeps serving other miners meanwhile.
+
+Offloading is off by default.  Once the `parse_offload_threshold` setting is set to a size in
+bytes, responses at least that large are parsed by [`run()`][pyasic.misc.offload.run] in an
+executor, and smaller ones are still parsed inline, where handing them off would cost more than
+parsing them.  The executor is a thread pool unless another is set with
+[`set_executor()`][pyasic.misc.offload.set_executor], functions passed to a process pool have to
+be importable module level functions.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import json as jsonlib
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+import httpx
+
+from pyasic import settings
+
+T = TypeVar("T")
+
+# the longest time data is parsed for in one go before other tasks get a turn
+SLICE = 0.005
+
+_executor: Optional[Executor] = None
+
+
+def threshold() -> Optional[int]:
+    """Get the size in bytes from which responses are offloaded, or `None` if offloading is off."""
+    return settings.get("parse_offload_threshold")
+
+
+def set_executor(executor: Optional[Executor]) -> Optional[Executor]:
+    """Set the executor large responses are parsed in.
+
+    Parameters:
+        executor: The executor to use, or `None` to go back to the default thread pool.
+
+    Returns:
+        The executor which was used before, it is not shut down.
+    """
+    global _executor
+    old, _executor = _executor, executor
+    return old
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(thread_name_prefix="pyasic-parse")
+    return _executor
+
+
+async def run(func: Callable[..., T], *args: Any, size: int) -> T:
+    """Call `func(*args)`, in the executor if `size` is at least the offload threshold.
+
+    Parameters:
+        func: The parsing function.
+        *args: The arguments to call it with.
+        size: The size in bytes of the data being parsed.
+
+    Returns:
+        The result of `func`.
+    """
+    limit = settings.get("parse_offload_threshold")
+    if limit is None or size < limit:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args))
+
+
+class Slicer:
+    """Give other tasks a turn while a long run of inline parsing steps goes on.
+
+    Only steps which ran without waiting on anything count towards the run, a step which
+    waited (such as on a network request) already gave other tasks a turn and starts a new run.
+    Only does anything while offloading is on.
+    """
+
+    def __init__(self):
+        self.enabled = settings.get("parse_offload_threshold") is not None
+        self.start = time.monotonic()
+        self._yielded = False
+        self._marker: Optional[asyncio.Handle] = None
+
+    def begin(self) -> None:
+        """Mark the start of a parsing step."""
+        if not self.enabled:
+            return
+        self._yielded = False
+        if self._marker is None:
+            # only runs once the step lets the event loop run other callbacks
+            self._marker = asyncio.get_running_loop().call_soon(self._mark)
+
+    def _mark(self) -> None:
+        self._marker = None
+        self._yielded = True
+
+    async def checkpoint(self) -> None:
+        """Yield to the event loop if the steps since the last yield ran for longer than `SLICE` without waiting."""
+        if not self.enabled:
+            return
+        if self._yielded:
+            self.start = time.monotonic()
+        elif time.monotonic() - self.start > SLICE:
+            await asyncio.sleep(0)
+            self.start = time.monotonic()
+
+
+async def json(response: httpx.Response) -> Any:
+    """Parse the JSON body of a web response, in the executor if it is large enough."""
+    return await run(jsonlib.loads, response.content, size=len(response.content))
@@ -0,0 +1,92 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Parse each raw response once per poll, no matter how many data functions use it.
+
+While a [`parse_cache()`][pyasic.misc.parse_cache.parse_cache] is open, functions
+decorated with [`parse_once`][pyasic.misc.parse_cache.parse_once] remember their
+result for the exact object they were called with.  `get_data()` opens one for
+every poll, so results never outlive the responses they were parsed from.
+"""
+from __future__ import annotations
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    """How often `parse_once` functions were answered from a `parse_cache()`.
+
+    Attributes:
+        hits: The number of calls answered from the cache.
+        misses: The number of calls which had to parse.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+
+stats = CacheStats()
+
+_cache: ContextVar[Optional[Dict[Tuple[int, int], Tuple[Any, Any]]]] = ContextVar(
+    "pyasic_parse_cache", default=None
+)
+
+
+@contextmanager
+def parse_cache() -> Iterator[None]:
+    """Remember the results of `parse_once` functions until this context exits."""
+    token = _cache.set({})
+    try:
+        yield
+    finally:
+        _cache.reset(token)
+
+
+def parse_once(func: Callable[[Any], T]) -> Callable[[Any], T]:
+    """Decorate a function of a single raw response to only run once per response in a `parse_cache()`.
+
+    Results are keyed by the identity of the response, and are shared between
+    callers, so they must not be modified.
+    """
+
+    @functools.wraps(func)
+    def wrapper(raw: Any) -> T:
+        cache = _cache.get()
+        if cache is None:
+            return func(raw)
+        key = (id(func), id(raw))
+        hit = cache.get(key)
+        # the response is kept in the cache, so its id can't be reused while cached
+        if hit is not None and hit[0] is raw:
+            stats.hits += 1
+            return hit[1]
+        stats.misses += 1
+        result = func(raw)
+        cache[key] = (raw, result)
+        return result
+
+    return wrapper
@@ -0,0 +1,51 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Pacing for work that is started in bursts, like uploads or miner identification."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Paces starts so no more than `rate` units start per second on average.
+
+    Only starts are spaced out, so work which takes longer than its share of
+    time can still overlap with the work started after it.
+
+    Parameters:
+        rate: The number of units started per second, or `None` to not limit the rate.
+    """
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self, amount: float = 1) -> None:
+        """Wait until `amount` units can be started.
+
+        Parameters:
+            amount: The number of units to start, e.g. the size of an upload in bytes.
+        """
+        if not self.rate:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + amount / self.rate
+        await asyncio.sleep(start - now)
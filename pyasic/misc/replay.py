@@ -0,0 +1,374 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Record miner traffic to an archive, and replay it later without a network.
+
+While a [`record()`][pyasic.misc.replay.record] is open, every RPC command, web
+request and gRPC call is saved with its response and how long it took.  While a
+[`replay()`][pyasic.misc.replay.replay] is open, the same calls are answered from
+a recording instead, so production payloads and latencies can be reproduced offline.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+from pyasic.errors import APIError
+
+
+@dataclass
+class Exchange:
+    """A single request to a miner and its response.
+
+    Attributes:
+        kind: The protocol used, one of `rpc`, `web` or `grpc`.
+        ip: The IP of the miner.
+        port: The port the request was sent to.
+        label: The command of the request, used to match requests which change every time.
+        request: The raw request.
+        response: The raw response.
+        status: The HTTP status of a web response.
+        headers: The HTTP headers of a web response.
+        message: The response message type of a gRPC call.
+        error: The error raised instead of a response, if any.
+        duration: How long the miner took to respond, in seconds.
+        time: The `time.time()` the request was sent.
+    """
+
+    kind: str
+    ip: str
+    port: int
+    label: str
+    request: bytes
+    response: bytes = b""
+    status: Optional[int] = None
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    message: Optional[str] = None
+    error: Optional[str] = None
+    duration: float = 0.0
+    time: float = 0.0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        # raw bytes survive a round trip through JSON as surrogate escaped text
+        data["request"] = self.request.decode("utf-8", "surrogateescape")
+        data["response"] = self.response.decode("utf-8", "surrogateescape")
+        return {k: v for k, v in data.items() if v not in (None, [])}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Exchange":
+        data = dict(data)
+        data["request"] = data.get("request", "").encode("utf-8", "surrogateescape")
+        data["response"] = data.get("response", "").encode("utf-8", "surrogateescape")
+        data["headers"] = [tuple(h) for h in data.get("headers", [])]
+        return cls(**data)
+
+
+class Recording:
+    """A list of [`Exchange`][pyasic.misc.replay.Exchange]s, saved as JSON lines (gzipped if the path ends in `.gz`).
+
+    Parameters:
+        exchanges: The exchanges to start with.
+    """
+
+    def __init__(self, exchanges: List[Exchange] = None):
+        self.exchanges = list(exchanges or [])
+
+    def __len__(self):
+        return len(self.exchanges)
+
+    def __repr__(self):
+        return f"Recording: {len(self.exchanges)} exchanges"
+
+    @property
+    def hosts(self) -> List[str]:
+        return sorted({e.ip for e in self.exchanges})
+
+    def add(self, exchange: Exchange) -> None:
+        self.exchanges.append(exchange)
+
+    def save(self, path: str) -> None:
+        with _open(path, "wt") as f:
+            for exchange in self.exchanges:
+                f.write(json.dumps(exchange.as_dict(), separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        with _open(path, "rt") as f:
+            return cls([Exchange.from_dict(json.loads(line)) for line in f if line])
+
+
+class Replayer:
+    """Answers requests from a [`Recording`][pyasic.misc.replay.Recording].
+
+    Requests are matched exactly first, then by their label, for requests such as
+    encrypted commands which are different every time.  Repeated requests get the
+    recorded responses in order, starting over once they run out.
+
+    Parameters:
+        recording: The recording to answer from.
+        latency: The share of each recorded duration to wait before answering, `1` to reproduce
+            the recorded latency, or `0` to answer immediately.
+    """
+
+    def __init__(self, recording: Recording, latency: float = 0.0):
+        self.recording = recording
+        self.latency = latency
+        self._exact: Dict[tuple, List[Exchange]] = {}
+        self._labels: Dict[tuple, List[Exchange]] = {}
+        self._cursors: Dict[tuple, int] = {}
+        for exchange in recording.exchanges:
+            key = (exchange.kind, exchange.ip, exchange.port)
+            self._exact.setdefault((*key, exchange.request), []).append(exchange)
+            self._labels.setdefault((*key, exchange.label), []).append(exchange)
+
+    def find(
+        self, kind: str, ip: str, port: int, request: bytes, label: str
+    ) -> Optional[Exchange]:
+        for key, index in [
+            ((kind, str(ip), port, request), self._exact),
+            ((kind, str(ip), port, label), self._labels),
+        ]:
+            exchanges = index.get(key)
+            if exchanges:
+                cursor = self._cursors.get(key, 0)
+                self._cursors[key] = cursor + 1
+                return exchanges[cursor % len(exchanges)]
+        return None
+
+    async def wait(self, exchange: Exchange) -> None:
+        if self.latency and exchange.duration:
+            await asyncio.sleep(exchange.duration * self.latency)
+
+
+_recording: ContextVar[Optional[Recording]] = ContextVar(
+    "pyasic_recording", default=None
+)
+_replayer: ContextVar[Optional[Replayer]] = ContextVar("pyasic_replayer", default=None)
+
+
+@contextmanager
+def record(path: str = None) -> Iterator[Recording]:
+    """Record every request made until this context exits.
+
+    Parameters:
+        path: Where to save the recording on exit, if anywhere.
+    """
+    recording = Recording()
+    token = _recording.set(recording)
+    try:
+        yield recording
+    finally:
+        _recording.reset(token)
+        if path is not None:
+            recording.save(path)
+
+
+@contextmanager
+def replay(source: Union[str, Recording], latency: float = 0.0) -> Iterator[Replayer]:
+    """Answer every request from a recording until this context exits, without using the network.
+
+    Parameters:
+        source: A recording, or the path of a saved one.
+        latency: The share of each recorded duration to wait before answering.
+    """
+    if not isinstance(source, Recording):
+        source = Recording.load(source)
+    replayer = Replayer(source, latency=latency)
+    token = _replayer.set(replayer)
+    try:
+        yield replayer
+    finally:
+        _replayer.reset(token)
+
+
+def recording() -> Optional[Recording]:
+    return _recording.get()
+
+
+def replayer() -> Optional[Replayer]:
+    return _replayer.get()
+
+
+async def exchange(
+    kind: str,
+    ip: str,
+    port: int,
+    request: bytes,
+    send: Callable[[], Awaitable[bytes]],
+    label: str = None,
+) -> bytes:
+    """Send a raw request with `send`, recording or replaying it if either is active.
+
+    Parameters:
+        kind: The protocol used.
+        ip: The IP of the miner.
+        port: The port the request is sent to.
+        request: The raw request.
+        send: Sends the request and returns the raw response.
+        label: The command of the request, for requests which are encrypted, taken from the request if not passed.
+    """
+    if label is None:
+        label = command_label(request)
+    replaying = _replayer.get()
+    if replaying is not None:
+        found = replaying.find(kind, ip, port, request, label)
+        if found is None:
+            raise APIError(f"{ip}: No recorded response to {kind} {label} on {port}.")
+        await replaying.wait(found)
+        if found.error is not None:
+            raise APIError(found.error)
+        return found.response
+    active = _recording.get()
+    if active is None:
+        return await send()
+    entry = Exchange(kind, str(ip), port, label, request, time=time.time())
+    start = time.monotonic()
+    try:
+        entry.response = await send()
+        return entry.response
+    except Exception as e:
+        entry.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        entry.duration = time.monotonic() - start
+        active.add(entry)
+
+
+def transport(inner: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """Wrap a web transport to record or replay its requests, if either is active."""
+    if _replayer.get() is not None:
+        return ReplayTransport(_replayer.get())
+    if _recording.get() is not None:
+        return RecordingTransport(inner, _recording.get())
+    return inner
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """A web transport which records each request and response sent through `inner`."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, recording: Recording):
+        self.inner = inner
+        self.recording = recording
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = Exchange(
+            "web",
+            request.url.host,
+            request.url.port or _default_port(request.url),
+            _web_label(request),
+            _web_request(request),
+            time=time.time(),
+        )
+        start = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(request)
+            entry.response = await response.aread()
+        except Exception as e:
+            entry.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            entry.duration = time.monotonic() - start
+            self.recording.add(entry)
+        entry.status = response.status_code
+        entry.headers = [
+            (k, v)
+            for k, v in response.headers.items()
+            # the body is already decoded, and may be a different length
+            if k not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(
+            response.status_code,
+            headers=entry.headers,
+            content=entry.response,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """A web transport which answers requests from a [`Replayer`][pyasic.misc.replay.Replayer]."""
+
+    def __init__(self, replaying: Replayer):
+        self.replayer = replaying
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        found = self.replayer.find(
+            "web",
+            request.url.host,
+            request.url.port or _default_port(request.url),
+            _web_request(request),
+            _web_label(request),
+        )
+        if found is None:
+            raise httpx.ConnectError(
+                f"No recorded response to {_web_label(request)}", request=request
+            )
+        await self.replayer.wait(found)
+        if found.error is not None:
+            raise httpx.ConnectError(found.error, request=request)
+        return httpx.Response(
+            found.status or 200,
+            headers=found.headers,
+            content=found.response,
+            request=request,
+        )
+
+
+def command_label(request: bytes) -> str:
+    """Get the command of a raw RPC request, for matching requests which change every time."""
+    try:
+        data = json.loads(request)
+    except (ValueError, UnicodeDecodeError):
+        return "raw"
+    if not isinstance(data, dict):
+        return "raw"
+    if "command" in data:
+        return str(data["command"])
+    return "enc" if "enc" in data else "raw"
+
+
+def _web_label(request: httpx.Request) -> str:
+    return f"{request.method} {request.url.path}"
+
+
+def _web_request(request: httpx.Request) -> bytes:
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        # streamed uploads, such as firmware, are matched by their URL only
+        body = b""
+    return f"{request.method} {request.url.raw_path.decode()}\n".encode() + body
+
+
+def _default_port(url: httpx.URL) -> int:
+    return 443 if url.scheme == "https" else 80
+
+
+def _open(path: str, mode: str):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
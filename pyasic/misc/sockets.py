@@ -0,0 +1,84 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Options for the TCP connections pyasic opens, tuned for scanning large networks.
+
+Connections are opened with [`open_connection()`][pyasic.misc.sockets.open_connection], which applies:
+
+- `socket_source_address`, a local address to open connections from, for hosts on several networks.
+- `socket_probe_reset`, to close probe connections with a reset instead of the normal handshake, so
+  scanning a /16 doesn't leave tens of thousands of sockets in `TIME_WAIT` and run out of ports.
+
+Both asyncio and uvloop already set `TCP_NODELAY` on every TCP connection.
+[`run()`][pyasic.misc.sockets.run] runs a coroutine on uvloop when it is installed (`pip install pyasic[uvloop]`).
+"""
+from __future__ import annotations
+
+import asyncio
+import socket
+import struct
+from typing import Any, Coroutine, Optional, Tuple, TypeVar
+
+from pyasic import settings
+
+T = TypeVar("T")
+
+# linger enabled with a timeout of 0, so close() resets the connection
+_LINGER_RESET = struct.pack("ii", 1, 0)
+
+
+def source_address() -> Optional[str]:
+    """Get the local address outgoing connections are opened from, or `None` to let the OS choose."""
+    return settings.get("socket_source_address")
+
+
+async def open_connection(
+    host: str, port: int, *, probe: bool = False
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Open a TCP connection, like `asyncio.open_connection()`, with the socket settings applied.
+
+    Parameters:
+        host: The host to connect to.
+        port: The port to connect to.
+        probe: Whether the connection only checks the port is open, and is closed by this side right away.
+
+    Returns:
+        The reader and writer of the connection.
+    """
+    local = settings.get("socket_source_address")
+    reader, writer = await asyncio.open_connection(
+        host, port, local_addr=(local, 0) if local else None
+    )
+    if probe and settings.get("socket_probe_reset"):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RESET)
+    return reader, writer
+
+
+def run(main: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine like `asyncio.run()`, on a uvloop event loop if uvloop is installed.
+
+    Parameters:
+        main: The coroutine to run.
+
+    Returns:
+        The result of the coroutine.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
+    return uvloop.run(main)
@@ -21,6 +21,9 @@ from typing import AsyncIterator, List, Union
 
 from pyasic import settings
 from pyasic.miners.factory import AnyMiner, miner_factory
+from pyasic.misc import sockets
+
+logger = logging.getLogger(__name__)
 
 
 class MinerNetwork:
@@ -122,7 +125,7 @@ class MinerNetwork:
         return await self.scan_network_for_miners()
 
     async def scan_network_for_miners(self) -> List[AnyMiner]:
-        logging.debug(f"{self} - (Scan Network For Miners) - Scanning")
+        logger.debug("%s - (Scan Network For Miners) - Scanning", self)
 
         miners = await asyncio.gather(
             *[self.ping_and_get_miner(host) for host in self.hosts]
@@ -130,8 +133,8 @@ class MinerNetwork:
 
         # remove all None from the miner list
         miners = list(filter(None, miners))
-        logging.debug(
-            f"{self} - (Scan Network For Miners) - Found {len(miners)} miners"
+        logger.debug(
+            "%s - (Scan Network For Miners) - Found %s miners", self, len(miners)
         )
 
         # return the miner objects
@@ -180,7 +183,7 @@ async def ping_and_get_miner(
 ) -> Union[None, AnyMiner]:
     for _ in range(settings.get("network_ping_retries", 1)):
         try:
-            connection_fut = asyncio.open_connection(str(ip), port)
+            connection_fut = sockets.open_connection(str(ip), port, probe=True)
             # get the read and write streams from the connection
             _, writer = await asyncio.wait_for(
                 connection_fut, timeout=settings.get("network_ping_timeout", 3)
@@ -197,7 +200,7 @@ async def ping_and_get_miner(
         except OSError as e:
             raise ConnectionRefusedError from e
         except Exception as e:
-            logging.warning(f"{str(ip)}: Unhandled ping exception: {e}")
+            logger.warning("%s: Unhandled ping exception: %s", ip, e)
             return
     return
 
@@ -15,15 +15,21 @@
 # ------------------------------------------------------------------------------
 
 import asyncio
+import functools
 import ipaddress
 import json
 import logging
 import re
 import warnings
-from typing import Union
+from typing import Iterable, Union
 
+from pyasic import settings
 from pyasic.errors import APIError, APIWarning
-from pyasic.misc import validate_command_output
+from pyasic.misc import instrument, offload, replay, sockets, validate_command_output
+from pyasic.misc.deadline import bound_timeout
+from pyasic.misc.health import get_health
+
+logger = logging.getLogger(__name__)
 
 
 class BaseMinerRPCAPI:
@@ -64,12 +70,10 @@ class BaseMinerRPCAPI:
         Returns:
             The return data from the API command parsed from JSON into a dict.
         """
-        logging.debug(
-            f"{self} - (Send Privileged Command) - {command} "
-            + f"with args {parameters}"
-            if parameters
-            else ""
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s - (Send Command) - %s with args %s", self, command, parameters
+            )
         # create the command
         cmd = {"command": command, **kwargs}
         if parameters:
@@ -86,7 +90,7 @@ class BaseMinerRPCAPI:
                 raise APIError(data.decode("utf-8"))
             return {}
 
-        data = self._load_api_data(data)
+        data = await offload.run(self._load_api_data, data, size=len(data))
 
         # check for if the user wants to allow errors to return
         validation = validate_command_output(data)
@@ -95,11 +99,11 @@ class BaseMinerRPCAPI:
                 # validate the command succeeded
                 raise APIError(f"{command}: {validation[1]}")
             if allow_warning:
-                logging.warning(
-                    f"{self.ip}: API Command Error: {command}: {validation[1]}"
+                logger.warning(
+                    "%s: API Command Error: %s: %s", self.ip, command, validation[1]
                 )
 
-        logging.debug(f"{self} - (Send Command) - Received data.")
+        logger.debug("%s - (Send Command) - Received data.", self)
         return data
 
     # Privileged command handler, only used by whatsminers, defined here for consistency.
@@ -195,41 +199,107 @@ If you are sure you want to use this command please use API.send_command("{comma
 
     async def _send_bytes(
         self,
-        data: bytes,
+        data: Union[bytes, Iterable[bytes]],
         *,
         port: int = None,
         timeout: int = 100,
+        label: str = None,
     ) -> bytes:
         if port is None:
             port = self.port
-        logging.debug(f"{self} - ([Hidden] Send Bytes) - Sending")
+        if not isinstance(data, (bytes, bytearray)):
+            # streamed payloads (such as firmware) are too large to record
+            return await self._send_socket(data, port=port, timeout=timeout)
+        send = functools.partial(
+            replay.exchange,
+            "rpc",
+            str(self.ip),
+            port,
+            bytes(data),
+            lambda: self._send_socket(data, port=port, timeout=timeout),
+            label,
+        )
+        if instrument.hooks:
+            send = instrument.wrap(
+                send,
+                "rpc",
+                type(self).__name__,
+                label if label is not None else replay.command_label(data),
+                str(self.ip),
+                sent=len(data),
+            )
+        return await send()
+
+    async def _send_socket(
+        self, data: Union[bytes, Iterable[bytes]], *, port: int, timeout: int
+    ) -> bytes:
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("%s - ([Hidden] Send Bytes) - Sending", self)
+        host = get_health(self.ip)
+        if not host.allow():
+            raise APIError(
+                f"{self.ip} is unreachable, retrying in {host.retry_in:.0f}s ({host.last_error})"
+            )
         try:
             # get reader and writer streams
-            reader, writer = await asyncio.open_connection(str(self.ip), port)
+            reader, writer = await asyncio.wait_for(
+                sockets.open_connection(str(self.ip), port),
+                timeout=bound_timeout(settings.get("api_function_timeout", 5)),
+            )
+        except asyncio.CancelledError:
+            host.release()
+            raise
+        except asyncio.TimeoutError as e:
+            host.record(e)
+            logger.warning(
+                "%s - ([Hidden] Send Bytes) - Connect timeout expired.", self
+            )
+            return b"{}"
         # handle OSError 121
         except OSError as e:
+            host.record(e)
             if e.errno == 121:
-                logging.warning(
-                    f"{self} - ([Hidden] Send Bytes) - Semaphore timeout expired."
+                logger.warning(
+                    "%s - ([Hidden] Send Bytes) - Semaphore timeout expired.", self
                 )
             return b"{}"
 
         # send the command
         try:
-            data_task = asyncio.create_task(self._read_bytes(reader, timeout=timeout))
-            logging.debug(f"{self} - ([Hidden] Send Bytes) - Writing")
-            writer.write(data)
-            logging.debug(f"{self} - ([Hidden] Send Bytes) - Draining")
+            data_task = asyncio.create_task(
+                self._read_bytes(reader, timeout=bound_timeout(timeout))
+            )
+            if debug:
+                logger.debug("%s - ([Hidden] Send Bytes) - Writing", self)
+            if isinstance(data, (bytes, bytearray)):
+                writer.write(data)
+            else:
+                # stream large payloads (such as firmware) chunk by chunk
+                for chunk in data:
+                    writer.write(chunk)
+                    await writer.drain()
+            if debug:
+                logger.debug("%s - ([Hidden] Send Bytes) - Draining", self)
             await writer.drain()
 
             await data_task
             ret_data = data_task.result()
-        except TimeoutError:
-            logging.warning(f"{self} - ([Hidden] Send Bytes) - Read timeout expired.")
+        except asyncio.CancelledError:
+            host.release()
+            raise
+        except asyncio.TimeoutError as e:
+            host.record(e)
+            logger.warning("%s - ([Hidden] Send Bytes) - Read timeout expired.", self)
             return b"{}"
+        except Exception as e:
+            host.record(e)
+            raise
+        host.record_success()
 
         # close the connection
-        logging.debug(f"{self} - ([Hidden] Send Bytes) - Closing")
+        if debug:
+            logger.debug("%s - ([Hidden] Send Bytes) - Closing", self)
         writer.close()
         await writer.wait_closed()
 
@@ -239,13 +309,14 @@ If you are sure you want to use this command please use API.send_command("{comma
         ret_data = b""
 
         # loop to receive all the data
-        logging.debug(f"{self} - ([Hidden] Send Bytes) - Receiving")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s - ([Hidden] Send Bytes) - Receiving", self)
         try:
             ret_data = await asyncio.wait_for(reader.read(), timeout=timeout)
         except (asyncio.CancelledError, asyncio.TimeoutError) as e:
             raise e
         except Exception as e:
-            logging.warning(f"{self} - ([Hidden] Send Bytes) - API Command Error {e}")
+            logger.warning("%s - ([Hidden] Send Bytes) - API Command Error %s", self, e)
         return ret_data
 
     @staticmethod
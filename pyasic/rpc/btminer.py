@@ -19,6 +19,7 @@ import base64
 import binascii
 import datetime
 import hashlib
+import itertools
 import json
 import logging
 import re
@@ -31,9 +32,12 @@ from passlib.handlers.md5_crypt import md5_crypt
 
 from pyasic import settings
 from pyasic.errors import APIError
-from pyasic.misc import api_min_version, validate_command_output
+from pyasic.misc import api_min_version, offload, validate_command_output
+from pyasic.misc.firmware import FirmwareImage
 from pyasic.rpc.base import BaseMinerRPCAPI
 
+logger = logging.getLogger(__name__)
+
 ### IMPORTANT ###
 # you need to change the password of the miners using the Whatsminer
 # tool, then you can set them back to admin with this tool, but they
@@ -136,7 +140,7 @@ def create_privileged_cmd(token_data: dict, command: dict) -> bytes:
     Returns:
         The encrypted privileged command to be sent to the miner.
     """
-    logging.debug(f"(Create Prilileged Command) - Creating Privileged Command")
+    logger.debug("(Create Privileged Command) - Creating Privileged Command")
     # add token to command
     command["token"] = token_data["host_sign"]
     # encode host_passwd data and get hexdigest
@@ -265,19 +269,23 @@ class BTMinerRPCAPI(BaseMinerRPCAPI):
         timeout: int = 10,
         **kwargs,
     ) -> dict:
-        logging.debug(
-            f"{self} - (Send Privileged Command) - {command} " + f"with args {kwargs}"
-            if len(kwargs) > 0
-            else ""
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s - (Send Privileged Command) - %s with args %s",
+                self,
+                command,
+                kwargs,
+            )
+        # the encrypted request differs every time, so it is recorded under the command it carries
+        label = command.decode() if isinstance(command, bytes) else str(command)
         command = {"cmd": command, **kwargs}
 
         token_data = await self.get_token()
         enc_command = create_privileged_cmd(token_data, command)
 
-        logging.debug(f"{self} - (Send Privileged Command) - Sending")
+        logger.debug("%s - (Send Privileged Command) - Sending", self)
         try:
-            data = await self._send_bytes(enc_command, timeout=timeout)
+            data = await self._send_bytes(enc_command, timeout=timeout, label=label)
         except (asyncio.CancelledError, asyncio.TimeoutError):
             if ignore_errors:
                 return {}
@@ -287,12 +295,17 @@ class BTMinerRPCAPI(BaseMinerRPCAPI):
             if ignore_errors:
                 return {}
             raise APIError("No data was returned from the API.")
-        data = self._load_api_data(data)
+        data = await offload.run(self._load_api_data, data, size=len(data))
 
         try:
-            data = parse_btminer_priviledge_data(self.token, data)
+            data = await offload.run(
+                parse_btminer_priviledge_data,
+                self.token,
+                data,
+                size=len(data.get("enc", "")),
+            )
         except Exception as e:
-            logging.info(f"{str(self.ip)}: {e}")
+            logger.info("%s: %s", self.ip, e)
 
         if not ignore_errors:
             # if it fails to validate, it is likely an error
@@ -312,7 +325,7 @@ class BTMinerRPCAPI(BaseMinerRPCAPI):
             An encoded token and md5 password, which are used for the privileged API.
         </details>
         """
-        logging.debug(f"{self} - (Get Token) - Getting token")
+        logger.debug("%s - (Get Token) - Getting token", self)
         if self.token:
             if self.token["timestamp"] > datetime.datetime.now() - datetime.timedelta(
                 minutes=30
@@ -342,7 +355,7 @@ class BTMinerRPCAPI(BaseMinerRPCAPI):
             "host_passwd_md5": host_passwd_md5,
             "timestamp": datetime.datetime.now(),
         }
-        logging.debug(f"{self} - (Get Token) - Gathered token data: {self.token}")
+        logger.debug("%s - (Get Token) - Gathered token data: %s", self, self.token)
         return self.token
 
     async def open_api(self):
@@ -560,11 +573,11 @@ class BTMinerRPCAPI(BaseMinerRPCAPI):
         """
         return await self.send_privileged_command("set_normal_power")
 
-    async def update_firmware(self, firmware: bytes):
+    async def update_firmware(self, firmware: Union[bytes, FirmwareImage]):
         """Upgrade the firmware running on the miner and using the firmware passed in bytes.
 
         Parameters:
-            firmware (bytes): The firmware binary data to be uploaded.
+            firmware (bytes | FirmwareImage): The firmware binary data to be uploaded, a [`FirmwareImage`][pyasic.misc.firmware.FirmwareImage] is streamed in chunks.
 
         Returns:
             bool: A boolean indicating the success of the firmware upgrade.
@@ -576,7 +589,10 @@ class BTMinerRPCAPI(BaseMinerRPCAPI):
         if not ready.get("Msg") == "ready":
             raise APIError(f"Not ready for firmware update: {self}")
         file_size = struct.pack("<I", len(firmware))
-        await self._send_bytes(file_size + firmware)
+        if isinstance(firmware, FirmwareImage):
+            await self._send_bytes(itertools.chain([file_size], firmware.chunks()))
+        else:
+            await self._send_bytes(file_size + firmware)
         return True
 
     async def reboot(self, timeout: int = 10) -> dict:
@@ -27,6 +27,16 @@ _settings = {  # defaults
     "factory_get_timeout": 3,
     "get_data_retries": 1,
     "api_function_timeout": 5,
+    "ssh_connection_timeout": 10,
+    "ssh_pool_idle_timeout": 30,
+    "firmware_upload_timeout": 600,
+    "circuit_breaker_threshold": 3,
+    "circuit_breaker_backoff": 10,
+    "circuit_breaker_max_backoff": 300,
+    "circuit_breaker_max_hosts": 10000,
+    "parse_offload_threshold": None,
+    "socket_source_address": None,
+    "socket_probe_reset": False,
     "antminer_mining_mode_as_str": False,
     "default_whatsminer_rpc_password": "admin",
     "default_innosilicon_web_password": "admin",
@@ -48,8 +58,18 @@ ssl_cxt = httpx.create_ssl_context()
 
 # this function returns an AsyncHTTPTransport instance to perform asynchronous HTTP requests
 # using those options.
-def transport(verify: Union[str, bool, SSLContext] = ssl_cxt):
-    return AsyncHTTPTransport(verify=verify)
+def transport(
+    verify: Union[str, bool, SSLContext] = ssl_cxt
+) -> httpx.AsyncBaseTransport:
+    # imported here since the health tracker reads its thresholds from these settings
+    from pyasic.misc import instrument, replay, sockets
+    from pyasic.misc.health import HealthCheckTransport
+
+    return instrument.transport(
+        replay.transport(
+            HealthCheckTransport(verify=verify, local_address=sockets.source_address())
+        )
+    )
 
 
 def get(key: str, other: Any = None) -> Any:
@@ -0,0 +1,92 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+"""Serve a simulated farm until interrupted.
+
+    python -m pyasic.simulator --count 5000 --miner antminer=3 --miner whatsminer=1
+"""
+import argparse
+import asyncio
+
+from pyasic.simulator.behavior import SimulatorBehavior
+from pyasic.simulator.farm import MinerSimulator
+from pyasic.simulator.miners import SIMULATORS
+
+
+def parse_args(args: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyasic.simulator", description="Serve simulated miners."
+    )
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument(
+        "--miner",
+        action="append",
+        metavar="TYPE[=WEIGHT]",
+        help=f"Repeat to mix types, from {', '.join(SIMULATORS)}.",
+    )
+    parser.add_argument("--network", default="127.1.0.0/16")
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Use 0.0.0.0 to serve every miner from one listener per port, on every interface.",
+    )
+    parser.add_argument("--per-ip", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args(args)
+
+
+def parse_mix(specs: list) -> dict:
+    mix = {}
+    for spec in specs or ["antminer"]:
+        kind, _, weight = spec.partition("=")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+async def serve(args: argparse.Namespace) -> None:
+    farm = MinerSimulator.generate(
+        args.count,
+        miner=parse_mix(args.miner),
+        network=args.network,
+        behavior=SimulatorBehavior(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            drop_rate=args.drop_rate,
+            payload_padding=args.padding,
+        ),
+        seed=args.seed,
+        host=args.host,
+        per_ip=args.per_ip,
+    )
+    async with farm:
+        print(f"Serving {len(farm.miners)} miners on {args.network}")
+        await asyncio.Event().wait()
+
+
+def main(args: list = None) -> None:
+    try:
+        asyncio.run(serve(parse_args(args)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import asyncio
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class SimulatorBehavior:
+    """How a simulated miner responds, so scans and polls can be tested against slow or unreliable miners.
+
+    Attributes:
+        latency: The time in seconds taken to answer each request.
+        jitter: The maximum random variation in seconds added to or removed from `latency`.
+        error_rate: The fraction of requests answered with an error.
+        drop_rate: The fraction of requests where the connection is closed without an answer.
+        payload_padding: The number of filler bytes added to each JSON response, to simulate large payloads.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    drop_rate: float = 0.0
+    payload_padding: int = 0
+
+    async def delay(self, rng: random.Random) -> None:
+        delay = self.latency
+        if self.jitter:
+            delay += rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+    def drops(self, rng: random.Random) -> bool:
+        return self.drop_rate > 0 and rng.random() < self.drop_rate
+
+    def pad(self, data: dict) -> dict:
+        if self.payload_padding > 0 and isinstance(data, dict):
+            data = {**data, "padding": "0" * self.payload_padding}
+        return data
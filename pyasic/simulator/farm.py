@@ -0,0 +1,192 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import asyncio
+import ipaddress
+import itertools
+import random
+from typing import Dict, Iterable, List, Optional, Type, Union
+
+from grpclib.server import Server
+
+from pyasic.simulator.behavior import SimulatorBehavior
+from pyasic.simulator.miners import SIMULATORS, SimulatedMiner
+from pyasic.simulator.servers import GRPCRouter, local_address
+
+MinerSpec = Union[str, Type[SimulatedMiner]]
+
+
+class MinerSimulator:
+    """A farm of simulated miners, served from loopback addresses on one machine.
+
+    Each port gets a listener on `host`, and connections are routed to a miner
+    by the local address they were made to.  Miners `host` can't reach are
+    bound on their own address, so by default only loopback is listened on.
+    Set `host` to `0.0.0.0` to serve every miner from a single wildcard
+    listener per port, so 10k+ miners only use a handful of listening sockets,
+    at the cost of listening on every interface.  Set `per_ip` to bind every
+    miner IP separately, when wildcard ports are already in use.
+
+    Parameters:
+        miners: The miners to serve.
+        host: The address to listen on when not binding per IP.
+        per_ip: Whether to bind each miner IP separately.
+        backlog: The connection backlog of each listener.
+    """
+
+    def __init__(
+        self,
+        miners: Iterable[SimulatedMiner] = None,
+        host: str = "127.0.0.1",
+        per_ip: bool = False,
+        backlog: int = 4096,
+    ):
+        self.host = host
+        self.per_ip = per_ip
+        self.backlog = backlog
+        self.miners: Dict[str, SimulatedMiner] = {}
+        self._servers: list = []
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        for miner in miners or []:
+            self.add(miner)
+
+    def __repr__(self):
+        return f"MinerSimulator: {len(self.miners)} miners"
+
+    @classmethod
+    def generate(
+        cls,
+        count: int,
+        miner: Union[MinerSpec, Dict[MinerSpec, float]] = "antminer",
+        network: str = "127.1.0.0/16",
+        behavior: SimulatorBehavior = None,
+        seed: int = None,
+        **kwargs,
+    ) -> "MinerSimulator":
+        """Create a farm of `count` miners with sequential IPs from `network`.
+
+        Parameters:
+            count: The number of miners to create.
+            miner: The type of miner to simulate, as a name from `SIMULATORS` or a class,
+                or a dict of types to their share of the farm.
+            network: The network to take IPs from.
+            behavior: The latency and failures of every miner.
+            seed: A seed for reproducible farms.
+            **kwargs: Arguments to pass to `MinerSimulator`.
+        """
+        rng = random.Random(seed)
+        if isinstance(miner, dict):
+            kinds = [_resolve(m) for m in miner]
+            weights = list(miner.values())
+        else:
+            kinds, weights = [_resolve(miner)], [1]
+        hosts = list(itertools.islice(ipaddress.ip_network(network).hosts(), count))
+        if len(hosts) < count:
+            raise ValueError(f"{network} does not have {count} usable addresses.")
+        farm = cls(**kwargs)
+        for ip in hosts:
+            kind = rng.choices(kinds, weights)[0]
+            farm.add(kind(str(ip), behavior=behavior, rng=random.Random(rng.random())))
+        return farm
+
+    @property
+    def ips(self) -> List[str]:
+        return list(self.miners)
+
+    def add(self, miner: SimulatedMiner) -> None:
+        self.miners[miner.ip] = miner
+
+    def get(self, ip: str) -> Optional[SimulatedMiner]:
+        return self.miners.get(ip)
+
+    async def start(self) -> None:
+        ports = {}
+        for miner in self.miners.values():
+            for port, kind in miner.ports.items():
+                ports.setdefault(port, {"kind": kind, "miners": []})
+                ports[port]["miners"].append(miner)
+        for port, info in ports.items():
+            hosts = dict.fromkeys(
+                self.host if self._serves(m.ip) else m.ip for m in info["miners"]
+            )
+            for host in hosts:
+                if info["kind"] == "grpc":
+                    services = {s for m in info["miners"] for s in m.grpc_services}
+                    server = Server([GRPCRouter(list(services), self.get)])
+                    await server.start(
+                        host, port, reuse_address=True, backlog=self.backlog
+                    )
+                else:
+                    server = await asyncio.start_server(
+                        lambda r, w, p=port: self._handle(r, w, p),
+                        host,
+                        port,
+                        reuse_address=True,
+                        backlog=self.backlog,
+                    )
+                self._servers.append(server)
+
+    def _serves(self, ip: str) -> bool:
+        # whether the listener on the host reaches a miner, loopback listeners only get their own address
+        if self.per_ip:
+            return False
+        return self.host in ("0.0.0.0", "::", "") or self.host == ip
+
+    async def stop(self) -> None:
+        for server in self._servers:
+            server.close()
+        # idle keep-alive connections would otherwise hold the servers open
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=1)
+        for task in self._connections:
+            task.cancel()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+    async def __aenter__(self) -> "MinerSimulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, port: int
+    ) -> None:
+        miner = self.miners.get(local_address(writer)[0])
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            if miner is not None and port in miner.ports:
+                await miner.handle(reader, writer, port)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+
+
+def _resolve(miner: MinerSpec) -> Type[SimulatedMiner]:
+    if isinstance(miner, str):
+        try:
+            return SIMULATORS[miner.lower()]
+        except KeyError:
+            raise ValueError(
+                f"Unknown simulator {miner}, choose from {', '.join(SIMULATORS)}."
+            ) from None
+    return miner
@@ -0,0 +1,239 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import time
+
+from pyasic.config import MinerConfig
+from pyasic.simulator.miners.base import SimulatedMiner, rpc_status
+from pyasic.simulator.servers import DigestAuth, HTTPRequest, HTTPResponse
+
+
+class SimulatedAntminer(SimulatedMiner):
+    """Stock Antminer firmware, with bmminer RPC on 4028 and the digest authenticated CGI API on 80."""
+
+    model = "Antminer S19 Pro"
+    ports = {4028: "rpc", 80: "http"}
+    web_password = "root"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.auth = DigestAuth("antMiner Configuration", "root", self.web_password)
+
+    @property
+    def work_mode(self) -> str:
+        return "0" if self.state.mining else "1"
+
+    # RPC
+    def rpc_version(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("BMMiner versions", 22),
+            "VERSION": [
+                {
+                    "BMMiner": "1.0.0",
+                    "API": "3.1",
+                    "Miner": "uart_trans.1.3",
+                    "CompileTime": "Thu Jul 13 19:28:40 CST 2023",
+                    "Type": self.model,
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_summary(self, **kwargs) -> dict:
+        rate = sum(self.state.board_rates()) * 1000
+        return {
+            "STATUS": rpc_status("Summary", 11),
+            "SUMMARY": [
+                {
+                    "Elapsed": self.state.uptime,
+                    "GHS 5s": round(rate, 2),
+                    "GHS av": round(rate, 2),
+                    "Accepted": self.state.accepted,
+                    "Rejected": self.state.rejected,
+                    "Hardware Errors": 0,
+                    "Best Share": 0,
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_stats(self, request: dict = None, **kwargs) -> dict:
+        if request is not None and request.get("new_api"):
+            return self._stats_new_api()
+        stats = {
+            "Elapsed": self.state.uptime,
+            "GHS 5s": round(sum(self.state.board_rates()) * 1000, 2),
+            "miner_count": self.state.hashboards,
+            "fan_num": len(self.state.fans),
+            "total_rateideal": round(self.state.expected_hashrate * 1000, 2),
+            "rate_unit": "GH",
+        }
+        speeds = self.state.fan_speeds
+        for idx in range(4):
+            stats[f"fan{idx + 1}"] = speeds[idx] if idx < len(speeds) else 0
+        for board, rate in enumerate(self.state.board_rates()):
+            slot = board + 1
+            stats[f"chain_acn{slot}"] = self.state.chips
+            stats[f"chain_acs{slot}"] = " oooooooo" * (self.state.chips // 8)
+            stats[f"chain_rate{slot}"] = round(rate * 1000, 2)
+            stats[f"chain_rateideal{slot}"] = round(self.state.board_hashrate * 1000, 2)
+            stats[f"temp{slot}"] = self.state.chip_temp
+            stats[f"temp2_{slot}"] = self.state.board_temp
+        return {
+            "STATUS": rpc_status("CGMiner stats", 70),
+            "STATS": [
+                {"BMMiner": "1.0.0", "Miner": "uart_trans.1.3", "Type": self.model},
+                stats,
+            ],
+            "id": 1,
+        }
+
+    def _stats_new_api(self) -> dict:
+        chains = []
+        for board, rate in enumerate(self.state.board_rates()):
+            chains.append(
+                {
+                    "index": board,
+                    "freq_avg": 525,
+                    "rate_ideal": round(self.state.board_hashrate * 1000, 2),
+                    "rate_real": round(rate * 1000, 2),
+                    "asic_num": self.state.chips,
+                    "temp_pcb": [self.state.board_temp] * 4,
+                    "temp_chip": [self.state.chip_temp] * 4,
+                    "sn": f"SIM{board}{self.state.mac.replace(':', '')}",
+                }
+            )
+        return {
+            "STATUS": {
+                "STATUS": "S",
+                "when": 0,
+                "Msg": "stats",
+                "api_version": "1.0.0",
+            },
+            "INFO": {"miner_version": "uart_trans.1.3", "type": self.model},
+            "STATS": [
+                {
+                    "elapsed": self.state.uptime,
+                    "rate_5s": round(sum(self.state.board_rates()) * 1000, 2),
+                    "rate_ideal": round(self.state.expected_hashrate * 1000, 2),
+                    "rate_unit": "GH/s",
+                    "chain_num": self.state.hashboards,
+                    "fan_num": len(self.state.fans),
+                    "fan": self.state.fan_speeds,
+                    "chain": chains,
+                }
+            ],
+        }
+
+    def rpc_devdetails(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("Device Details", 69),
+            "DEVDETAILS": [
+                {"DEVDETAILS": idx, "Name": "BTM", "ID": idx, "Model": self.model}
+                for idx in range(self.state.hashboards)
+            ],
+            "id": 1,
+        }
+
+    # web
+    def get_miner_conf(self) -> dict:
+        conf = self.state.config.as_am_modern()
+        conf.pop("miner-mode", None)
+        conf["bitmain-work-mode"] = self.work_mode
+        return conf
+
+    def http(self, request: HTTPRequest, port: int) -> HTTPResponse:
+        if not self.auth.verify(request):
+            if request.path == "/kaonsu/v1/brief":
+                return HTTPResponse.not_found()
+            return self.auth.challenge()
+        if not request.path.startswith("/cgi-bin/"):
+            return HTTPResponse.html("<html><title>Antminer</title></html>")
+        command = request.path[len("/cgi-bin/") :].split(".")[0]
+        body = request.json() if request.body else {}
+        state = self.state
+        if command == "get_system_info":
+            return self.http_json(
+                {
+                    "minertype": self.model,
+                    "nettype": "DHCP",
+                    "netdevice": "eth0",
+                    "macaddr": state.mac,
+                    "hostname": state.hostname,
+                    "ipaddress": state.ip,
+                    "system_mode": "GNU/Linux",
+                    "system_kernel_version": "Linux 4.9.113",
+                    "system_filesystem_version": "Thu Jul 13 19:28:40 CST 2023",
+                    "firmware_type": "Release",
+                    "serinum": "",
+                }
+            )
+        if command == "get_network_info":
+            return self.http_json(
+                {
+                    "nettype": "DHCP",
+                    "netdevice": "eth0",
+                    "macaddr": state.mac,
+                    "ipaddress": state.ip,
+                    "netmask": "255.0.0.0",
+                    "conf_nettype": "DHCP",
+                    "conf_hostname": state.hostname,
+                    "conf_ipaddress": "",
+                    "conf_netmask": "",
+                    "conf_gateway": "",
+                    "conf_dnsservers": "",
+                }
+            )
+        if command == "summary":
+            return self.http_json(
+                {
+                    "STATUS": {"STATUS": "S", "when": 0, "Msg": "summary"},
+                    "INFO": {"miner_version": "uart_trans.1.3", "type": self.model},
+                    "SUMMARY": [
+                        {
+                            "elapsed": state.uptime,
+                            "rate_5s": round(sum(state.board_rates()) * 1000, 2),
+                            "rate_unit": "GH/s",
+                            "status": [
+                                {"type": "rate", "status": "s", "code": 0, "msg": ""},
+                                {
+                                    "type": "network",
+                                    "status": "s",
+                                    "code": 0,
+                                    "msg": "",
+                                },
+                                {"type": "fans", "status": "s", "code": 0, "msg": ""},
+                                {"type": "temp", "status": "s", "code": 0, "msg": ""},
+                            ],
+                        }
+                    ],
+                }
+            )
+        if command == "get_blink_status":
+            return self.http_json({"blink": state.fault_light})
+        if command == "blink":
+            state.fault_light = str(body.get("blink")).lower() == "true"
+            return self.http_json({"code": "B000" if state.fault_light else "B100"})
+        if command == "get_miner_conf":
+            return self.http_json(self.get_miner_conf())
+        if command == "set_miner_conf":
+            body["bitmain-work-mode"] = str(body.pop("miner-mode", self.work_mode))
+            state.config = MinerConfig.from_am_modern(body)
+            state.mining = body["bitmain-work-mode"] != "1"
+            return self.http_json({"stats": "success", "code": "M000", "msg": "OK!"})
+        if command == "reboot":
+            state.started = time.time()
+            return self.http_json({"stats": "success", "code": "R000"})
+        return HTTPResponse.not_found()
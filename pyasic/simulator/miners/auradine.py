@@ -0,0 +1,187 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import secrets
+import time
+
+from pyasic.config import MinerConfig, PoolConfig
+from pyasic.config.mining import MiningModeConfig
+from pyasic.simulator.miners.base import SimulatedMiner, rpc_status
+from pyasic.simulator.servers import HTTPRequest, HTTPResponse
+
+
+class SimulatedAuradine(SimulatedMiner):
+    """Auradine FluxOS, with the GCMiner RPC on 4028 and its token authenticated REST API on 8080."""
+
+    model = "AT1500"
+    ports = {4028: "rpc", 80: "http", 8080: "http"}
+    default_chips = 132
+    default_board_hashrate = 60.0
+    web_password = "admin"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.led = 2
+        self._tokens = set()
+
+    # RPC
+    def rpc_version(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("GCMiner versions", 22),
+            "VERSION": [{"GCMiner": "1.0.0", "API": "3.7"}],
+            "id": 1,
+        }
+
+    def rpc_devdetails(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("Device Details", 69),
+            "DEVDETAILS": [
+                {"DEVDETAILS": idx, "Name": "GCM", "ID": idx + 1, "Model": self.model}
+                for idx in range(self.state.hashboards)
+            ],
+            "id": 1,
+        }
+
+    def rpc_summary(self, **kwargs) -> dict:
+        rate = sum(self.state.board_rates()) * 1000000
+        return {
+            "STATUS": rpc_status("Summary", 11),
+            "SUMMARY": [
+                {
+                    "Elapsed": self.state.uptime,
+                    "MHS av": round(rate, 2),
+                    "MHS 5s": round(rate, 2),
+                    "Accepted": self.state.accepted,
+                    "Rejected": self.state.rejected,
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_devs(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status(f"{self.state.hashboards} ASC(s)", 9),
+            "DEVS": [
+                {
+                    "ASC": idx,
+                    "ID": idx + 1,
+                    "Enabled": "Y",
+                    "Status": "Alive",
+                    "Temperature": self.state.board_temp,
+                    "MHS av": round(rate * 1000000, 2),
+                    "MHS 5s": round(rate * 1000000, 2),
+                }
+                for idx, rate in enumerate(self.state.board_rates())
+            ],
+            "id": 1,
+        }
+
+    # web
+    def http(self, request: HTTPRequest, port: int) -> HTTPResponse:
+        if port == 80:
+            if request.path == "/":
+                return HTTPResponse.html("<html><title>Miner UI</title></html>")
+            return HTTPResponse.not_found()
+        command = request.path.strip("/")
+        body = request.json() if request.body else {}
+        if command == "token":
+            if body.get("password") != self.web_password:
+                return self.reply("Token", [], "E", "Invalid password")
+            token = secrets.token_hex(16)
+            self._tokens.add(token)
+            return self.reply("Token", [{"Token": token}])
+        if request.headers.get("token") not in self._tokens:
+            return self.reply("Token", [], "E", "Invalid token")
+
+        state = self.state
+        if command == "ipreport":
+            return self.reply(
+                "IPReport",
+                [
+                    {
+                        "IP": state.ip,
+                        "hostname": state.hostname,
+                        "mac": state.mac.lower(),
+                        "model": self.model,
+                        "version": "FluxOS v1.0.0",
+                        "HBSerialNo": [
+                            f"SIM{board}{state.mac.replace(':', '')}"
+                            for board in range(state.hashboards)
+                        ],
+                    }
+                ],
+            )
+        if command == "psu":
+            return self.reply(
+                "PSU",
+                [
+                    {
+                        "ID": 0,
+                        "PowerIn": f"{state.power}W",
+                        "PoutMax": f"{state.wattage_limit}W",
+                    }
+                ],
+            )
+        if command == "fan":
+            return self.reply(
+                "Fan",
+                [
+                    {"ID": idx, "Speed": rpm, "Max": 7000, "Target": 5400}
+                    for idx, rpm in enumerate(state.fan_speeds)
+                ],
+            )
+        if command == "led":
+            if "code" in body:
+                self.led = int(body["code"])
+                state.fault_light = self.led == 3
+            return self.reply("LED", [{"ID": 0, "Code": self.led}])
+        if command == "mode":
+            if "sleep" in body:
+                state.set_mining(body["sleep"] != "on")
+            if "power" in body:
+                state.wattage_limit = int(body["power"])
+                state.config.mining_mode = MiningModeConfig.power_tuning(
+                    state.wattage_limit
+                )
+            return self.reply(
+                "Mode",
+                [
+                    {
+                        "Mode": "custom",
+                        "Power": state.wattage_limit,
+                        "Sleep": "off" if state.mining else "on",
+                    }
+                ],
+            )
+        if command == "pools":
+            return self.reply("POOLS", state.pools())
+        if command == "updatepools":
+            pools = [
+                {"url": p["url"], "user": p["user"], "password": p["pass"]}
+                for p in body.get("pools", [])
+            ]
+            state.config = MinerConfig(
+                pools=PoolConfig.simple(pools), mining_mode=state.config.mining_mode
+            )
+            return self.reply("POOLS", state.pools())
+        if command in ["restart", "reboot"]:
+            state.started = time.time()
+            return self.reply("Restart", [])
+        return HTTPResponse.not_found()
+
+    def reply(
+        self, key: str, data: list, status: str = "S", msg: str = "OK"
+    ) -> HTTPResponse:
+        return self.http_json({"STATUS": rpc_status(msg, 0, status), key: data})
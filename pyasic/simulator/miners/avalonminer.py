@@ -0,0 +1,167 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import time
+
+from pyasic.simulator.miners.base import SimulatedMiner, rpc_status
+
+
+class SimulatedAvalonMiner(SimulatedMiner):
+    """Canaan AvalonMiner cgminer, with its stats packed into the `MM ID0` string."""
+
+    model = "AvalonMiner 1246-N"
+    default_chips = 120
+    default_board_hashrate = 30.0
+
+    def rpc_version(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("CGMiner versions", 22),
+            "VERSION": [
+                {
+                    "CGMiner": "4.11.1",
+                    "API": "3.7",
+                    "STM8": "20.08.01",
+                    "PROD": self.model,
+                    "MODEL": self.model.split(" ")[-1].split("-")[0],
+                    "HWTYPE": "MM4v2_X3",
+                    "SWTYPE": "MM314",
+                    "VERSION": "21042601_4ec6bb0_61407fa",
+                    "LOADER": "d0d779de.00",
+                    "DNA": "020100008c6e4f1f",
+                    "MAC": self.state.mac.replace(":", "").lower(),
+                    "UPAPI": "2",
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_devdetails(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("Device Details", 69),
+            "DEVDETAILS": [
+                {"DEVDETAILS": 0, "Name": "AVA10", "ID": 0, "Model": self.model}
+            ],
+            "id": 1,
+        }
+
+    def rpc_summary(self, **kwargs) -> dict:
+        rate = sum(self.state.board_rates()) * 1000000
+        return {
+            "STATUS": rpc_status("Summary", 11),
+            "SUMMARY": [
+                {
+                    "Elapsed": self.state.uptime,
+                    "MHS av": round(rate, 2),
+                    "MHS 5s": round(rate, 2),
+                    "MHS 1m": round(rate, 2),
+                    "Accepted": self.state.accepted,
+                    "Rejected": self.state.rejected,
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_devs(self, **kwargs) -> dict:
+        rate = sum(self.state.board_rates()) * 1000000
+        return {
+            "STATUS": rpc_status("1 ASC(s)", 9),
+            "DEVS": [
+                {
+                    "ASC": 0,
+                    "Name": "AVA10",
+                    "ID": 0,
+                    "Enabled": "Y",
+                    "Status": "Alive",
+                    "Temperature": self.state.board_temp,
+                    "MHS av": round(rate, 2),
+                    "MHS 5s": round(rate, 2),
+                    "MHS 1m": round(rate, 2),
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_stats(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("CGMiner stats", 70),
+            "STATS": [
+                {
+                    "STATS": 0,
+                    "ID": "AVA100",
+                    "Elapsed": self.state.uptime,
+                    "MM Count": 1,
+                    "MM ID0": self.mm_id0(),
+                }
+            ],
+            "id": 1,
+        }
+
+    def mm_id0(self) -> str:
+        state = self.state
+        rates = state.board_rates()
+        chips = " ".join(["70"] * state.chips)
+
+        def values(*items) -> str:
+            return " ".join(str(i) for i in items)
+
+        fields = [
+            ("Ver", "1246-83-21042601_4ec6bb0_61407fa"),
+            ("Elapsed", state.uptime),
+            ("Temp", round(state.env_temp)),
+            ("TMax", round(state.chip_temp)),
+            ("TAvg", round(state.board_temp)),
+        ]
+        fields += [(f"Fan{idx + 1}", rpm) for idx, rpm in enumerate(state.fan_speeds)]
+        fields += [
+            ("FanR", "80%"),
+            ("GHSspd", round(sum(rates) * 1000, 2)),
+            ("GHSmm", round(state.expected_hashrate * 1000, 2)),
+            ("GHSavg", round(sum(rates) * 1000, 2)),
+            ("Led", int(state.fault_light)),
+            ("MGHS", values(*[round(r * 1000, 2) for r in rates])),
+            ("MTmax", values(*[round(state.chip_temp)] * state.hashboards)),
+            ("MTavg", values(*[round(state.board_temp)] * state.hashboards)),
+        ]
+        fields += [(f"PVT_T{board}", chips) for board in range(state.hashboards)]
+        fields += [
+            ("ECHU", values(*[0] * state.hashboards)),
+            (
+                "SYSTEMSTATU",
+                f"Work: {'In Work' if state.mining else 'Idle'}, Hash Board: {state.hashboards} ",
+            ),
+            ("MPO", state.wattage_limit),
+            ("WORKMODE", 1),
+        ]
+        return " ".join(f"{key}[{value}]" for key, value in fields)
+
+    def rpc_ascset(self, parameter: str = None, **kwargs) -> dict:
+        args = str(parameter or "").split(",")
+        if len(args) >= 3 and args[1] == "led":
+            if args[2] == "1-255":
+                return {
+                    "STATUS": rpc_status(
+                        f"ASC 0 set info: LED[{int(self.state.fault_light)}]", 119, "I"
+                    ),
+                    "id": 1,
+                }
+            self.state.fault_light = args[2] == "1-1"
+        elif len(args) >= 2 and args[1] == "reboot":
+            self.state.started = time.time()
+            return {"STATUS": "RESTART", "id": 1}
+        elif len(args) >= 3 and args[1] == "softoff":
+            self.state.set_mining(False)
+        elif len(args) >= 3 and args[1] == "softon":
+            self.state.set_mining(True)
+        return {"STATUS": rpc_status("ASC 0 set OK", 119, "I"), "id": 1}
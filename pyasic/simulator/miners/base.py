@@ -0,0 +1,192 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import asyncio
+import json
+import random
+from typing import Dict, Optional, Union
+
+import betterproto
+from grpclib import GRPCError, Status
+from grpclib.server import Stream
+
+from pyasic.simulator.behavior import SimulatorBehavior
+from pyasic.simulator.servers import (
+    HTTPRequest,
+    HTTPResponse,
+    read_http_request,
+    read_rpc_request,
+)
+from pyasic.simulator.state import MinerState
+
+
+def rpc_status(
+    msg: str, code: int = 0, status: str = "S", description: str = "sim"
+) -> list:
+    return [
+        {
+            "STATUS": status,
+            "When": 0,
+            "Code": code,
+            "Msg": msg,
+            "Description": description,
+        }
+    ]
+
+
+class SimulatedMiner:
+    """A virtual miner answering on one IP, with its protocols selected by port.
+
+    Subclasses impersonate a firmware by setting `ports` and implementing
+    `rpc_<command>` methods for the RPC API, and `http()` for web APIs.
+
+    Attributes:
+        state: The state of the miner, shared by all of its protocols.
+        behavior: The latency and failures of the miner.
+        ports: The handler used on each port, either `"rpc"` or `"http"`.
+    """
+
+    model: str = None
+    ports: Dict[int, str] = {4028: "rpc"}
+    default_hashboards: int = 3
+    default_chips: int = 114
+    default_board_hashrate: float = 36.6
+
+    def __init__(
+        self,
+        state: Union[MinerState, str],
+        behavior: SimulatorBehavior = None,
+        rng: random.Random = None,
+    ):
+        self.rng = rng or random.Random()
+        if not isinstance(state, MinerState):
+            state = MinerState.generate(
+                state,
+                self.rng,
+                hashboards=self.default_hashboards,
+                chips=self.default_chips,
+                board_hashrate=self.default_board_hashrate,
+            )
+        self.state = state
+        self.behavior = behavior or SimulatorBehavior()
+
+    def __repr__(self):
+        return f"{type(self).__name__}: {self.state.ip}"
+
+    @property
+    def ip(self) -> str:
+        return self.state.ip
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, port: int
+    ) -> None:
+        kind = self.ports.get(port)
+        if kind == "rpc":
+            await self._handle_rpc(reader, writer)
+        elif kind == "http":
+            await self._handle_http(reader, writer, port)
+
+    async def _handle_rpc(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        request = await read_rpc_request(reader)
+        if request is None:
+            return
+        await self.behavior.delay(self.rng)
+        if self.behavior.drops(self.rng):
+            return
+        if self.behavior.fails(self.rng):
+            response = {"STATUS": rpc_status("Simulated error", 14, "E"), "id": 1}
+        else:
+            response = self.rpc_request(request)
+        if response is None:
+            return
+        if isinstance(response, dict):
+            response = json.dumps(response).encode("utf-8")
+        writer.write(response + b"\x00")
+        await writer.drain()
+
+    def rpc_request(self, request: dict) -> Optional[Union[dict, bytes]]:
+        command = str(request.get("command", ""))
+        parameter = request.get("parameter")
+        if "+" in command:
+            data = {}
+            for cmd in command.split("+"):
+                # pad each response, pyasic expects every top level key to be a command
+                data[cmd] = [
+                    self.behavior.pad(self.rpc_command(cmd, parameter, request))
+                ]
+            data["id"] = 1
+            return data
+        return self.behavior.pad(self.rpc_command(command, parameter, request))
+
+    def rpc_command(self, command: str, parameter, request: dict) -> dict:
+        func = getattr(self, f"rpc_{command}", None)
+        if func is None:
+            return {"STATUS": rpc_status("Invalid command", 14, "E"), "id": 1}
+        return func(parameter=parameter, request=request)
+
+    async def _handle_http(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, port: int
+    ) -> None:
+        while True:
+            request = await read_http_request(reader)
+            if request is None:
+                return
+            await self.behavior.delay(self.rng)
+            if self.behavior.drops(self.rng):
+                return
+            if self.behavior.fails(self.rng):
+                response = HTTPResponse(500)
+            else:
+                response = self.http(request, port)
+            writer.write(response.to_bytes(keep_alive=request.keep_alive))
+            await writer.drain()
+            if not request.keep_alive:
+                return
+
+    def http(self, request: HTTPRequest, port: int) -> HTTPResponse:
+        """Answer a web request made to `port`."""
+        return HTTPResponse.not_found()
+
+    def http_json(self, data: dict, status: int = 200) -> HTTPResponse:
+        return HTTPResponse.json(self.behavior.pad(data), status)
+
+    async def handle_grpc(
+        self, method: str, request: betterproto.Message, stream: Stream
+    ) -> betterproto.Message:
+        await self.behavior.delay(self.rng)
+        if self.behavior.drops(self.rng):
+            raise GRPCError(Status.UNAVAILABLE, "Simulated drop")
+        if self.behavior.fails(self.rng):
+            raise GRPCError(Status.INTERNAL, "Simulated error")
+        return await self.grpc(method, request, stream)
+
+    async def grpc(
+        self, method: str, request: betterproto.Message, stream: Stream
+    ) -> betterproto.Message:
+        """Answer a gRPC call, `method` being the snake case name of the call."""
+        func = getattr(self, f"grpc_{method}", None)
+        if func is None:
+            raise GRPCError(Status.UNIMPLEMENTED)
+        return func(request)
+
+    # shared cgminer style RPC commands
+    def rpc_pools(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status(f"{len(self.state.pools())} Pool(s)", 7),
+            "POOLS": self.state.pools(),
+            "id": 1,
+        }
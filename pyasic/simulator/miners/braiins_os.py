@@ -0,0 +1,311 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import secrets
+import time
+
+import betterproto
+from grpclib import GRPCError, Status
+from grpclib.server import Stream
+
+from pyasic.config import MinerConfig, PoolConfig
+from pyasic.config.mining import MiningModeConfig
+from pyasic.simulator.miners.base import SimulatedMiner, rpc_status
+from pyasic.simulator.servers import HTTPRequest, HTTPResponse
+from pyasic.web.braiins_os.proto.braiins.bos import ApiVersion, ApiVersionServiceBase
+from pyasic.web.braiins_os.proto.braiins.bos.v1 import *
+
+
+class SimulatedBOSer(SimulatedMiner):
+    """Braiins OS+ with the gRPC API on 50051, alongside the bosminer RPC and web UI."""
+
+    model = "Antminer S19 Pro"
+    ports = {4028: "rpc", 80: "http", 50051: "grpc"}
+    grpc_services = [
+        ApiVersionServiceBase,
+        ActionsServiceBase,
+        AuthenticationServiceBase,
+        ConfigurationServiceBase,
+        CoolingServiceBase,
+        MinerServiceBase,
+        PerformanceServiceBase,
+        PoolServiceBase,
+    ]
+    web_password = "root"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tokens = set()
+
+    # RPC
+    def rpc_version(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("BOSminer+ versions", 22),
+            "VERSION": [{"BOSminer+": "0.2.0-b52a1f9", "API": "3.7"}],
+            "id": 1,
+        }
+
+    def rpc_devdetails(self, **kwargs) -> dict:
+        msg = "Device Details" if self.state.mining else "Unavailable"
+        return {
+            "STATUS": rpc_status(msg, 69),
+            "DEVDETAILS": [
+                {
+                    "DEVDETAILS": idx,
+                    "Name": "Antminer",
+                    "ID": idx,
+                    "Driver": "bitmain",
+                    "Chips": self.state.chips,
+                    "Model": f"Bitmain {self.model}",
+                }
+                for idx in range(self.state.hashboards)
+            ],
+            "id": 1,
+        }
+
+    def rpc_summary(self, **kwargs) -> dict:
+        rate = sum(self.state.board_rates()) * 1000000
+        return {
+            "STATUS": rpc_status("Summary", 11),
+            "SUMMARY": [
+                {
+                    "Elapsed": self.state.uptime,
+                    "MHS av": round(rate, 2),
+                    "MHS 5s": round(rate, 2),
+                    "MHS 1m": round(rate, 2),
+                    "MHS 15m": round(rate, 2),
+                    "Accepted": self.state.accepted,
+                    "Rejected": self.state.rejected,
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_tunerstatus(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("Tuner", 21),
+            "TUNERSTATUS": [
+                {
+                    "PowerLimit": self.state.wattage_limit,
+                    "ApproximateMinerPowerConsumption": self.state.power,
+                    "TunerChainStatus": [
+                        {"HashchainIndex": idx, "Status": "Stable"}
+                        for idx in range(self.state.hashboards)
+                    ],
+                }
+            ],
+            "id": 1,
+        }
+
+    # web
+    def http(self, request: HTTPRequest, port: int) -> HTTPResponse:
+        if request.path == "/":
+            return HTTPResponse.html(
+                "<html><head><title>Braiins OS</title></head></html>"
+            )
+        return HTTPResponse.not_found()
+
+    # gRPC
+    async def grpc(
+        self, method: str, request: betterproto.Message, stream: Stream
+    ) -> betterproto.Message:
+        if method == "login":
+            if request.username != "root" or request.password != self.web_password:
+                raise GRPCError(Status.UNAUTHENTICATED, "Invalid credentials")
+            token = secrets.token_hex(16)
+            self._tokens.add(token)
+            await stream.send_initial_metadata(metadata={"authorization": token})
+            return LoginResponse(token=token, timeout_s=3600)
+        if method != "get_api_version":
+            if stream.metadata.get("authorization") not in self._tokens:
+                raise GRPCError(Status.UNAUTHENTICATED)
+        return await super().grpc(method, request, stream)
+
+    def grpc_get_api_version(self, request) -> ApiVersion:
+        return ApiVersion(major=1, minor=2, patch=0)
+
+    def grpc_get_miner_details(self, request) -> GetMinerDetailsResponse:
+        state = self.state
+        return GetMinerDetailsResponse(
+            uid=state.mac.replace(":", ""),
+            miner_identity=MinerIdentity(name=self.model, miner_model=self.model),
+            bos_version=BosVersion(
+                current="2024-02-20-0-a5d9e5e1-24.02-plus", major="24.02", bos_plus=True
+            ),
+            hostname=state.hostname,
+            mac_address=state.mac,
+            sticker_hashrate=GigaHashrate(state.expected_hashrate * 1000),
+            bosminer_uptime_s=state.uptime,
+            system_uptime_s=state.uptime,
+        )
+
+    def grpc_get_miner_stats(self, request) -> GetMinerStatsResponse:
+        rate = sum(self.state.board_rates()) * 1000
+        return GetMinerStatsResponse(
+            pool_stats=PoolStats(
+                accepted_shares=self.state.accepted,
+                rejected_shares=self.state.rejected,
+            ),
+            miner_stats=WorkSolverStats(
+                real_hashrate=RealHashrate(
+                    last_5_s=GigaHashrate(rate), last_1_m=GigaHashrate(rate)
+                ),
+                nominal_hashrate=GigaHashrate(self.state.expected_hashrate * 1000),
+            ),
+            power_stats=MinerPowerStats(
+                approximated_consumption=Power(self.state.power)
+            ),
+        )
+
+    def grpc_get_hashboards(self, request) -> GetHashboardsResponse:
+        state = self.state
+        return GetHashboardsResponse(
+            hashboards=[
+                Hashboard(
+                    id=str(idx + 1),
+                    enabled=True,
+                    chips_count=state.chips,
+                    highest_chip_temp=TemperatureSensor(
+                        temperature=Temperature(state.chip_temp)
+                    ),
+                    board_temp=Temperature(state.board_temp),
+                    stats=WorkSolverStats(
+                        real_hashrate=RealHashrate(
+                            last_5_s=GigaHashrate(rate * 1000),
+                            last_1_m=GigaHashrate(rate * 1000),
+                        ),
+                        nominal_hashrate=GigaHashrate(state.board_hashrate * 1000),
+                    ),
+                )
+                for idx, rate in enumerate(state.board_rates())
+            ]
+        )
+
+    def grpc_get_cooling_state(self, request) -> GetCoolingStateResponse:
+        return GetCoolingStateResponse(
+            fans=[
+                FanState(position=idx, rpm=rpm)
+                for idx, rpm in enumerate(self.state.fan_speeds)
+            ],
+            highest_temperature=TemperatureSensor(
+                temperature=Temperature(self.state.chip_temp)
+            ),
+        )
+
+    def grpc_get_active_performance_mode(self, request) -> PerformanceMode:
+        return PerformanceMode(
+            tuner_mode=TunerPerformanceMode(
+                power_target=PowerTargetMode(Power(self.state.wattage_limit))
+            )
+        )
+
+    def grpc_set_power_target(self, request) -> SetPowerTargetResponse:
+        self.state.wattage_limit = request.power_target.watt
+        self.state.config.mining_mode = MiningModeConfig.power_tuning(
+            request.power_target.watt
+        )
+        return SetPowerTargetResponse(power_target=Power(self.state.wattage_limit))
+
+    def grpc_get_pool_groups(self, request) -> GetPoolGroupsResponse:
+        groups = []
+        for group in self.state.config.pools.groups:
+            pools = []
+            for idx, pool in enumerate(group.pools):
+                active = not groups and idx == 0
+                pools.append(
+                    Pool(
+                        uid=str(idx),
+                        url=str(pool.url),
+                        user=pool.user,
+                        enabled=True,
+                        alive=True,
+                        active=active,
+                        stats=PoolStats(
+                            accepted_shares=self.state.accepted if active else 0,
+                            rejected_shares=self.state.rejected if active else 0,
+                        ),
+                    )
+                )
+            groups.append(
+                PoolGroup(name=group.name or "Default", quota=Quota(1), pools=pools)
+            )
+        return GetPoolGroupsResponse(pool_groups=groups)
+
+    def grpc_set_pool_groups(self, request) -> SetPoolGroupsResponse:
+        groups = [g.to_pydict() for g in request.pool_groups]
+        self.state.config.pools = PoolConfig.from_boser({"poolGroups": groups})
+        return SetPoolGroupsResponse(pool_groups=request.pool_groups)
+
+    def grpc_get_miner_configuration(self, request) -> GetMinerConfigurationResponse:
+        mode = self.state.config.mining_mode
+        tuner = TunerConfiguration(enabled=False)
+        if getattr(mode, "power", None) is not None:
+            tuner = TunerConfiguration(
+                enabled=True,
+                tuner_mode=TunerMode.POWER_TARGET,
+                power_target=Power(mode.power),
+            )
+        return GetMinerConfigurationResponse(
+            pool_groups=[
+                PoolGroupConfiguration(
+                    uid=str(idx),
+                    name=group.name or "Default",
+                    quota=Quota(1),
+                    pools=[
+                        PoolConfiguration(
+                            uid=str(p_idx),
+                            url=str(pool.url),
+                            user=pool.user,
+                            password=pool.password,
+                            enabled=True,
+                        )
+                        for p_idx, pool in enumerate(group.pools)
+                    ],
+                )
+                for idx, group in enumerate(self.state.config.pools.groups)
+            ],
+            tuner=tuner,
+        )
+
+    def grpc_get_locate_device_status(self, request) -> LocateDeviceStatusResponse:
+        return LocateDeviceStatusResponse(enabled=self.state.fault_light)
+
+    def grpc_set_locate_device_status(self, request) -> LocateDeviceStatusResponse:
+        self.state.fault_light = request.enable
+        return LocateDeviceStatusResponse(enabled=self.state.fault_light)
+
+    def grpc_pause_mining(self, request) -> PauseMiningResponse:
+        self.state.set_mining(False)
+        return PauseMiningResponse(already_paused=False)
+
+    def grpc_resume_mining(self, request) -> ResumeMiningResponse:
+        self.state.set_mining(True)
+        return ResumeMiningResponse(already_mining=False)
+
+    def grpc_stop(self, request) -> StopResponse:
+        self.state.set_mining(False)
+        return StopResponse(already_stopped=False)
+
+    def grpc_start(self, request) -> StartResponse:
+        self.state.set_mining(True)
+        return StartResponse(already_running=False)
+
+    def grpc_restart(self, request) -> RestartResponse:
+        self.state.started = time.time()
+        return RestartResponse(already_running=True)
+
+    def grpc_reboot(self, request) -> RebootResponse:
+        self.state.started = time.time()
+        return RebootResponse()
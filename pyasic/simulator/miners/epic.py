@@ -0,0 +1,154 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import time
+
+from pyasic.config import MinerConfig, PoolConfig
+from pyasic.simulator.miners.base import SimulatedMiner
+from pyasic.simulator.servers import HTTPRequest, HTTPResponse
+
+
+class SimulatedePIC(SimulatedMiner):
+    """ePIC PowerPlay firmware, with its REST API on 4028 instead of an RPC."""
+
+    model = "Antminer S19 Pro"
+    ports = {80: "http", 4028: "http"}
+    web_password = "letmein"
+    version = "1.10.0"
+
+    def http(self, request: HTTPRequest, port: int) -> HTTPResponse:
+        if port == 80:
+            if request.path == "/":
+                return HTTPResponse.html(
+                    "<html><title>Miner Web Dashboard</title></html>"
+                )
+            return HTTPResponse.not_found()
+        command = request.path.strip("/")
+        state = self.state
+        if request.method == "POST":
+            body = request.json()
+            if body.get("password") != self.web_password:
+                return HTTPResponse.json(
+                    {"result": False, "error": "Unauthorized"}, 401
+                )
+            param = body.get("param")
+            if command == "miner":
+                state.set_mining(param != "Stop")
+            elif command == "coin":
+                state.config = MinerConfig(
+                    pools=PoolConfig.from_epic(
+                        {"StratumConfigs": param.get("stratum_configs", [])}
+                    ),
+                    mining_mode=state.config.mining_mode,
+                )
+            elif command == "identify":
+                state.fault_light = bool(param)
+            elif command in ["reboot", "softreboot"]:
+                state.started = time.time()
+            return HTTPResponse.json({"result": True, "success": True})
+        if command == "summary":
+            return self.http_json(self.web_summary())
+        if command == "capabilities":
+            return self.http_json(
+                {
+                    "Model": self.model,
+                    "Model Subtype": "",
+                    "Board Serial Numbers": [
+                        f"SIM{board}{state.mac.replace(':', '')}"
+                        for board in range(state.hashboards)
+                    ],
+                    "Performance Estimator": {"Chip Count": state.chips},
+                    "Max HBs": state.hashboards,
+                }
+            )
+        if command == "network":
+            return self.http_json(
+                {
+                    "eth0": {
+                        "mac_address": state.mac,
+                        "dhcp": True,
+                        "address": state.ip,
+                        "netmask": "255.0.0.0",
+                    }
+                }
+            )
+        if command == "hashrate":
+            return self.http_json(
+                [
+                    {"Index": board, "Total": round(rate * 1000000, 2)}
+                    for board, rate in enumerate(state.board_rates())
+                ]
+            )
+        return HTTPResponse.not_found()
+
+    def web_summary(self) -> dict:
+        state = self.state
+        pools = state.pools()
+        active = pools[0] if pools else {}
+        return {
+            "Hostname": state.hostname,
+            "Software": f"PowerPlay v{self.version}",
+            "Mining": {"Coin": "Btc", "Algorithm": "Sha256"},
+            "PerpetualTune": {
+                "Running": False,
+                "Algorithm": {"VoltageOptimizer": {"Optimized": False}},
+            },
+            "Session": {
+                "Uptime": state.uptime,
+                "Accepted": state.accepted,
+                "Rejected": state.rejected,
+            },
+            "Stratum": {
+                "Current Pool": active.get("URL"),
+                "Current User": active.get("User"),
+                "IsPoolConnected": bool(pools),
+                "Config Id": 0,
+            },
+            "StratumConfigs": [
+                {"pool": p["URL"], "login": p["User"], "password": "x"} for p in pools
+            ],
+            "Status": {
+                "Operating State": "Mining" if state.mining else "Idling",
+                "Last Error": None,
+            },
+            "Power Supply Stats": {
+                "Input Power": state.power,
+                "Output Power": state.power - 100,
+                "Target Voltage": 13.8,
+            },
+            "HBs": [
+                {
+                    "Index": board,
+                    "Input Voltage": 13.8,
+                    "Temperature": state.board_temp,
+                    "Core Clock Avg": 525.0,
+                    # hashrate in MH/s and percent of the ideal hashrate
+                    "Hashrate": [
+                        round(rate * 1000000, 2),
+                        round(rate / state.board_hashrate * 100, 2),
+                    ],
+                }
+                for board, rate in enumerate(state.board_rates())
+            ],
+            "Fans Rpm": {f"Fan{idx}": rpm for idx, rpm in enumerate(state.fan_speeds)},
+            "Fans": {
+                "Fan Mode": {"Auto": {"Target Temperature": 60, "Idle Speed": 100}}
+            },
+            "Misc": {
+                "Locate Miner State": state.fault_light,
+                "Critical Temp": 100,
+                "Shutdown Temp": 90,
+            },
+        }
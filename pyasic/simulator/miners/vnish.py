@@ -0,0 +1,198 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import secrets
+import time
+
+from pyasic.simulator.miners.antminer import SimulatedAntminer
+from pyasic.simulator.miners.base import rpc_status
+from pyasic.simulator.servers import HTTPRequest, HTTPResponse
+
+
+class SimulatedVNish(SimulatedAntminer):
+    """VNish firmware on an Antminer, with a bmminer style RPC and the token authenticated REST API."""
+
+    web_password = "admin"
+    version = "1.2.4"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tokens = set()
+
+    # RPC
+    def rpc_version(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("BMMiner versions", 22),
+            "VERSION": [
+                {
+                    "BMMiner": "1.0.0",
+                    "API": "3.1",
+                    "Miner": f"vnish {self.version}",
+                    "CompileTime": "Mon Feb 5 12:00:00 UTC 2024",
+                    "Type": "Anthill",
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_devdetails(self, **kwargs) -> dict:
+        data = super().rpc_devdetails()
+        for board in data["DEVDETAILS"]:
+            board["Model"] = f"{self.model} (vnish {self.version})"
+        return data
+
+    def rpc_stats(self, **kwargs) -> dict:
+        data = super().rpc_stats()
+        data["STATS"][0]["Type"] = f"{self.model} (vnish {self.version})"
+        return data
+
+    # web
+    def http(self, request: HTTPRequest, port: int) -> HTTPResponse:
+        if request.path == "/":
+            return HTTPResponse.html("<html><title>AnthillOS</title></html>")
+        if not request.path.startswith("/api/v1/"):
+            return HTTPResponse.not_found()
+        command = request.path[len("/api/v1/") :]
+        if command == "unlock":
+            if request.json().get("pw") != self.web_password:
+                return HTTPResponse.json({"err": "Wrong password"}, 401)
+            token = secrets.token_hex(16)
+            self._tokens.add(token)
+            return HTTPResponse.json({"token": token})
+        token = request.headers.get("authorization", "")
+        if token.startswith("Bearer "):
+            token = token[len("Bearer ") :]
+        if token not in self._tokens:
+            return HTTPResponse.json({"err": "Unauthorized"}, 401)
+
+        state = self.state
+        if command == "summary":
+            return self.http_json(self.web_summary())
+        if command == "info":
+            return self.http_json(
+                {
+                    "miner": self.model,
+                    "model": self.model.replace("Antminer ", ""),
+                    "fw_name": "Vnish",
+                    "fw_version": self.version,
+                    "build_time": "2024-02-05",
+                    "system": self.web_summary()["system"],
+                }
+            )
+        if command == "settings":
+            return self.http_json(self.web_settings())
+        if command == "find-miner":
+            state.fault_light = not state.fault_light
+            return self.http_json({"on": state.fault_light})
+        if command in ["mining/stop", "mining/pause"]:
+            state.set_mining(False)
+            return HTTPResponse.json({})
+        if command in ["mining/start", "mining/resume"]:
+            state.set_mining(True)
+            return HTTPResponse.json({})
+        if command in ["mining/restart", "system/reboot"]:
+            state.started = time.time()
+            return HTTPResponse.json({})
+        return HTTPResponse.not_found()
+
+    def web_summary(self) -> dict:
+        state = self.state
+        rates = state.board_rates()
+        return {
+            "miner": {
+                "miner_status": {
+                    "miner_state": "mining" if state.mining else "stopped",
+                    "miner_state_time": state.uptime,
+                },
+                "miner_type": f"{self.model} (Vnish {self.version})",
+                "hr_stock": round(state.expected_hashrate * 1000, 2),
+                "average_hashrate": round(sum(rates), 2),
+                "instant_hashrate": round(sum(rates), 2),
+                "hr_realtime": round(sum(rates), 2),
+                "hr_nominal": round(state.expected_hashrate, 2),
+                "power_usage": state.power,
+                "power_efficiency": round(state.power / max(sum(rates), 1), 2),
+                "pcb_temp": {"min": state.board_temp, "max": state.board_temp},
+                "chip_temp": {"min": state.chip_temp, "max": state.chip_temp},
+                "cooling": {
+                    "fan_num": len(state.fans),
+                    "fans": [
+                        {"id": idx, "rpm": rpm, "status": "ok"}
+                        for idx, rpm in enumerate(state.fan_speeds)
+                    ],
+                },
+                "chains": [
+                    {
+                        "id": idx + 1,
+                        "hashrate_rt": round(rate * 1000, 2),
+                        "chip_temp": {"min": state.chip_temp, "max": state.chip_temp},
+                        "pcb_temp": {"min": state.board_temp, "max": state.board_temp},
+                        "status": {"state": "mining"},
+                    }
+                    for idx, rate in enumerate(rates)
+                ],
+                "pools": [
+                    {
+                        "id": pool["POOL"],
+                        "url": pool["URL"],
+                        "user": pool["User"],
+                        "status": "active" if pool["Stratum Active"] else "offline",
+                        "accepted": pool["Accepted"],
+                        "rejected": pool["Rejected"],
+                    }
+                    for pool in state.pools()
+                ],
+            },
+            "system": {
+                "os": "GNU/Linux",
+                "miner_name": self.model,
+                "file_system_version": self.version,
+                "mem_total": 233500,
+                "mem_free": 150000,
+                "uptime": str(state.uptime),
+                "network_status": {
+                    "mac": state.mac,
+                    "dhcp": True,
+                    "ip": state.ip,
+                    "netmask": "255.0.0.0",
+                    "gateway": "",
+                    "dns": [],
+                    "hostname": state.hostname,
+                },
+            },
+        }
+
+    def web_settings(self) -> dict:
+        config = self.state.config
+        preset = getattr(config.mining_mode, "power", None) or self.state.wattage_limit
+        return {
+            "miner": {
+                "overclock": {
+                    "preset": str(preset),
+                    "globals": {"volt": 1360, "freq": 525},
+                    "chains": [{"freq": 525} for _ in range(self.state.hashboards)],
+                },
+                "cooling": {
+                    "fan_min_count": 1,
+                    "fan_min_duty": 10,
+                    "mode": {"name": "auto", "param": 60},
+                },
+                "pools": [
+                    {"url": str(pool.url), "user": pool.user, "pass": pool.password}
+                    for group in config.pools.groups
+                    for pool in group.pools
+                ],
+            }
+        }
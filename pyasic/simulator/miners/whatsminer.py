@@ -0,0 +1,300 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import base64
+import binascii
+import hashlib
+import json
+import string
+import time
+from typing import Optional
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from passlib.handlers.md5_crypt import md5_crypt
+
+from pyasic.config import MinerConfig, PoolConfig
+from pyasic.simulator.miners.base import SimulatedMiner, rpc_status
+
+SALT_CHARS = string.ascii_letters + string.digits + "./"
+
+
+def wm_status(msg, code: int = 131, status: str = "S") -> dict:
+    return {"STATUS": status, "When": int(time.time()), "Code": code, "Msg": msg}
+
+
+class SimulatedWhatsminer(SimulatedMiner):
+    """BTMiner firmware, including the AES encrypted privileged API.
+
+    Privileged commands are accepted once signed with the token from
+    `get_token`, derived from `rpc_password` exactly like a real miner does.
+    """
+
+    model = "M30S+_V40"
+    default_chips = 235
+    default_board_hashrate = 33.3
+
+    rpc_password = "admin"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state.fans = self.state.fans[:2]
+        self.power_mode = "Normal"
+        self._salt = "".join(self.rng.choice(SALT_CHARS) for _ in range(8))
+        # the password hash only depends on the salt, so it is computed once
+        self._passwd_md5 = md5_crypt.hash(self.rpc_password, salt=self._salt).split(
+            "$"
+        )[3]
+        aeskey = hashlib.sha256(self._passwd_md5.encode()).hexdigest()
+        self._cipher = Cipher(
+            algorithms.AES(binascii.unhexlify(aeskey.encode())), modes.ECB()
+        )
+        self._tokens = {}
+
+    def rpc_request(self, request: dict) -> Optional[dict]:
+        if request.get("enc") == 1:
+            return self._privileged_request(request)
+        return super().rpc_request(request)
+
+    def _privileged_request(self, request: dict) -> dict:
+        try:
+            decryptor = self._cipher.decryptor()
+            command = json.loads(
+                decryptor.update(base64.decodebytes(request["data"].encode()))
+                .rstrip(b"\0")
+                .decode("utf-8")
+            )
+        except (ValueError, KeyError, TypeError):
+            return wm_status("json cmd error", 14, "E")
+        if command.get("token") not in self._tokens:
+            return wm_status("can't access write cmd", 45, "E")
+        func = getattr(self, f"priv_{command.get('cmd')}", None)
+        if func is None:
+            response = wm_status("invalid cmd", 14, "E")
+        else:
+            response = func(command)
+        data = json.dumps(response)
+        data += "\0" * (-len(data) % 16)
+        encryptor = self._cipher.encryptor()
+        enc = base64.encodebytes(encryptor.update(data.encode("utf-8")))
+        return {"enc": enc.decode("utf-8").replace("\n", "")}
+
+    # RPC
+    def rpc_version(self, **kwargs) -> dict:
+        return {"STATUS": rpc_status("Invalid command", 14, "E"), "id": 1}
+
+    def rpc_devdetails(self, **kwargs) -> dict:
+        return {
+            "STATUS": rpc_status("Device Details", 69),
+            "DEVDETAILS": [
+                {
+                    "DEVDETAILS": idx,
+                    "Name": "SM",
+                    "ID": idx,
+                    "Driver": "bitmicro",
+                    "Kernel": "",
+                    "Model": self.model,
+                }
+                for idx in range(self.state.hashboards)
+            ],
+            "id": 1,
+        }
+
+    def rpc_summary(self, **kwargs) -> dict:
+        state = self.state
+        rate = sum(state.board_rates()) * 1000000
+        speeds = state.fan_speeds
+        return {
+            "STATUS": rpc_status("Summary", 11),
+            "SUMMARY": [
+                {
+                    "Elapsed": state.uptime,
+                    "MHS av": round(rate, 2),
+                    "MHS 5s": round(rate, 2),
+                    "MHS 1m": round(rate, 2),
+                    "MHS 15m": round(rate, 2),
+                    "Accepted": state.accepted,
+                    "Rejected": state.rejected,
+                    "Temperature": state.board_temp,
+                    "freq_avg": 600,
+                    "Fan Speed In": speeds[0],
+                    "Fan Speed Out": speeds[-1],
+                    "Power": state.power,
+                    "Power Rate": round(state.power / max(rate / 1000000, 1), 2),
+                    "Power Mode": self.power_mode,
+                    "Power Limit": state.wattage_limit,
+                    "Factory GHS": round(state.expected_hashrate * 1000),
+                    "Chip Temp Min": state.chip_temp - 5,
+                    "Chip Temp Max": state.chip_temp + 5,
+                    "Chip Temp Avg": state.chip_temp,
+                    "Env Temp": state.env_temp,
+                    "Power Fanspeed": 6000 if state.mining else 0,
+                    "Error Code Count": 0,
+                    "Factory Error Code": 0,
+                    "Firmware Version": "'20230911.12.Rel'",
+                    "MAC": state.mac,
+                    "Btminer Status": "running" if state.mining else "stopped",
+                }
+            ],
+            "id": 1,
+        }
+
+    def rpc_devs(self, **kwargs) -> dict:
+        state = self.state
+        return {
+            "STATUS": rpc_status(f"{state.hashboards} ASC(s)", 9),
+            "DEVS": [
+                {
+                    "ASC": board,
+                    "Slot": board,
+                    "Enabled": "Y",
+                    "Status": "Alive",
+                    "Temperature": state.board_temp,
+                    "Chip Frequency": 600,
+                    "MHS av": round(rate * 1000000, 2),
+                    "MHS 5s": round(rate * 1000000, 2),
+                    "MHS 1m": round(rate * 1000000, 2),
+                    "MHS 15m": round(rate * 1000000, 2),
+                    "Effective Chips": state.chips,
+                    "PCB SN": f"SIM{board}{state.mac.replace(':', '')}",
+                    "Chip Temp Min": state.chip_temp - 5,
+                    "Chip Temp Max": state.chip_temp + 5,
+                    "Chip Temp Avg": state.chip_temp,
+                }
+                for board, rate in enumerate(state.board_rates())
+            ],
+            "id": 1,
+        }
+
+    def rpc_get_version(self, **kwargs) -> dict:
+        return wm_status(
+            {
+                "api_ver": "2.0.5",
+                "rpc_ver": "whatsminer v2.0.5",
+                "fw_ver": "20230911.12.Rel",
+                "platform": "H6OS",
+                "chip": "HP3BK",
+            }
+        )
+
+    def rpc_get_miner_info(self, **kwargs) -> dict:
+        state = self.state
+        return wm_status(
+            {
+                "ip": state.ip,
+                "proto": "dhcp",
+                "netmask": "255.0.0.0",
+                "dns": "",
+                "mac": state.mac,
+                "ledstat": "manual" if state.fault_light else "auto",
+                "gateway": "",
+                "hostname": state.hostname,
+            }
+        )
+
+    def rpc_get_psu(self, **kwargs) -> dict:
+        return wm_status(
+            {
+                "name": "P221B",
+                "hw_version": "V01.00",
+                "sw_version": "V01.00.V01.03",
+                "model": "P221B",
+                "iin": "8.6",
+                "vin": "22500",
+                "fan_speed": "6000" if self.state.mining else "0",
+            }
+        )
+
+    def rpc_get_error_code(self, **kwargs) -> dict:
+        return wm_status({"error_code": []})
+
+    def rpc_status(self, **kwargs) -> dict:
+        return wm_status(
+            {
+                "mineroff": "false" if self.state.mining else "true",
+                "mineroff_reason": "",
+                "mineroff_time": "",
+                "FirmwareVersion": "20230911.12.Rel",
+                "power_mode": "",
+                "hash_percent": "",
+            }
+        )
+
+    def rpc_get_token(self, **kwargs) -> dict:
+        now = str(int(time.time()))[-4:]
+        newsalt = "".join(self.rng.choice(SALT_CHARS) for _ in range(8))
+        token = md5_crypt.hash(self._passwd_md5 + now, salt=newsalt).split("$")[3]
+        self._tokens[token] = None
+        # bound the number of tokens kept, dropping the oldest first
+        if len(self._tokens) > 16:
+            del self._tokens[next(iter(self._tokens))]
+        return wm_status({"time": now, "salt": self._salt, "newsalt": newsalt})
+
+    # privileged
+    def priv_update_pools(self, command: dict) -> dict:
+        pools = []
+        for idx in range(1, 4):
+            if command.get(f"pool{idx}"):
+                pools.append(
+                    {
+                        "url": command[f"pool{idx}"],
+                        "user": command.get(f"worker{idx}") or "",
+                        "password": command.get(f"passwd{idx}") or "",
+                    }
+                )
+        self.state.config = MinerConfig(
+            pools=PoolConfig.simple(pools),
+            mining_mode=self.state.config.mining_mode,
+        )
+        return wm_status("API command OK")
+
+    def priv_power_off(self, command: dict) -> dict:
+        self.state.set_mining(False)
+        return wm_status("API command OK")
+
+    def priv_power_on(self, command: dict) -> dict:
+        self.state.set_mining(True)
+        return wm_status("API command OK")
+
+    def priv_set_led(self, command: dict) -> dict:
+        self.state.fault_light = command.get("param") != "auto"
+        return wm_status("API command OK")
+
+    def priv_set_normal_power(self, command: dict) -> dict:
+        self.power_mode = "Normal"
+        return wm_status("API command OK")
+
+    def priv_set_high_power(self, command: dict) -> dict:
+        self.power_mode = "High"
+        return wm_status("API command OK")
+
+    def priv_set_low_power(self, command: dict) -> dict:
+        self.power_mode = "Low"
+        return wm_status("API command OK")
+
+    def priv_adjust_power_limit(self, command: dict) -> dict:
+        self.state.wattage_limit = int(command.get("power_limit", 0))
+        return wm_status("API command OK")
+
+    def priv_set_hostname(self, command: dict) -> dict:
+        self.state.hostname = command.get("hostname", self.state.hostname)
+        return wm_status("API command OK")
+
+    def priv_reboot(self, command: dict) -> dict:
+        self.state.started = time.time()
+        return wm_status("API command OK")
+
+    def priv_restart_btminer(self, command: dict) -> dict:
+        self.state.started = time.time()
+        return wm_status("API command OK")
@@ -0,0 +1,249 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import asyncio
+import functools
+import hashlib
+import json
+import re
+import secrets
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from grpclib import GRPCError, Status
+from grpclib.const import Handler
+from grpclib.server import Stream
+
+HTTP_REASONS = {
+    200: "OK",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+async def read_rpc_request(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Read one JSON command from a cgminer style RPC connection.
+
+    The RPC has no framing, so data is read until it can be parsed as JSON.
+    """
+    data = b""
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            break
+        data += chunk
+        try:
+            return json.loads(data.decode("utf-8").rstrip("\x00"))
+        except ValueError:
+            continue
+    if data:
+        try:
+            return json.loads(data.decode("utf-8").rstrip("\x00"))
+        except ValueError:
+            pass
+    return None
+
+
+@dataclass
+class HTTPRequest:
+    method: str
+    path: str
+    query: Dict[str, str] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            return data
+        # some clients send form data instead of JSON
+        return {k: v[-1] for k, v in parse_qs(self.body.decode("utf-8")).items()}
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+@dataclass
+class HTTPResponse:
+    status: int = 200
+    body: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def json(cls, data, status: int = 200) -> "HTTPResponse":
+        return cls(
+            status,
+            json.dumps(data).encode("utf-8"),
+            {"Content-Type": "application/json"},
+        )
+
+    @classmethod
+    def html(cls, text: str, status: int = 200) -> "HTTPResponse":
+        return cls(status, text.encode("utf-8"), {"Content-Type": "text/html"})
+
+    @classmethod
+    def not_found(cls) -> "HTTPResponse":
+        return cls(404)
+
+    def to_bytes(self, keep_alive: bool = True) -> bytes:
+        reason = HTTP_REASONS.get(self.status, "Unknown")
+        headers = {
+            **self.headers,
+            "Content-Length": str(len(self.body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        head = f"HTTP/1.1 {self.status} {reason}\r\n" + "".join(
+            f"{k}: {v}\r\n" for k, v in headers.items()
+        )
+        return head.encode("latin-1") + b"\r\n" + self.body
+
+
+async def read_http_request(reader: asyncio.StreamReader) -> Optional[HTTPRequest]:
+    """Read one HTTP/1.1 request, returning `None` once the client closes the connection."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    body = b""
+    if int(headers.get("content-length", 0)) > 0:
+        body = await reader.readexactly(int(headers["content-length"]))
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    return HTTPRequest(method.upper(), url.path, query, headers, body)
+
+
+class DigestAuth:
+    """Server side of HTTP digest authentication, as used by the Antminer CGI API."""
+
+    def __init__(self, realm: str, username: str, password: str):
+        self.realm = realm
+        self.username = username
+        self.password = password
+
+    def challenge(self) -> HTTPResponse:
+        nonce = secrets.token_hex(16)
+        return HTTPResponse(
+            401,
+            b"",
+            {
+                "WWW-Authenticate": f'Digest realm="{self.realm}", nonce="{nonce}", qop="auth"'
+            },
+        )
+
+    def verify(self, request: HTTPRequest) -> bool:
+        header = request.headers.get("authorization", "")
+        if not header.lower().startswith("digest "):
+            return False
+        params = self._parse_header(header[7:])
+        if params.get("username") != self.username:
+            return False
+
+        def md5(value: str) -> str:
+            return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+        ha1 = md5(f"{self.username}:{self.realm}:{self.password}")
+        ha2 = md5(f"{request.method}:{params.get('uri', '')}")
+        if params.get("qop"):
+            expected = md5(
+                f"{ha1}:{params.get('nonce')}:{params.get('nc')}:{params.get('cnonce')}:{params.get('qop')}:{ha2}"
+            )
+        else:
+            expected = md5(f"{ha1}:{params.get('nonce')}:{ha2}")
+        return secrets.compare_digest(expected, params.get("response", ""))
+
+    @staticmethod
+    def _parse_header(header: str) -> Dict[str, str]:
+        params = {}
+        for item in _split_header(header):
+            if "=" in item:
+                key, value = item.split("=", 1)
+                params[key.strip().lower()] = value.strip().strip('"')
+        return params
+
+
+def _split_header(header: str) -> list:
+    items, current, quoted = [], "", False
+    for char in header:
+        if char == '"':
+            quoted = not quoted
+        if char == "," and not quoted:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return items
+
+
+def local_address(writer: asyncio.StreamWriter) -> Tuple[str, int]:
+    """Get the local address a connection was made to, which is the IP of the simulated miner."""
+    sockname = writer.get_extra_info("sockname")
+    return sockname[0], sockname[1]
+
+
+class GRPCRouter:
+    """Serves the gRPC services of every simulated miner from one listener.
+
+    The generated betterproto service bases are only used for their paths and
+    message types, each call is passed to the miner owning the address it was made to.
+
+    Parameters:
+        services: The betterproto service base classes to serve.
+        resolve: A function returning the miner answering on an IP, or `None`.
+    """
+
+    def __init__(self, services: List[type], resolve: Callable):
+        self.services = services
+        self.resolve = resolve
+
+    def __mapping__(self) -> Dict[str, Handler]:
+        mapping = {}
+        for service in self.services:
+            for path, handler in service().__mapping__().items():
+                method = re.sub(r"(?<!^)(?=[A-Z])", "_", path.rsplit("/", 1)[1]).lower()
+                mapping[path] = Handler(
+                    functools.partial(self._handle, method),
+                    handler.cardinality,
+                    handler.request_type,
+                    handler.reply_type,
+                )
+        return mapping
+
+    async def _handle(self, method: str, stream: Stream) -> None:
+        # grpclib only exposes the remote address of a stream
+        sockname = stream.peer._transport.get_extra_info("sockname")
+        miner = self.resolve(sockname[0])
+        if miner is None:
+            raise GRPCError(Status.UNAVAILABLE)
+        request = await stream.recv_message()
+        response = await miner.handle_grpc(method, request, stream)
+        await stream.send_message(response)
@@ -0,0 +1,175 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import random
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from pyasic.config import MinerConfig, PoolConfig
+from pyasic.config.mining import MiningModeConfig
+
+
+@dataclass
+class MinerState:
+    """The live state of a simulated miner, shared by all of its protocols.
+
+    Attributes:
+        ip: The IP the miner answers on.
+        mac: The MAC address of the miner.
+        hostname: The hostname of the miner.
+        hashboards: The number of hashboards in the miner.
+        chips: The number of chips on each hashboard.
+        board_hashrate: The nominal hashrate of each hashboard in TH/s.
+        board_temp: The temperature of the hashboards.
+        chip_temp: The temperature of the chips.
+        env_temp: The temperature of the environment.
+        fans: The speed of each fan in RPM.
+        wattage: The power draw of the miner while mining.
+        wattage_limit: The power limit of the miner.
+        mining: Whether the miner is mining.
+        fault_light: Whether the fault light is on.
+        config: The config of the miner.
+        started: The `time.time()` the miner was started at, to calculate uptime.
+        accepted: The number of shares accepted by the pool.
+        rejected: The number of shares rejected by the pool.
+        noise: The random variation of reported hashrates, as a fraction.
+    """
+
+    ip: str
+    mac: str = "00:00:00:00:00:00"
+    hostname: str = "miner"
+    hashboards: int = 3
+    chips: int = 114
+    board_hashrate: float = 36.6
+    board_temp: float = 62.0
+    chip_temp: float = 75.0
+    env_temp: float = 25.0
+    fans: List[int] = field(default_factory=lambda: [5400, 5430, 5380, 5410])
+    wattage: int = 3250
+    wattage_limit: int = 3300
+    mining: bool = True
+    fault_light: bool = False
+    config: MinerConfig = None
+    started: float = field(default_factory=time.time)
+    accepted: int = 0
+    rejected: int = 0
+    noise: float = 0.01
+    rng: random.Random = field(default_factory=random.Random, repr=False)
+
+    def __post_init__(self):
+        if self.config is None:
+            self.config = MinerConfig(
+                pools=PoolConfig.simple(
+                    [
+                        {
+                            "url": "stratum+tcp://pool.example.com:3333",
+                            "user": "simulated",
+                            "password": "x",
+                        }
+                    ]
+                )
+            )
+
+    @classmethod
+    def generate(cls, ip: str, rng: random.Random = None, **kwargs) -> "MinerState":
+        """Create the state of a miner with a unique MAC and hostname, and slightly varied stats.
+
+        Parameters:
+            ip: The IP the miner answers on.
+            rng: The random generator to use, for reproducible farms.
+            **kwargs: Attributes to set instead of generating them.
+        """
+        rng = rng or random.Random()
+        octets = [int(o) for o in str(ip).split(".")]
+        defaults = dict(
+            mac="02:00:" + ":".join(f"{o:02X}" for o in octets),
+            hostname="sim-" + "-".join(str(o) for o in octets[1:]),
+            board_temp=round(rng.uniform(55, 68), 1),
+            chip_temp=round(rng.uniform(68, 82), 1),
+            started=time.time() - rng.randint(600, 864000),
+            accepted=rng.randint(1000, 100000),
+            rejected=rng.randint(0, 100),
+            rng=rng,
+        )
+        defaults.update(kwargs)
+        return cls(ip=str(ip), **defaults)
+
+    @property
+    def uptime(self) -> int:
+        return int(time.time() - self.started)
+
+    @property
+    def expected_hashrate(self) -> float:
+        return self.board_hashrate * self.hashboards
+
+    def board_rate(self, board: int) -> float:
+        """Get the current hashrate of a board in TH/s."""
+        if not self.mining:
+            return 0.0
+        return self.board_hashrate * (1 + self.rng.uniform(-self.noise, self.noise))
+
+    def board_rates(self) -> List[float]:
+        return [self.board_rate(b) for b in range(self.hashboards)]
+
+    @property
+    def power(self) -> int:
+        """Get the current power draw of the miner."""
+        return self.wattage if self.mining else 40
+
+    @property
+    def fan_speeds(self) -> List[int]:
+        if not self.mining:
+            return [0 for _ in self.fans]
+        return self.fans
+
+    def set_mining(self, mining: bool) -> None:
+        self.mining = mining
+        self.config.mining_mode = (
+            MiningModeConfig.normal() if mining else MiningModeConfig.sleep()
+        )
+
+    def pools(self) -> List[dict]:
+        """Get the pools of the miner in the cgminer RPC format."""
+        pools = []
+        for group in self.config.pools.groups:
+            for pool in group.pools:
+                idx = len(pools)
+                pools.append(
+                    {
+                        "POOL": idx,
+                        "URL": str(pool.url),
+                        "Status": "Alive",
+                        "Priority": idx,
+                        "Quota": 1,
+                        "Long Poll": "N",
+                        "Getworks": self.accepted // 10,
+                        "Accepted": self.accepted if idx == 0 else 0,
+                        "Rejected": self.rejected if idx == 0 else 0,
+                        "Works": self.accepted * 4,
+                        "Discarded": 0,
+                        "Stale": 0,
+                        "Get Failures": 0,
+                        "Remote Failures": 0,
+                        "User": pool.user,
+                        "Stratum Active": idx == 0,
+                        "Difficulty Accepted": float(self.accepted * 65536),
+                    }
+                )
+        return pools
+
+    def pool(self, idx: int = 0) -> Optional[dict]:
+        pools = self.pools()
+        return pools[idx] if idx < len(pools) else None
@@ -1,9 +1,135 @@
 import asyncio
 import logging
-from typing import Optional
+import time
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import asyncssh
 
+from pyasic import settings
+from pyasic.misc import instrument, sockets
+from pyasic.misc.deadline import bound_timeout, remaining
+from pyasic.misc.health import get_health
+
+logger = logging.getLogger(__name__)
+
+
+class _SSHConnectionPool:
+    """Keeps one open SSH connection per host, shared between commands.
+
+    Commands are run as separate channels on the pooled connection, and the
+    connection is closed once it has been idle for `ssh_pool_idle_timeout` seconds.
+    """
+
+    def __init__(self) -> None:
+        self._connections: Dict[Tuple, asyncssh.SSHClientConnection] = {}
+        self._locks: Dict[Tuple, asyncio.Lock] = {}
+        # tasks holding or waiting on each lock, so unused locks can be dropped
+        self._waiting: Dict[Tuple, int] = {}
+        self._users: Dict[Tuple, int] = {}
+        self._expiry: Dict[Tuple, asyncio.TimerHandle] = {}
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    async def acquire(self, ssh: "BaseSSH") -> asyncssh.SSHClientConnection:
+        key = ssh._pool_key
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._acquire(ssh, key)
+        finally:
+            self._waiting[key] -= 1
+            if key not in self._connections:
+                # the connection failed, don't keep a lock for a host without one
+                self._drop_lock(key)
+
+    async def _acquire(
+        self, ssh: "BaseSSH", key: Tuple
+    ) -> asyncssh.SSHClientConnection:
+        conn = self._connections.get(key)
+        if conn is None or conn.is_closed():
+            host = get_health(ssh.ip)
+            if not host.allow():
+                raise ConnectionError(
+                    f"{ssh.ip} is unreachable, retrying in {host.retry_in:.0f}s"
+                )
+            try:
+                conn = await asyncio.wait_for(
+                    ssh._get_connection(),
+                    timeout=bound_timeout(settings.get("ssh_connection_timeout", 10)),
+                )
+            except asyncio.CancelledError:
+                host.release()
+                raise
+            except Exception as e:
+                host.record(e)
+                raise
+            host.record_success()
+            self._connections[key] = conn
+        handle = self._expiry.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        self._users[key] = self._users.get(key, 0) + 1
+        return conn
+
+    def release(self, ssh: "BaseSSH", conn: asyncssh.SSHClientConnection) -> None:
+        key = ssh._pool_key
+        if self._connections.get(key) is not conn:
+            # connection was already discarded or replaced
+            return
+        if conn.is_closed():
+            self._expire(key)
+            return
+        self._users[key] = self._users.get(key, 1) - 1
+        if self._users[key] > 0:
+            return
+        idle_timeout = settings.get("ssh_pool_idle_timeout", 30)
+        if not idle_timeout:
+            self.discard(ssh)
+            return
+        self._expiry[key] = asyncio.get_running_loop().call_later(
+            idle_timeout, self._expire, key
+        )
+
+    def discard(self, ssh: "BaseSSH") -> None:
+        self._expire(ssh._pool_key)
+
+    def _expire(self, key: Tuple) -> None:
+        handle = self._expiry.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        self._users.pop(key, None)
+        conn = self._connections.pop(key, None)
+        if conn is not None:
+            conn.close()
+        self._drop_lock(key)
+
+    def _drop_lock(self, key: Tuple) -> None:
+        if not self._waiting.get(key):
+            self._waiting.pop(key, None)
+            self._locks.pop(key, None)
+
+
+# connections are bound to the loop they were created on, so keep a pool per loop
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _SSHConnectionPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_pool() -> _SSHConnectionPool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = _SSHConnectionPool()
+    return pool
+
+
+def open_connections() -> int:
+    """Get the number of pooled SSH connections of the running event loop."""
+    return len(_get_pool())
+
 
 class BaseSSH:
     def __init__(self, ip: str) -> None:
@@ -12,8 +138,16 @@ class BaseSSH:
         self.username = "root"
         self.port = 22
 
-    async def _get_connection(self) -> asyncssh.connect:
+    @property
+    def _pool_key(self) -> Tuple:
+        return str(self.ip), self.port, self.username, self.pwd
+
+    async def _get_connection(self) -> asyncssh.SSHClientConnection:
         """Create a new asyncssh connection"""
+        options = {}
+        local = sockets.source_address()
+        if local:
+            options["local_addr"] = (local, 0)
         try:
             conn = await asyncssh.connect(
                 str(self.ip),
@@ -22,6 +156,7 @@ class BaseSSH:
                 username=self.username,
                 password=self.pwd,
                 server_host_key_algs=["ssh-rsa"],
+                **options,
             )
             return conn
         except asyncssh.misc.PermissionDenied as e:
@@ -31,17 +166,118 @@ class BaseSSH:
 
     async def send_command(self, cmd: str) -> Optional[str]:
         """Send an ssh command to the miner"""
+        return (await self.send_commands(cmd))[0]
+
+    async def send_commands(self, *cmds: str) -> List[Optional[str]]:
+        """Send multiple ssh commands to the miner over one pooled connection.
+
+        The commands are run concurrently, each in its own channel.
+
+        Parameters:
+            *cmds: The commands to run on the miner.
+
+        Returns:
+            A list of the outputs of each command, in the order they were passed, with `None` for failed commands.
+        """
+        pool = _get_pool()
         try:
-            conn = await asyncio.wait_for(self._get_connection(), timeout=10)
+            conn = await pool.acquire(self)
         except (ConnectionError, asyncio.TimeoutError):
+            return [None for _ in cmds]
+
+        try:
+            return list(
+                await asyncio.gather(*[self._run_command(conn, cmd) for cmd in cmds])
+            )
+        finally:
+            pool.release(self, conn)
+
+    async def _run_command(
+        self, conn: asyncssh.SSHClientConnection, cmd: str
+    ) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(conn.run(cmd), timeout=remaining())
+            output = str(max(resp.stdout, resp.stderr, key=len))
+        except Exception as e:
+            logger.error("%s command %s error: %s", self, cmd, e)
+            if instrument.hooks:
+                instrument.emit(
+                    "ssh",
+                    type(self).__name__,
+                    cmd,
+                    self.ip,
+                    time.perf_counter() - start,
+                    sent=len(cmd),
+                    error=e,
+                )
             return None
+        if instrument.hooks:
+            instrument.emit(
+                "ssh",
+                type(self).__name__,
+                cmd,
+                self.ip,
+                time.perf_counter() - start,
+                sent=len(cmd),
+                received=len(output),
+            )
+        return output
+
+    async def upload(self, cmd: str, data: Iterable[bytes]) -> Optional[str]:
+        """Run an ssh command on the miner, streaming data to its stdin in chunks.
 
+        Parameters:
+            cmd: The command to run, which should read the data from stdin.
+            data: The chunks of data to send to the command.
+
+        Returns:
+            The output of the command, or `None` if it failed.  A connection
+            dropped after all the data was sent counts as success, since
+            commands like `sysupgrade` reboot the miner before they exit.
+        """
+        pool = _get_pool()
         try:
-            async with conn:
-                resp = await conn.run(cmd)
-                result = str(max(resp.stdout, resp.stderr, key=len))
+            conn = await pool.acquire(self)
+        except (ConnectionError, asyncio.TimeoutError):
+            return None
 
-                return result
+        sent = False
+        try:
+            async with conn.create_process(cmd, encoding=None) as proc:
+                for chunk in data:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+                proc.stdin.write_eof()
+                sent = True
+                resp = await proc.wait()
+            output = max(resp.stdout, resp.stderr, key=len).decode("utf-8", "replace")
+            if resp.exit_status:
+                logger.error(
+                    "%s upload with command %s exited with status %s: %s",
+                    self,
+                    cmd,
+                    resp.exit_status,
+                    output,
+                )
+                return None
+            return output
+        except (
+            asyncssh.ConnectionLost,
+            asyncssh.DisconnectError,
+            ConnectionError,
+        ) as e:
+            if sent:
+                logger.info("%s disconnected after upload: %s", self, e)
+                return ""
+            logger.error("%s upload with command %s error: %s", self, cmd, e)
+            return None
         except Exception as e:
-            logging.error(f"{self} command {cmd} error: {e}")
+            logger.error("%s upload with command %s error: %s", self, cmd, e)
             return None
+        finally:
+            pool.release(self, conn)
+
+    async def close(self) -> None:
+        """Close the pooled connection to the miner, if there is one."""
+        _get_pool().discard(self)
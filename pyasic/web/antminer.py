@@ -20,10 +20,11 @@ import json
 from pathlib import Path
 from typing import Any
 
-import aiofiles
 import httpx
 
 from pyasic import settings
+from pyasic.misc import offload
+from pyasic.misc.firmware import FirmwareImage
 from pyasic.web.base import BaseWebAPI
 
 
@@ -77,7 +78,7 @@ class AntminerModernWebAPI(BaseWebAPI):
         else:
             if data.status_code == 200:
                 try:
-                    return data.json()
+                    return await offload.json(data)
                 except json.decoder.JSONDecodeError:
                     return {"success": False, "message": "Failed to decode JSON"}
         return {"success": False, "message": "Unknown error occurred"}
@@ -131,7 +132,7 @@ class AntminerModernWebAPI(BaseWebAPI):
         else:
             if ret.status_code == 200:
                 try:
-                    json_data = ret.json()
+                    json_data = await offload.json(ret)
                     return {command: json_data}
                 except json.decoder.JSONDecodeError:
                     pass
@@ -291,7 +292,7 @@ class AntminerOldWebAPI(BaseWebAPI):
         else:
             if data.status_code == 200:
                 try:
-                    return data.json()
+                    return await offload.json(data)
                 except json.decoder.JSONDecodeError:
                     pass
 
@@ -320,7 +321,7 @@ class AntminerOldWebAPI(BaseWebAPI):
                 else:
                     if ret.status_code == 200:
                         try:
-                            json_data = ret.json()
+                            json_data = await offload.json(ret)
                             data[command] = json_data
                         except json.decoder.JSONDecodeError:
                             pass
@@ -407,15 +408,38 @@ class AntminerOldWebAPI(BaseWebAPI):
         return await self.send_command("miner_pools")
 
     async def update_firmware(self, file: Path, keep_settings: bool = True) -> dict:
-        """Perform a system update by uploading a firmware file and sending a command to initiate the update."""
+        """Perform a system update by uploading a firmware file and sending a command to initiate the update.
 
-        async with aiofiles.open(file, "rb") as firmware:
-            file_content = await firmware.read()
-
-        parameters = {
-            "file": (file.name, file_content, "application/octet-stream"),
-            "filename": file.name,
-            "keep_settings": keep_settings,
-        }
-
-        return await self.send_command(command="upgrade", **parameters)
+        The firmware is streamed from a shared memory-mapped image instead of being read into memory.
+        """
+        file = Path(file)
+        url = f"http://{self.ip}:{self.port}/cgi-bin/upgrade.cgi"
+        auth = httpx.DigestAuth(self.username, self.pwd)
+        try:
+            with FirmwareImage.open(file) as firmware:
+                async with httpx.AsyncClient(transport=settings.transport()) as client:
+                    data = await client.post(
+                        url,
+                        auth=auth,
+                        timeout=settings.get("firmware_upload_timeout", 600),
+                        data={
+                            "filename": file.name,
+                            "keep_settings": str(keep_settings).lower(),
+                        },
+                        files={
+                            "file": (
+                                file.name,
+                                firmware.reader(),
+                                "application/octet-stream",
+                            )
+                        },
+                    )
+        except httpx.HTTPError as e:
+            return {"success": False, "message": f"HTTP error occurred: {str(e)}"}
+        else:
+            if data.status_code == 200:
+                try:
+                    return await offload.json(data)
+                except json.decoder.JSONDecodeError:
+                    return {"success": False, "message": "Failed to decode JSON"}
+        return {"success": False, "message": "Unknown error occurred"}
@@ -24,7 +24,7 @@ import httpx
 
 from pyasic import settings
 from pyasic.errors import APIError
-from pyasic.misc import validate_command_output
+from pyasic.misc import offload, validate_command_output
 from pyasic.web.base import BaseWebAPI
 
 
@@ -109,7 +109,7 @@ class AuradineWebAPI(BaseWebAPI):
                             headers={"Token": self.token},
                             timeout=settings.get("api_function_timeout", 5),
                         )
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     validation = validate_command_output(json_data)
                     if not validation[0]:
                         if i == settings.get("get_data_retries", 1):
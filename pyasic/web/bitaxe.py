@@ -7,6 +7,7 @@ from typing import Any
 import httpx
 
 from pyasic import APIError, settings
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -45,7 +46,7 @@ class BitAxeWebAPI(BaseWebAPI):
         else:
             if data.status_code == 200:
                 try:
-                    return data.json()
+                    return await offload.json(data)
                 except json.decoder.JSONDecodeError:
                     pass
 
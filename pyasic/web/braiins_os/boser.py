@@ -16,23 +16,53 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
+import time
 from datetime import timedelta
 from typing import Any
 
 from grpclib import GRPCError, Status
 from grpclib.client import Channel
+from grpclib.encoding.proto import ProtoCodec
 
 from pyasic import settings
 from pyasic.errors import APIError
+from pyasic.misc import instrument, offload, replay
+from pyasic.misc.deadline import remaining
+from pyasic.misc.health import get_health
 from pyasic.web.base import BaseWebAPI
 from pyasic.web.braiins_os.better_monkey import patch
 
 patch()
 
+from .proto.braiins import bos as bos_proto
 from .proto.braiins.bos import *
+from .proto.braiins.bos import v1 as bos_v1_proto
 from .proto.braiins.bos.v1 import *
 
+logger = logging.getLogger(__name__)
+
+# recorded responses are stored with the name of their message type
+_MESSAGE_TYPES = {
+    name: value
+    for module in (bos_proto, bos_v1_proto)
+    for name, value in vars(module).items()
+    if isinstance(value, type) and issubclass(value, betterproto.Message)
+}
+
+
+class _SizedProtoCodec(ProtoCodec):
+    """Remembers the wire size of each response, to decide whether converting it to a dict is offloaded."""
+
+    def decode(self, data: bytes, message_type: type) -> betterproto.Message:
+        message = super().decode(data, message_type)
+        message._wire_size = len(data)
+        return message
+
+
+_codec = _SizedProtoCodec()
+
 
 class BOSMinerGRPCStub(
     ApiVersionServiceStub,
@@ -103,26 +133,120 @@ class BOSerWebAPI(BaseWebAPI):
         **parameters: Any,
     ) -> dict:
         message: betterproto.Message = parameters["message"]
-        metadata = []
-        if privileged:
-            metadata.append(("authorization", await self.auth()))
+        replaying = replay.replayer()
+        if replaying is not None:
+            replayed = functools.partial(self._replay, replaying, command, message)
+            if instrument.hooks:
+                replayed = instrument.wrap(
+                    replayed,
+                    "grpc",
+                    type(self).__name__,
+                    command,
+                    str(self.ip),
+                    sent=len(bytes(message)),
+                )
+            return await self._to_dict(await replayed())
+        host = get_health(self.ip)
+        if not host.allow():
+            raise APIError(
+                f"{self.ip} is unreachable, retrying in {host.retry_in:.0f}s ({host.last_error})"
+            )
+        endpoint = command
         try:
-            async with Channel(self.ip, self.port) as c:
+            metadata = []
+            if privileged:
+                metadata.append(("authorization", await self.auth()))
+            async with Channel(self.ip, self.port, codec=_codec) as c:
                 endpoint = getattr(BOSMinerGRPCStub(c), command)
                 if endpoint is None:
                     if not ignore_errors:
                         raise APIError(f"Command not found - {endpoint}")
                     return {}
                 try:
-                    return (await endpoint(message, metadata=metadata)).to_pydict()
+                    result = await self._to_dict(
+                        await self._call(endpoint, command, message, metadata)
+                    )
                 except GRPCError as e:
                     if e.status == Status.UNAUTHENTICATED:
                         await self._get_auth()
                         metadata = [("authorization", await self.auth())]
-                        return (await endpoint(message, metadata=metadata)).to_pydict()
-                    raise e
+                        result = await self._to_dict(
+                            await self._call(endpoint, command, message, metadata)
+                        )
+                    else:
+                        raise e
+            host.record_success()
+            return result
+        except asyncio.CancelledError:
+            host.release()
+            raise
         except GRPCError as e:
+            # the miner answered, so the host is up
+            host.record_success()
             raise APIError(f"gRPC command failed - {endpoint}") from e
+        except Exception as e:
+            host.record(e)
+            raise
+
+    async def _call(
+        self, endpoint, command: str, message: betterproto.Message, metadata: list
+    ) -> betterproto.Message:
+        call = functools.partial(
+            endpoint, message, metadata=metadata, timeout=remaining()
+        )
+        if instrument.hooks:
+            call = instrument.wrap(
+                call,
+                "grpc",
+                type(self).__name__,
+                command,
+                str(self.ip),
+                sent=len(bytes(message)),
+            )
+        recording = replay.recording()
+        if recording is None:
+            return await call()
+        entry = replay.Exchange(
+            "grpc", str(self.ip), self.port, command, bytes(message), time=time.time()
+        )
+        start = time.monotonic()
+        try:
+            response = await call()
+        except GRPCError as e:
+            entry.error = f"{e.status.name}: {e.message}"
+            raise
+        finally:
+            entry.duration = time.monotonic() - start
+            # failed logins are retried, so only the retry is worth replaying
+            if not entry.error or not entry.error.startswith("UNAUTHENTICATED"):
+                recording.add(entry)
+        entry.response = bytes(response)
+        entry.message = type(response).__name__
+        return response
+
+    async def _replay(
+        self, replaying: replay.Replayer, command: str, message: betterproto.Message
+    ) -> betterproto.Message:
+        found = replaying.find("grpc", str(self.ip), self.port, bytes(message), command)
+        if found is None:
+            raise APIError(f"{self.ip}: No recorded response to gRPC {command}.")
+        await replaying.wait(found)
+        if found.error is not None:
+            raise APIError(f"gRPC command failed - {command}: {found.error}")
+        message_type = _MESSAGE_TYPES.get(found.message)
+        if message_type is None:
+            raise APIError(
+                f"{self.ip}: Unknown recorded gRPC response type {found.message}."
+            )
+        response = message_type().parse(found.response)
+        response._wire_size = len(found.response)
+        return response
+
+    @staticmethod
+    async def _to_dict(message: betterproto.Message) -> dict:
+        return await offload.run(
+            message.to_pydict, size=getattr(message, "_wire_size", 0)
+        )
 
     async def auth(self) -> str | None:
         if self.token is not None and self._auth_time - datetime.now() < timedelta(
@@ -133,7 +257,7 @@ class BOSerWebAPI(BaseWebAPI):
         return self.token
 
     async def _get_auth(self) -> str:
-        async with Channel(self.ip, self.port) as c:
+        async with Channel(self.ip, self.port, codec=_codec) as c:
             req = LoginRequest(username=self.username, password=self.pwd)
             async with c.request(
                 "/braiins.bos.v1.AuthenticationService/Login",
@@ -365,7 +489,7 @@ class BOSerWebAPI(BaseWebAPI):
         save_action: SaveAction = SaveAction.SAVE_AND_APPLY,
     ) -> dict:
         if wattage_target is not None and hashrate_target is not None:
-            logging.error(
+            logger.error(
                 "Cannot use both wattage_target and hashrate_target, using wattage_target."
             )
         elif wattage_target is None and hashrate_target is None:
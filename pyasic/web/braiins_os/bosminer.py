@@ -22,6 +22,7 @@ import httpx
 
 from pyasic import settings
 from pyasic.errors import APIError
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -48,7 +49,7 @@ class BOSMinerWebAPI(BaseWebAPI):
                     headers={"User-Agent": "BTC Tools v0.1"},
                 )
                 if data.status_code == 200:
-                    return data.json()
+                    return await offload.json(data)
                 if ignore_errors:
                     return {}
                 raise APIError(
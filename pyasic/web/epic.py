@@ -15,16 +15,16 @@
 # ------------------------------------------------------------------------------
 from __future__ import annotations
 
-import hashlib
 import json
 from pathlib import Path
 from typing import Any
 
-import aiofiles
 import httpx
 
 from pyasic import settings
 from pyasic.errors import APIError
+from pyasic.misc import offload
+from pyasic.misc.firmware import FirmwareImage
 from pyasic.web.base import BaseWebAPI
 
 
@@ -49,14 +49,6 @@ class ePICWebAPI(BaseWebAPI):
         async with httpx.AsyncClient(transport=settings.transport()) as client:
             for retry_cnt in range(settings.get("get_data_retries", 1)):
                 try:
-                    if parameters.get("form") is not None:
-                        form_data = parameters["form"]
-                        form_data.add_field("password", self.pwd)
-                        response = await client.post(
-                            f"http://{self.ip}:{self.port}/{command}",
-                            timeout=5,
-                            data=form_data,
-                        )
                     if post:
                         response = await client.post(
                             f"http://{self.ip}:{self.port}/{command}",
@@ -77,7 +69,7 @@ class ePICWebAPI(BaseWebAPI):
                                 f"Web command {command} failed with status code {response.status_code}"
                             )
                         return {}
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     if json_data:
                         # The API can return a fail status if the miner cannot return the requested data. Catch this and pass
                         if not json_data.get("result", True) and not post:
@@ -149,19 +141,37 @@ class ePICWebAPI(BaseWebAPI):
 
     async def system_update(self, file: Path | str, keep_settings: bool = True):
         """Perform a system update by uploading a firmware file and sending a
-        command to initiate the update."""
-
-        # calculate the SHA256 checksum of the firmware file
-        sha256_hash = hashlib.sha256()
-        async with aiofiles.open(str(file), "rb") as f:
-            while chunk := await f.read(8192):
-                sha256_hash.update(chunk)
-        checksum = sha256_hash.hexdigest()
-
-        # prepare the multipart/form-data request
-        form_data = aiohttp.FormData()
-        form_data.add_field("checksum", checksum)
-        form_data.add_field("keepsettings", str(keep_settings).lower())
-        form_data.add_field("update.zip", open(file, "rb"), filename="update.zip")
-
-        await self.send_command("systemupdate", form=form_data)
+        command to initiate the update.
+
+        The firmware is streamed from a shared memory-mapped image, and its
+        checksum is only calculated once no matter how many miners are updated.
+        """
+        with FirmwareImage.open(file) as firmware:
+            form = {
+                "checksum": await firmware.sha256(),
+                "keepsettings": str(keep_settings).lower(),
+                "password": self.pwd,
+            }
+            error = None
+            async with httpx.AsyncClient(transport=settings.transport()) as client:
+                for _ in range(settings.get("get_data_retries", 1)):
+                    try:
+                        response = await client.post(
+                            f"http://{self.ip}:{self.port}/systemupdate",
+                            timeout=settings.get("firmware_upload_timeout", 600),
+                            data=form,
+                            # each attempt needs its own reader, a used one is at the end of the image
+                            files={"update.zip": ("update.zip", firmware.reader())},
+                        )
+                    except httpx.HTTPError as e:
+                        error = e
+                        continue
+                    if response.status_code != 200:
+                        raise APIError(
+                            f"Firmware upload failed with status code {response.status_code}"
+                        )
+                    try:
+                        return await offload.json(response)
+                    except json.JSONDecodeError:
+                        return {"success": True}
+        raise APIError(f"Firmware upload failed: {error}")
@@ -22,6 +22,7 @@ from typing import Any
 import httpx
 
 from pyasic import settings
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -87,7 +88,7 @@ class GoldshellWebAPI(BaseWebAPI):
                             headers={"Authorization": "Bearer " + self.token},
                             timeout=settings.get("api_function_timeout", 5),
                         )
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     return json_data
                 except TypeError:
                     await self.auth()
@@ -108,7 +109,7 @@ class GoldshellWebAPI(BaseWebAPI):
                         headers={"Authorization": "Bearer " + self.token},
                         timeout=settings.get("api_function_timeout", 5),
                     )
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     data[command] = json_data
                 except httpx.HTTPError:
                     pass
@@ -23,6 +23,7 @@ import httpx
 
 from pyasic import settings
 from pyasic.errors import APIError
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -64,7 +65,7 @@ class IceRiverWebAPI(BaseWebAPI):
                     if not ignore_errors:
                         raise APIError(f"Command failed: {command}")
                     warnings.warn(f"Command failed: {command}")
-                return resp.json()
+                return await offload.json(resp)
             except httpx.HTTPError:
                 raise APIError(f"Command failed: {command}")
 
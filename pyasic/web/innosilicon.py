@@ -23,6 +23,7 @@ import httpx
 
 from pyasic import settings
 from pyasic.errors import APIError
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -66,7 +67,7 @@ class InnosiliconWebAPI(BaseWebAPI):
                         timeout=settings.get("api_function_timeout", 5),
                         json=parameters,
                     )
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     if (
                         not json_data.get("success")
                         and "token" in json_data
@@ -99,7 +100,7 @@ class InnosiliconWebAPI(BaseWebAPI):
                         headers={"Authorization": "Bearer " + self.token},
                         timeout=settings.get("api_function_timeout", 5),
                     )
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     data[command] = json_data
                 except httpx.HTTPError:
                     pass
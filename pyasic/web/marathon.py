@@ -7,6 +7,7 @@ from typing import Any
 import httpx
 
 from pyasic import settings
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -44,7 +45,7 @@ class MaraWebAPI(BaseWebAPI):
         else:
             if ret.status_code == 200:
                 try:
-                    json_data = ret.json()
+                    json_data = await offload.json(ret)
                     return {command: json_data}
                 except json.decoder.JSONDecodeError:
                     pass
@@ -78,7 +79,7 @@ class MaraWebAPI(BaseWebAPI):
         else:
             if data.status_code == 200:
                 try:
-                    return data.json()
+                    return await offload.json(data)
                 except json.decoder.JSONDecodeError:
                     pass
 
@@ -22,6 +22,7 @@ from typing import Any
 import httpx
 
 from pyasic import settings
+from pyasic.misc import offload
 from pyasic.web.base import BaseWebAPI
 
 
@@ -86,7 +87,7 @@ class VNishWebAPI(BaseWebAPI):
                         # refresh the token, retry
                         await self.auth()
                         continue
-                    json_data = response.json()
+                    json_data = await offload.json(response)
                     if json_data:
                         return json_data
                     return {"success": True}
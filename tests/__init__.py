@@ -14,10 +14,19 @@
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
 
+from tests.balancer_tests import TestLoadBalancer
+from tests.bench_tests import TestBench
 from tests.config_tests import TestConfig
+from tests.fleet_tests import (
+    TestConfigCache,
+    TestFirmwareRollout,
+    TestMetricsExporter,
+    TestShardedPoller,
+)
 from tests.miners_tests import MinersTest
-from tests.network_tests import NetworkTest
+from tests.network_tests import NetworkTest, SocketsTest
 from tests.rpc_tests import *
+from tests.simulator_tests import TestMinerSimulator
 
 if __name__ == "__main__":
     # `coverage run --source pyasic -m unittest discover` will give code coverage data
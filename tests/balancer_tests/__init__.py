@@ -0,0 +1,145 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import unittest
+from types import SimpleNamespace
+
+from pyasic.errors import APIError
+from pyasic.load import MinerLoadBalancer, PowerController
+from pyasic.load.balancer import SetpointAction, _BalancedMiner, _MinerPhaseBalancer
+
+
+class TestLoadBalancer(unittest.TestCase):
+    def setUp(self):
+        self.balancer = _MinerPhaseBalancer([])
+        self.data = {}
+        for ip, tune, shutdown, efficiency in [
+            ("10.0.0.1", True, True, 30),
+            ("10.0.0.2", False, True, 20),
+            ("10.0.0.3", False, True, 40),
+            ("10.0.0.4", False, False, None),
+        ]:
+            self.balancer.miners[ip] = _BalancedMiner(
+                SimpleNamespace(ip=ip), tune, shutdown, 3000, 100
+            )
+            self.data[ip] = SimpleNamespace(
+                efficiency=efficiency, wattage=2500, wattage_limit=None
+            )
+
+    def test_plan_by_efficiency(self):
+        plan = self.balancer._plan(7100, self.data)
+        actions = {str(s.miner.ip): s for s in plan.setpoints}
+
+        self.assertEqual(actions["10.0.0.4"].action, SetpointAction.FIXED)
+        self.assertEqual(actions["10.0.0.4"].wattage, 2500)
+        self.assertEqual(actions["10.0.0.2"].action, SetpointAction.ON)
+        # the least efficient miner is shut down, the tuner takes the rest
+        self.assertEqual(actions["10.0.0.3"].action, SetpointAction.OFF)
+        self.assertEqual(actions["10.0.0.1"].action, SetpointAction.TUNE)
+        self.assertEqual(actions["10.0.0.1"].wattage, 7100 - 2500 - 3000 - 100)
+        self.assertEqual(plan.wattage, 7100)
+
+    def test_plan_limits(self):
+        with self.assertRaises(APIError):
+            self.balancer._plan(100_000, self.data)
+        with self.assertRaises(APIError):
+            self.balancer._plan(1000, self.data)
+
+
+class FakeTunerMiner:
+    # draws 10% less than it is set to
+    def __init__(self, ip: str):
+        self.ip = ip
+        self.limit = 3000
+        self.changes = 0
+        self.polls = 0
+
+    async def get_data(self, include=None):
+        self.polls += 1
+        return SimpleNamespace(
+            efficiency=30, wattage=int(self.limit * 0.9), wattage_limit=None
+        )
+
+    async def resume_mining(self):
+        return True
+
+    async def set_power_limit(self, wattage: int):
+        self.changes += 1
+        self.limit = wattage
+        return True
+
+
+class TestPowerController(unittest.IsolatedAsyncioTestCase):
+    def make_controller(self, **kwargs) -> PowerController:
+        balancer = MinerLoadBalancer([[]])
+        for ip in ["10.0.0.1", "10.0.0.2"]:
+            balancer.phases[0].miners[ip] = _BalancedMiner(
+                FakeTunerMiner(ip), True, True, 3000, 100
+            )
+        return PowerController(balancer, 5000, **kwargs)
+
+    async def test_converges(self):
+        controller = self.make_controller(min_change_interval=0, gain=1)
+        for _ in range(10):
+            step = await controller.step()
+        self.assertLessEqual(abs(step.error), 5000 * controller.deadband)
+        self.assertEqual(step.changed, 0)
+
+    async def test_rate_limited(self):
+        controller = self.make_controller(min_change_interval=3600)
+        first = await controller.step()
+        self.assertEqual(first.changed, 2)
+        second = await controller.step()
+        self.assertEqual((second.changed, second.deferred), (0, 2))
+        # the miners are still on the first plan, so the error isn't theirs to correct yet
+        self.assertEqual(controller.correction, 0)
+
+    async def test_polls_once_per_step(self):
+        controller = self.make_controller(min_change_interval=0)
+        await controller.step()
+        self.assertEqual([m.polls for m in controller.miners], [1, 1])
+
+    async def test_target_change(self):
+        target = [5000]
+        controller = self.make_controller(min_change_interval=0, gain=1)
+        controller.target = lambda: target[0]
+        for _ in range(5):
+            await controller.step()
+        self.assertGreater(controller.correction, 0)
+
+        # measured on the old setpoints, so the new target is planned without a correction
+        target[0] = 4000
+        step = await controller.step()
+        self.assertEqual(controller.correction, 0)
+        self.assertEqual(step.planned, 4000)
+
+    async def test_target_out_of_range(self):
+        controller = self.make_controller(min_change_interval=0)
+        controller.target = 100_000
+        step = await controller.step()
+        self.assertIsNone(step.planned)
+        self.assertEqual(step.changed, 0)
+
+    async def test_removed_miners_are_forgotten(self):
+        controller = self.make_controller(min_change_interval=0)
+        await controller.step()
+        del controller.balancer.phases[0].miners["10.0.0.2"]
+        await controller.step()
+        self.assertEqual(list(controller._applied), ["10.0.0.1"])
+        self.assertEqual(list(controller._changed_at), ["10.0.0.1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import unittest
+
+from pyasic.bench import BenchResult, percentile, run_benchmarks
+
+
+class TestBench(unittest.IsolatedAsyncioTestCase):
+    def test_result(self):
+        result = BenchResult("test", 100, 2.0, [i / 100 for i in range(100)])
+        self.assertEqual(result.ops_per_sec, 50)
+        self.assertEqual(result.p50, 0.5)
+        self.assertEqual(result.p99, 0.98)
+        self.assertIsNone(percentile([], 0.5))
+
+    async def test_run(self):
+        try:
+            report = await run_benchmarks(
+                count=7, miner="antminer", rounds=1, iterations=10
+            )
+        except OSError as e:
+            self.skipTest(f"Cannot bind simulator ports: {e}")
+        names = [r["name"] for r in report["results"]]
+        for name in ["scan", "get_multiple_miners", "get_data[antminer]"]:
+            self.assertIn(name, names)
+        for name in ["_load_api_data", "as_json", "as_influxdb", "config.as_wm"]:
+            self.assertIn(name, names)
+        scan = report["results"][0]
+        self.assertEqual(scan["ops"], 7)
+        self.assertGreater(scan["ops_per_sec"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,572 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import asyncio
+import json
+import random
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from pyasic.config import MinerConfig, MiningModeConfig, PoolConfig
+from pyasic.config.mining import MiningModePowerTune
+from pyasic.data import Fan, HashBoard, MinerData
+from pyasic.data.device import DeviceInfo
+from pyasic.data.hashrate.sha256 import SHA256HashRate
+from pyasic.device.makes import MinerMake
+from pyasic.errors import APIError
+from pyasic.fleet import (
+    ConfigCache,
+    Curtailment,
+    FirmwareRollout,
+    FleetRegistry,
+    MetricsExporter,
+    MinerOnboarding,
+    RolloutStatus,
+    ShardedPoller,
+    apply_config,
+)
+from pyasic.fleet.shard import ShardStats, _balance
+from pyasic.miners.backends import AntminerModern
+from pyasic.miners.base import BaseMiner
+from pyasic.miners.data import DataLocations
+from pyasic.misc.ratelimit import RateLimiter
+from pyasic.simulator import SIMULATORS, MinerSimulator
+
+
+class FakeUpgradeMiner(BaseMiner):
+    def __init__(self, ip: str, fail: bool = False):
+        super().__init__(ip)
+        self.fw_ver = "1.0"
+        self.fail = fail
+        self.upgrades = 0
+
+    async def _get_fw_ver(self):
+        return self.fw_ver
+
+    async def upgrade_firmware(self, *, file: str = None, keep_settings=True):
+        self.upgrades += 1
+        if self.fail:
+            return False
+        self.fw_ver = "2.0"
+        return True
+
+
+class FakeRejectedUpgradeMiner(FakeUpgradeMiner):
+    async def upgrade_firmware(self, *, file: str = None, keep_settings=True):
+        self.upgrades += 1
+        raise APIError("Firmware upgrade failed. Response: invalid image")
+
+
+class FakeURLUpgradeMiner(FakeUpgradeMiner):
+    async def upgrade_firmware(self, *, url: str = None, keep_settings=True):
+        self.upgrades += 1
+        return True
+
+
+class FakeNoUpgradeMiner(BaseMiner):
+    async def _get_fw_ver(self):
+        return "1.0"
+
+
+class TestFirmwareRollout(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmp.name, "firmware.tar")
+        self.file.write_bytes(b"\x00" * 1024)
+        self.checkpoint = Path(self.tmp.name, "rollout.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_rollout_success(self):
+        miners = [FakeUpgradeMiner(f"10.0.0.{i}") for i in range(1, 8)]
+        rollout = FirmwareRollout(
+            miners, self.file, version="2.0", wave_size=2, verify_interval=0
+        )
+        results = await rollout.run()
+        self.assertTrue(
+            all(r.status == RolloutStatus.SUCCESS for r in results.values())
+        )
+        self.assertTrue(all(r.new_fw_ver == "2.0" for r in results.values()))
+
+    async def test_rollout_halts_and_resumes(self):
+        miners = [FakeUpgradeMiner(f"10.0.0.{i}") for i in range(1, 8)]
+        miners[0].fail = True
+        rollout = FirmwareRollout(
+            miners,
+            self.file,
+            version="2.0",
+            wave_size=2,
+            verify_interval=0,
+            checkpoint=self.checkpoint,
+        )
+        results = await rollout.run()
+        self.assertTrue(rollout.halted)
+        self.assertEqual(results["10.0.0.1"].status, RolloutStatus.FAILED)
+        self.assertEqual(results["10.0.0.2"].status, RolloutStatus.SUCCESS)
+        self.assertEqual(results["10.0.0.7"].status, RolloutStatus.SKIPPED)
+        with open(self.checkpoint) as f:
+            self.assertTrue(json.load(f)["halted"])
+
+        miners[0].fail = False
+        resumed = FirmwareRollout(
+            miners,
+            self.file,
+            version="2.0",
+            wave_size=2,
+            verify_interval=0,
+            checkpoint=self.checkpoint,
+        )
+        results = await resumed.run()
+        self.assertTrue(
+            all(r.status == RolloutStatus.SUCCESS for r in results.values())
+        )
+        # the miner finished in the first run is not upgraded again
+        self.assertEqual(miners[1].upgrades, 1)
+
+    async def test_rollout_rejected_upgrade(self):
+        miners = [FakeRejectedUpgradeMiner("10.0.0.1")]
+        rollout = FirmwareRollout(
+            miners, self.file, version="2.0", verify_interval=0, verify_timeout=60
+        )
+        results = await asyncio.wait_for(rollout.run(), 5)
+        # fails right away instead of waiting out the verify timeout
+        self.assertEqual(results["10.0.0.1"].status, RolloutStatus.FAILED)
+        self.assertIn("invalid image", results["10.0.0.1"].error)
+
+    async def test_rollout_unsupported_miners(self):
+        miners = [
+            FakeURLUpgradeMiner("10.0.0.1"),
+            FakeNoUpgradeMiner("10.0.0.2"),
+            FakeUpgradeMiner("10.0.0.3"),
+        ]
+        rollout = FirmwareRollout(miners, self.file, version="2.0", verify_interval=0)
+        results = await rollout.run()
+        self.assertFalse(rollout.halted)
+        self.assertEqual(miners[0].upgrades, 0)
+        self.assertEqual(results["10.0.0.1"].status, RolloutStatus.SKIPPED)
+        self.assertEqual(results["10.0.0.2"].status, RolloutStatus.SKIPPED)
+        self.assertIn("firmware file", results["10.0.0.1"].error)
+        self.assertEqual(results["10.0.0.3"].status, RolloutStatus.SUCCESS)
+
+
+class FakeConfigMiner(BaseMiner):
+    data_locations = DataLocations()
+
+    def __init__(self, ip: str):
+        super().__init__(ip)
+        self.config = MinerConfig()
+        self.fetches = 0
+        self.sends = 0
+
+    async def get_config(self) -> MinerConfig:
+        self.fetches += 1
+        if self.config is None:
+            return None
+        return MinerConfig.from_dict(self.config.as_dict())
+
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None):
+        self.sends += 1
+        self.config = config
+
+
+class TestConfigCache(unittest.IsolatedAsyncioTestCase):
+    async def test_cached_until_refresh(self):
+        miner = FakeConfigMiner("10.0.0.1")
+        cache = ConfigCache(refresh_interval=60)
+        await cache.get(miner)
+        await cache.get(miner)
+        data = await cache.get_data(miner, include=["config", "hostname"])
+        self.assertEqual(miner.fetches, 1)
+        self.assertEqual(data.config, MinerConfig())
+        await cache.get(miner, force=True)
+        self.assertEqual(miner.fetches, 2)
+
+    async def test_change_detection(self):
+        changes = []
+        miner = FakeConfigMiner("10.0.0.1")
+        cache = ConfigCache(refresh_interval=0, on_change=changes.append)
+        await cache.get(miner)
+        original_hash = cache.get_hash(miner)
+
+        # our own change is not reported
+        await cache.send_config(
+            miner, MinerConfig(mining_mode=MiningModePowerTune(power=3000))
+        )
+        await cache.get(miner)
+        self.assertEqual(changes, [])
+        self.assertNotEqual(cache.get_hash(miner), original_hash)
+
+        # an out-of-band change is
+        miner.config = MinerConfig(mining_mode=MiningModePowerTune(power=2000))
+        await cache.get(miner)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].new_hash, miner.config.content_hash())
+
+    async def test_failed_read_keeps_cache(self):
+        changes = []
+        miner = FakeConfigMiner("10.0.0.1")
+        cache = ConfigCache(refresh_interval=0, on_change=changes.append)
+        # like an antminer before its config was first read
+        miner.config = None
+        with self.assertRaises(APIError):
+            await cache.get(miner)
+        self.assertNotIn(miner, cache)
+
+        config = MinerConfig(mining_mode=MiningModePowerTune(power=3000))
+        miner.config = config
+        await cache.get(miner)
+        cached_hash = cache.get_hash(miner)
+
+        miner.config = None
+        self.assertEqual(await cache.get(miner), config)
+        # a backend which falls back to a default config when the read fails
+        miner.config = MinerConfig()
+        self.assertEqual(await cache.get(miner), config)
+        self.assertEqual(cache.get_hash(miner), cached_hash)
+        self.assertEqual(changes, [])
+
+    async def test_failed_send_is_not_expected(self):
+        changes = []
+        miner = FakeConfigMiner("10.0.0.1")
+        miner.config = MinerConfig(mining_mode=MiningModePowerTune(power=3000))
+        cache = ConfigCache(refresh_interval=0, on_change=changes.append)
+        await cache.get(miner)
+
+        async def fail(*args, **kwargs):
+            raise APIError("send failed")
+
+        miner._send_config = fail
+        with self.assertRaises(APIError):
+            await cache.send_config(miner, MinerConfig())
+        # drift after the failed send is still reported
+        miner.config = MinerConfig(mining_mode=MiningModePowerTune(power=2000))
+        await cache.get(miner)
+        self.assertEqual(len(changes), 1)
+
+    async def test_only_if_changed(self):
+        miner = FakeConfigMiner("10.0.0.1")
+        cache = ConfigCache(refresh_interval=60)
+        sent = await cache.send_config(miner, MinerConfig(), only_if_changed=True)
+        self.assertFalse(sent)
+        self.assertEqual(miner.sends, 0)
+
+        config = MinerConfig(mining_mode=MiningModePowerTune(power=3000))
+        self.assertEqual(config.diff(MinerConfig()), ["mining_mode"])
+        sent = await cache.send_config(miner, config, only_if_changed=True)
+        self.assertTrue(sent)
+        self.assertEqual(miner.sends, 1)
+
+
+class FakeWMConfigMiner(FakeConfigMiner):
+    async def _send_config(self, config: MinerConfig, user_suffix: str = None):
+        if self.ip == "10.0.0.3":
+            raise ConnectionError("unreachable")
+        self.sends += 1
+        self.sent = config.as_wm(user_suffix=user_suffix)
+
+
+class TestApplyConfig(unittest.IsolatedAsyncioTestCase):
+    async def test_apply_config(self):
+        config = MinerConfig(
+            pools=PoolConfig.simple(
+                [{"url": "stratum+tcp://pool:3333", "user": "user", "password": "x"}]
+            )
+        )
+        miners = [FakeWMConfigMiner(f"10.0.0.{i}") for i in range(1, 4)]
+        results = await apply_config(
+            miners, config, user_suffix_fn=lambda m: "." + str(m.ip).split(".")[-1]
+        )
+
+        self.assertTrue(results["10.0.0.1"].success)
+        self.assertFalse(results["10.0.0.3"].success)
+        self.assertIn("unreachable", results["10.0.0.3"].error)
+        for miner in miners[:2]:
+            self.assertEqual(
+                miner.sent,
+                config.as_wm(user_suffix=results[str(miner.ip)].user_suffix),
+            )
+
+
+class FakeListener:
+    def __init__(self, reports: list):
+        self.reports = reports
+
+    async def listen(self):
+        for report in self.reports:
+            yield report
+
+    async def cancel(self):
+        pass
+
+
+class FakeFactory:
+    def __init__(self):
+        self.identified = []
+
+    async def get_miner(self, ip: str):
+        self.identified.append(ip)
+        if ip == "10.0.0.9":
+            return None
+        return BaseMiner(ip)
+
+
+class TestMinerOnboarding(unittest.IsolatedAsyncioTestCase):
+    async def test_onboarding(self):
+        registry = FleetRegistry()
+        registry.register("aa:00", BaseMiner("10.0.0.1"))
+        factory = FakeFactory()
+        onboarding = MinerOnboarding(
+            listener=FakeListener(
+                [
+                    {"IP": "10.0.0.1", "MAC": "AA:00"},
+                    {"IP": "10.0.0.2", "MAC": "AA:01"},
+                    {"IP": "10.0.0.2", "MAC": "AA:01"},
+                    {"IP": "10.0.0.9", "MAC": "AA:09"},
+                    {"IP": "10.0.0.3", "MAC": "AA:00"},
+                ]
+            ),
+            registry=registry,
+            factory=factory,
+            rate=None,
+        )
+        miners = [miner async for miner in onboarding.run()]
+
+        self.assertEqual(sorted(str(m.ip) for m in miners), ["10.0.0.2", "10.0.0.3"])
+        self.assertEqual(
+            sorted(factory.identified), ["10.0.0.2", "10.0.0.3", "10.0.0.9"]
+        )
+        self.assertEqual(len(registry), 2)
+        self.assertEqual(str(registry.get("AA:00").ip), "10.0.0.3")
+        self.assertIsNone(registry.get_by_ip("10.0.0.1"))
+
+    async def test_batches(self):
+        onboarding = MinerOnboarding(listener=FakeListener([]), batch_size=2)
+        reports = asyncio.Queue()
+        for i in range(5):
+            reports.put_nowait((f"AA:0{i}", f"10.0.0.{i}"))
+        reports.put_nowait(None)
+        sizes = []
+        done = False
+        while not done:
+            batch, done = await onboarding._next_batch(reports)
+            sizes.append(len(batch))
+        self.assertEqual(sizes, [2, 2, 1])
+
+        # a partial batch is started once the interval passes
+        onboarding.batch_interval = 0.01
+        reports.put_nowait(("AA:05", "10.0.0.5"))
+        batch, done = await asyncio.wait_for(onboarding._next_batch(reports), 1)
+        self.assertEqual((len(batch), done), (1, False))
+
+    async def test_rate_limit(self):
+        limiter = RateLimiter(100)
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.03)
+        # batches are paced by their size
+        start = time.monotonic()
+        await limiter.wait(5)
+        await limiter.wait(1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+class FakeCurtailMiner(BaseMiner):
+    def __init__(self, ip: str, delay: float = 0, reject: bool = False):
+        super().__init__(ip)
+        self.delay = delay
+        self.reject = reject
+        self.mining = True
+
+    async def stop_mining(self) -> bool:
+        if self.reject:
+            return False
+        asyncio.get_running_loop().call_later(
+            self.delay, setattr, self, "mining", False
+        )
+        return True
+
+    async def is_mining(self) -> bool:
+        return self.mining
+
+
+class FakeAntminerCurtailMiner(AntminerModern):
+    def __init__(self, ip: str, mining_mode=None):
+        super().__init__(ip)
+        self.config = MinerConfig(mining_mode=mining_mode or MiningModeConfig.normal())
+
+    async def get_config(self) -> MinerConfig:
+        return self.config
+
+    async def send_config(self, config: MinerConfig, user_suffix: str = None):
+        self.config = config
+
+    async def is_mining(self) -> bool:
+        return self.config.mining_mode.mode != "sleep"
+
+
+class TestCurtailment(unittest.IsolatedAsyncioTestCase):
+    async def test_curtail(self):
+        miners = [
+            FakeCurtailMiner("10.0.0.1"),
+            FakeCurtailMiner("10.0.0.2", delay=0.05),
+            FakeCurtailMiner("10.0.0.3", reject=True),
+        ]
+        curtailment = Curtailment(miners, confirm_interval=0.01)
+        await curtailment.prepare()
+        report = await curtailment.curtail()
+
+        self.assertEqual(report.failed, ["10.0.0.3"])
+        self.assertFalse(miners[0].mining or miners[1].mining)
+        self.assertGreaterEqual(report.results["10.0.0.2"].confirmed, 0.05)
+        self.assertEqual(report.p50, report.results["10.0.0.1"].confirmed)
+        self.assertEqual(report.p99, report.results["10.0.0.2"].confirmed)
+
+    async def test_resume_prepared_config(self):
+        miners = [
+            FakeAntminerCurtailMiner("10.0.0.1"),
+            FakeAntminerCurtailMiner(
+                "10.0.0.2", MiningModeConfig.power_tuning(power=3000)
+            ),
+        ]
+        curtailment = Curtailment(miners, confirm_interval=0.01)
+        await curtailment.prepare()
+        report = await curtailment.curtail()
+        self.assertEqual(report.failed, [])
+        self.assertTrue(all(m.config.mining_mode.mode == "sleep" for m in miners))
+
+        report = await curtailment.resume()
+        self.assertEqual(report.failed, [])
+        self.assertEqual(miners[0].config.mining_mode, MiningModeConfig.normal())
+        # the mode the miner was prepared with is restored
+        self.assertEqual(miners[1].config.mining_mode.power, 3000)
+
+
+class TestMetricsExporter(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    def data(ip: str, temp: int = 60) -> MinerData:
+        return MinerData(
+            ip=ip,
+            device_info=DeviceInfo(make=MinerMake.ANTMINER),
+            hostname='miner "1"',
+            wattage=3250,
+            hashboards=[
+                HashBoard(
+                    slot=0, hashrate=SHA256HashRate(36.6), temp=temp, missing=False
+                ),
+                HashBoard(slot=1, missing=True),
+            ],
+            fans=[Fan(speed=5400), Fan()],
+            timed_out=["hostname"],
+        )
+
+    async def test_scrape(self):
+        async with MetricsExporter(host="127.0.0.1", port=0) as exporter:
+            exporter.update_many([self.data("10.0.0.1"), self.data("10.0.0.2")])
+            exporter.update(self.data("10.0.0.1", temp=70))
+            reader, writer = await asyncio.open_connection("127.0.0.1", exporter.port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = (await reader.read()).decode()
+            writer.close()
+        head, body = response.split("\r\n\r\n", 1)
+        self.assertTrue(head.startswith("HTTP/1.1 200"))
+        self.assertIn(f"Content-Length: {len(body.encode())}", head)
+        self.assertIn('pyasic_wattage_watts{ip="10.0.0.1"} 3250\n', body)
+        self.assertIn('hostname="miner \\"1\\""', body)
+        self.assertIn(
+            'pyasic_hashboard_temperature_celsius{ip="10.0.0.1",slot="0"} 70\n', body
+        )
+        self.assertNotIn('slot="1"', body)
+        self.assertIn(
+            'pyasic_hashrate_hashes_per_second{ip="10.0.0.2"} 36600000000000.0', body
+        )
+        self.assertIn('pyasic_timeouts_total{field="hostname"} 3\n', body)
+        # each metric is one group, with its header first
+        self.assertEqual(body.count("# TYPE pyasic_wattage_watts gauge"), 1)
+        lines = [l for l in body.splitlines() if "wattage_watts" in l]
+        self.assertEqual(len(lines), 4)
+
+    def test_render_cached(self):
+        exporter = MetricsExporter(collect=False)
+        exporter.update(self.data("10.0.0.1"))
+        body = exporter.render_fleet()
+        self.assertIs(exporter.render_fleet(), body)
+        exporter.remove("10.0.0.1")
+        self.assertEqual(exporter.render_fleet(), b"")
+        self.assertEqual(len(exporter), 0)
+
+
+class TestShardedPoller(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        kinds = list(SIMULATORS)
+        self.farm = MinerSimulator(
+            [
+                SIMULATORS[kinds[idx % len(kinds)]](
+                    f"127.1.3.{idx + 1}", rng=random.Random(idx)
+                )
+                for idx in range(10)
+            ]
+        )
+        try:
+            await self.farm.start()
+        except OSError as e:
+            await self.farm.stop()
+            self.skipTest(f"Cannot bind simulator ports: {e}")
+
+    async def asyncTearDown(self):
+        await self.farm.stop()
+
+    async def test_poll(self):
+        async with ShardedPoller(self.farm.ips, shards=2, chunk_size=3) as poller:
+            self.assertEqual(len(poller.assignments), 2)
+            data = await poller.poll()
+            self.assertEqual(sorted(data), sorted(self.farm.ips))
+            for ip, d in data.items():
+                self.assertEqual(d.mac, self.farm.get(ip).state.mac.upper())
+            self.assertEqual(sum(s.polled for s in poller.stats), 10)
+
+            # dead workers are started again before the next poll
+            poller._shards[0].process.kill()
+            poller._shards[0].process.join()
+            data = await poller.poll()
+            self.assertEqual(len(data), 10)
+            self.assertIsNone(poller.stats[0].error)
+
+    def test_balance(self):
+        assignments = [
+            [f"10.0.0.{i}" for i in range(10)],
+            [f"10.0.1.{i}" for i in range(10)],
+        ]
+        stats = [
+            ShardStats(shard=0, miners=10, seconds=3),
+            ShardStats(shard=1, miners=10, seconds=1),
+        ]
+        self.assertTrue(_balance(assignments, stats))
+        self.assertEqual([len(a) for a in assignments], [5, 15])
+        self.assertEqual(len({ip for a in assignments for ip in a}), 20)
+        # shards which poll at the same rate are left alone
+        assignments = [["10.0.0.1", "10.0.0.2"], ["10.0.1.1", "10.0.1.2"]]
+        stats = [
+            ShardStats(shard=0, miners=2, seconds=1),
+            ShardStats(shard=1, miners=2, seconds=1),
+        ]
+        self.assertFalse(_balance(assignments, stats))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,12 +13,40 @@
 #  See the License for the specific language governing permissions and         -
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
+import asyncio
+import hashlib
 import inspect
+import tempfile
+import threading
+import time
 import unittest
 import warnings
 from dataclasses import asdict
+from pathlib import Path
 
+import httpx
+
+from pyasic import settings
+from pyasic.errors import APIError
+from pyasic.miners.backends import AvalonMiner
+from pyasic.miners.base import BaseMiner
+from pyasic.miners.data import (
+    DataFunction,
+    DataLocations,
+    DataOptions,
+    RPCAPICommand,
+    WebAPICommand,
+)
 from pyasic.miners.factory import MINER_CLASSES
+from pyasic.miners.listener import MinerListener, MinerListenerProtocol
+from pyasic.misc import health, instrument, offload, replay
+from pyasic.misc.deadline import deadline, remaining
+from pyasic.misc.firmware import FirmwareImage
+from pyasic.misc.parse_cache import parse_cache, parse_once
+from pyasic.rpc.base import BaseMinerRPCAPI
+from pyasic.ssh.base import BaseSSH, _SSHConnectionPool
+from pyasic.web.braiins_os.boser import BOSerWebAPI
+from pyasic.web.braiins_os.proto.braiins.bos import ApiVersion, ApiVersionRequest
 
 
 class MinersTest(unittest.TestCase):
@@ -102,6 +130,518 @@ class MinersTest(unittest.TestCase):
                             set([k["name"] for k in data_point["kwargs"]]),
                         )
 
+    def test_collection_plan_cached(self):
+        warnings.filterwarnings("ignore")
+        for miner_type in MINER_CLASSES.keys():
+            for miner_model in MINER_CLASSES[miner_type].keys():
+                with self.subTest(
+                    msg=f"Collection plan check",
+                    miner_type=miner_type,
+                    miner_model=miner_model,
+                ):
+                    miner = MINER_CLASSES[miner_type][miner_model]("127.0.0.1")
+                    plan = miner._get_collection_plan(
+                        include=[DataOptions.HASHRATE, DataOptions.FANS, "mac"],
+                        exclude=[DataOptions.FANS],
+                    )
+                    self.assertEqual(
+                        [f.data_name for f in plan.functions], ["hashrate", "mac"]
+                    )
+                    self.assertIs(
+                        plan,
+                        miner._get_collection_plan(
+                            include=["hashrate", "fans", "mac"], exclude=["fans"]
+                        ),
+                    )
+                    self.assertEqual(
+                        len(miner._get_collection_plan().functions), len(DataOptions)
+                    )
+
+
+class ListenerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_queued(self):
+        protocol = MinerListenerProtocol()
+        protocol.datagram_received(b"192.168.1.10,aa:bb:cc:dd:ee:01", None)
+        protocol.datagram_received(b"IP:192.168.1.11MAC:aa:bb:cc:dd:ee:02\x00", None)
+        protocol.datagram_received(b"OK\x00\x00\x00\x00\x00\x00\x00\x00", None)
+        protocol.datagram_received(b"\xff\xfe", None)
+        self.assertEqual(
+            await protocol.get_new_miner(),
+            {"IP": "192.168.1.10", "MAC": "AA:BB:CC:DD:EE:01"},
+        )
+        self.assertEqual(
+            await protocol.get_new_miner(),
+            {"IP": "192.168.1.11", "MAC": "AA:BB:CC:DD:EE:02"},
+        )
+        self.assertTrue(protocol.queue.empty())
+
+    async def test_dedup_and_cancel(self):
+        listener = MinerListener(bind_addr=[], dedup_window=60)
+        found = []
+
+        async def listen():
+            async for miner in listener.listen():
+                found.append(miner)
+
+        task = asyncio.create_task(listen())
+        await asyncio.sleep(0)
+        for ip in ["10.0.0.1", "10.0.0.1", "10.0.0.2"]:
+            listener._queue.put_nowait({"IP": ip, "MAC": ip})
+        await asyncio.sleep(0)
+        await listener.cancel()
+        await asyncio.wait_for(task, 1)
+        self.assertEqual([m["IP"] for m in found], ["10.0.0.1", "10.0.0.2"])
+
+    def test_dedup_prunes_expired(self):
+        listener = MinerListener(bind_addr=[], dedup_window=0)
+        for i in range(2000):
+            self.assertFalse(listener._is_duplicate({"MAC": str(i % 3)}))
+        self.assertLessEqual(len(listener._last_seen), 1)
+
+
+class SlowMiner(BaseMiner):
+    data_locations = DataLocations()
+
+    async def _get_mac(self):
+        return "AA:BB:CC:DD:EE:FF"
+
+    async def _get_hostname(self):
+        await asyncio.sleep(10)
+        return "slow"
+
+    async def _get_fw_ver(self):
+        return "1.0"
+
+
+class FakeSSHConnection:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSSH(BaseSSH):
+    fail = False
+
+    async def _get_connection(self):
+        if self.fail:
+            raise ConnectionRefusedError()
+        return FakeSSHConnection()
+
+
+class SSHPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def test_locks_are_dropped(self):
+        pool = _SSHConnectionPool()
+        settings.update("ssh_pool_idle_timeout", 0)
+        try:
+            for i in range(10):
+                ssh = FakeSSH(f"10.0.0.{i}")
+                conn = await pool.acquire(ssh)
+                pool.release(ssh, conn)
+                self.assertTrue(conn.closed)
+            ssh = FakeSSH("10.0.0.20")
+            ssh.fail = True
+            with self.assertRaises(ConnectionRefusedError):
+                await pool.acquire(ssh)
+        finally:
+            settings.update("ssh_pool_idle_timeout", 30)
+            health.reset()
+        self.assertEqual((len(pool), pool._locks, pool._waiting), (0, {}, {}))
+
+
+class FirmwareImageTest(unittest.IsolatedAsyncioTestCase):
+    async def test_sha256(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "firmware.tar"
+            path.write_bytes(b"firmware")
+            with FirmwareImage.open(path) as firmware:
+                digests = await asyncio.gather(firmware.sha256(), firmware.sha256())
+                self.assertEqual(
+                    digests,
+                    [hashlib.sha256(b"firmware").hexdigest()] * 2,
+                )
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "firmware.tar"
+            path.touch()
+            with self.assertRaisesRegex(ValueError, "empty"):
+                FirmwareImage.open(path)
+
+
+class HungRPC:
+    async def multicommand(self, *commands, allow_warning=False):
+        await asyncio.sleep(10)
+
+
+class FastWeb:
+    async def multicommand(self, *commands, allow_warning=False):
+        return {"multicommand": True, "summary": {"mac": "AA:BB:CC:DD:EE:FF"}}
+
+
+class HungRPCMiner(BaseMiner):
+    data_locations = DataLocations(
+        **{
+            str(DataOptions.MAC): DataFunction(
+                "_get_mac", [WebAPICommand("web_summary", "summary")]
+            ),
+            str(DataOptions.HOSTNAME): DataFunction(
+                "_get_hostname", [RPCAPICommand("rpc_version", "version")]
+            ),
+        }
+    )
+
+    def __init__(self, ip: str):
+        super().__init__(ip)
+        self.rpc = HungRPC()
+        self.web = FastWeb()
+
+    async def _get_mac(self, web_summary=None):
+        return web_summary["mac"]
+
+    async def _get_hostname(self, rpc_version=None):
+        return "hostname"
+
+
+class DeadlineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_partial_data(self):
+        miner = SlowMiner("10.0.0.1")
+        start = time.monotonic()
+        data = await miner.get_data(include=["mac", "hostname", "fw_ver"], deadline=0.1)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(data.mac, "AA:BB:CC:DD:EE:FF")
+        self.assertIsNone(data.hostname)
+        self.assertIn("hostname", data.timed_out)
+        self.assertNotIn("mac", data.timed_out)
+
+    async def test_hung_command(self):
+        data = await HungRPCMiner("10.0.0.1").get_data(
+            include=["mac", "hostname"], deadline=0.1
+        )
+        # the web reply is still parsed once the rpc command is cancelled
+        self.assertEqual(data.mac, "AA:BB:CC:DD:EE:FF")
+        self.assertIsNone(data.hostname)
+        self.assertEqual(data.timed_out, ["hostname"])
+
+    async def test_no_deadline(self):
+        data = await SlowMiner("10.0.0.1").get_data(include=["mac", "fw_ver"])
+        self.assertEqual(data.fw_ver, "1.0")
+        self.assertEqual(data.timed_out, [])
+
+    async def test_nested_deadline_only_shortens(self):
+        self.assertIsNone(remaining())
+        with deadline(1):
+            with deadline(60):
+                self.assertLessEqual(remaining(), 1)
+            with deadline(0.5):
+                self.assertLessEqual(remaining(), 0.5)
+        self.assertIsNone(remaining())
+
+    async def test_expired_deadline_is_not_a_host_failure(self):
+        health.reset()
+        host = health.get_health("10.0.0.1")
+        with deadline(0):
+            for _ in range(5):
+                host.record(asyncio.TimeoutError())
+        self.assertEqual(host.failures, 0)
+        health.reset()
+
+
+class BrokenMiner(SlowMiner):
+    async def _get_hostname(self):
+        raise ValueError("malformed hostname")
+
+
+class TimeoutMiner(SlowMiner):
+    async def _get_hostname(self):
+        raise asyncio.TimeoutError()
+
+
+class CaptureErrorsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_raises_by_default(self):
+        with self.assertRaises(APIError):
+            await BrokenMiner("10.0.0.1").get_data(include=["mac", "hostname"])
+
+    async def test_partial_data(self):
+        data = await BrokenMiner("10.0.0.1").get_data(
+            include=["mac", "hostname", "fw_ver"], capture_errors=True
+        )
+        self.assertEqual(data.mac, "AA:BB:CC:DD:EE:FF")
+        self.assertEqual(data.fw_ver, "1.0")
+        self.assertEqual([e.field for e in data.field_errors], ["hostname"])
+        error = data.field_errors[0]
+        self.assertEqual(error.error_type, "ValueError")
+        self.assertEqual(error.error, "malformed hostname")
+        self.assertIn("_get_hostname", error.traceback)
+        self.assertGreaterEqual(error.duration, 0)
+        # collection details aren't part of the exported data
+        self.assertNotIn("field_errors", data.as_dict())
+        self.assertNotIn("malformed hostname", data.as_csv())
+        self.assertEqual((data + data).field_errors, [])
+
+    async def test_timeout_without_deadline(self):
+        # a timeout inside a data function is an ordinary failure without a deadline
+        with self.assertRaises(APIError):
+            await TimeoutMiner("10.0.0.1").get_data(include=["mac", "hostname"])
+        data = await TimeoutMiner("10.0.0.1").get_data(
+            include=["mac", "hostname"], capture_errors=True
+        )
+        self.assertEqual(data.mac, "AA:BB:CC:DD:EE:FF")
+        self.assertEqual([e.field for e in data.field_errors], ["hostname"])
+        self.assertEqual(data.timed_out, [])
+
+
+class ParseCacheTest(unittest.IsolatedAsyncioTestCase):
+    MM_ID0 = (
+        "Ver[1246-83-21042601_4ec6bb0_61407fa] Elapsed[1134] Temp[38] Fan1[6750] "
+        "GHSmm[87468.08] Led[0] MGHS[28698.17 28723.94 28591.55] MTmax[83 84 84] "
+        "PVT_T0[ 74 0 75] ECHU[] SYSTEMSTATU[Work: In Work, Hash Board: 3 ] MPO[3300]"
+    )
+
+    def test_parse_stats(self):
+        parsed = AvalonMiner.parse_stats(self.MM_ID0)
+        self.assertEqual(parsed["Ver"], ["1246-83-21042601_4ec6bb0_61407fa"])
+        self.assertEqual(parsed["MGHS"], ["28698.17", "28723.94", "28591.55"])
+        self.assertEqual(parsed["PVT_T0"], ["74", "0", "75"])
+        self.assertEqual(parsed["ECHU"], [""])
+        self.assertEqual(
+            parsed["SYSTEMSTATU"], [{"Work": "In Work", "Hash Board": "3"}]
+        )
+        self.assertEqual(parsed["MPO"], ["3300"])
+
+    async def test_parsed_once_per_poll(self):
+        calls = []
+
+        @parse_once
+        def parse(raw):
+            calls.append(raw)
+            return len(raw)
+
+        raw = "a" * 10
+        with parse_cache():
+            self.assertEqual(parse(raw), 10)
+            self.assertEqual(parse(raw), 10)
+            parse("b")
+        self.assertEqual(len(calls), 2)
+        # outside of a poll nothing is cached
+        parse(raw)
+        self.assertEqual(len(calls), 3)
+
+
+class ReplayTest(unittest.IsolatedAsyncioTestCase):
+    async def test_record_and_replay(self):
+        responses = iter([b'{"STATUS": "first"}\x00', b'{"STATUS": "second"}\x00'])
+
+        async def send():
+            return next(responses)
+
+        async def version_send():
+            return b"\xff\x00"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "poll.jsonl.gz")
+            with replay.record(str(path)) as recording:
+                for _ in range(2):
+                    await replay.exchange(
+                        "rpc", "10.0.0.1", 4028, b'{"command": "summary"}', send
+                    )
+                await replay.exchange(
+                    "rpc", "10.0.0.1", 4028, b'{"enc": 1, "data": "a"}', version_send
+                )
+            self.assertEqual(len(recording), 3)
+            self.assertEqual(recording.exchanges[0].label, "summary")
+
+            with replay.replay(str(path)):
+                for expected in ["first", "second", "first"]:
+                    data = await replay.exchange(
+                        "rpc", "10.0.0.1", 4028, b'{"command": "summary"}', None
+                    )
+                    self.assertIn(expected.encode(), data)
+                # encrypted requests differ every time, so they are matched by label
+                data = await replay.exchange(
+                    "rpc", "10.0.0.1", 4028, b'{"enc": 1, "data": "b"}', None
+                )
+                self.assertEqual(data, b"\xff\x00")
+                with self.assertRaises(APIError):
+                    await replay.exchange(
+                        "rpc", "10.0.0.2", 4028, b'{"command": "summary"}', None
+                    )
+
+    async def test_encrypted_commands_by_label(self):
+        responses = {"reboot": b"rebooted", "set_power_pct": b"power set"}
+        with replay.record() as recording:
+            for command, response in responses.items():
+
+                async def send(response=response):
+                    return response
+
+                await replay.exchange(
+                    "rpc",
+                    "10.0.0.1",
+                    4028,
+                    b'{"enc": 1, "data": "' + command.encode() + b'"}',
+                    send,
+                    label=command,
+                )
+        self.assertEqual(
+            [e.label for e in recording.exchanges], ["reboot", "set_power_pct"]
+        )
+        # replayed out of order, each command still gets its own response
+        with replay.replay(recording):
+            for command in ["set_power_pct", "reboot"]:
+                data = await replay.exchange(
+                    "rpc", "10.0.0.1", 4028, b'{"enc": 1, "data": "x"}', None, command
+                )
+                self.assertEqual(data, responses[command])
+
+    async def test_grpc(self):
+        api = BOSerWebAPI("10.0.0.1")
+        request = bytes(ApiVersionRequest())
+        recording = replay.Recording(
+            [
+                replay.Exchange(
+                    "grpc",
+                    "10.0.0.1",
+                    api.port,
+                    "get_api_version",
+                    request,
+                    response=bytes(ApiVersion(major=1, minor=5)),
+                    message="ApiVersion",
+                ),
+                replay.Exchange(
+                    "grpc",
+                    "10.0.0.1",
+                    api.port,
+                    "get_api_version",
+                    request,
+                    response=b"",
+                    message="globals",
+                ),
+            ]
+        )
+        replayer = replay.Replayer(recording)
+        response = await api._replay(replayer, "get_api_version", ApiVersionRequest())
+        self.assertEqual((response.major, response.minor), (1, 5))
+        # only message types from the proto package are rebuilt
+        with self.assertRaises(APIError):
+            await api._replay(replayer, "get_api_version", ApiVersionRequest())
+
+    async def test_web(self):
+        recording = replay.Recording(
+            [
+                replay.Exchange(
+                    "web",
+                    "10.0.0.1",
+                    80,
+                    "GET /cgi-bin/summary.cgi",
+                    b"GET /cgi-bin/summary.cgi\n",
+                    response=b'{"STATUS": {"STATUS": "S"}}',
+                    status=200,
+                    headers=[("content-type", "application/json")],
+                    duration=0.05,
+                )
+            ]
+        )
+        with replay.replay(recording, latency=1):
+            async with httpx.AsyncClient(transport=settings.transport()) as client:
+                start = time.monotonic()
+                response = await client.get("http://10.0.0.1/cgi-bin/summary.cgi")
+                self.assertGreaterEqual(time.monotonic() - start, 0.05)
+                self.assertEqual(response.json(), {"STATUS": {"STATUS": "S"}})
+                with self.assertRaises(httpx.ConnectError):
+                    await client.get("http://10.0.0.1/cgi-bin/stats.cgi")
+
+
+class InstrumentTest(unittest.IsolatedAsyncioTestCase):
+    def test_histogram(self):
+        histogram = instrument.LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.5, delta=0.5 * 0.02)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.99, delta=0.99 * 0.02)
+        self.assertEqual(histogram.percentile(1), 1)
+        self.assertLess(len(histogram.counts), 1000)
+
+    async def test_collect(self):
+        def broken(event):
+            raise ValueError
+
+        instrument.add_hook(broken)
+        try:
+            with instrument.collect() as collector:
+                await SlowMiner("10.0.0.1").get_data(include=["mac", "fw_ver"])
+                instrument.emit(
+                    "rpc", "TestRPCAPI", "summary", "10.0.0.1", 0.01, 20, 100
+                )
+        finally:
+            instrument.remove_hook(broken)
+        self.assertEqual(instrument.hooks, [])
+        stats = collector.stats[("parse", "SlowMiner", "mac")]
+        self.assertEqual(stats.latency.count, 1)
+        rpc = collector.stats[("rpc", "TestRPCAPI", "summary")]
+        self.assertEqual((rpc.sent, rpc.received), (20, 100))
+        self.assertEqual(collector.report()[0]["command"], "summary")
+
+
+class OffloadTest(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        settings.update("parse_offload_threshold", None)
+
+    async def test_threshold(self):
+        def parse(data):
+            return data, threading.current_thread() is threading.main_thread()
+
+        self.assertEqual(await offload.run(parse, b"{}", size=2), (b"{}", True))
+        settings.update("parse_offload_threshold", 100)
+        self.assertEqual(await offload.run(parse, b"{}", size=2), (b"{}", True))
+        self.assertEqual(await offload.run(parse, b"{}", size=100), (b"{}", False))
+
+    async def test_rpc_parse(self):
+        class TestRPCAPI(BaseMinerRPCAPI):
+            async def _send_bytes(self, data, **kwargs):
+                return b'{"STATUS":[{"STATUS":"S","Msg":"Summary"}],"SUMMARY":[{"Elapsed":1}],"id":1}\x00'
+
+        settings.update("parse_offload_threshold", 0)
+        data = await TestRPCAPI("10.0.0.1").send_command("summary")
+        self.assertEqual(data["SUMMARY"], [{"Elapsed": 1}])
+
+    async def test_slicer(self):
+        settings.update("parse_offload_threshold", 0)
+        slicer = offload.Slicer()
+        loop = asyncio.get_running_loop()
+
+        async def step(wait: float, work: float) -> bool:
+            slicer.begin()
+            if wait:
+                await asyncio.sleep(wait)
+            time.sleep(work)
+            ran = []
+            loop.call_soon(ran.append, True)
+            await slicer.checkpoint()
+            return bool(ran)
+
+        # time spent waiting on the network doesn't count as parsing
+        self.assertFalse(await step(0.01, 0))
+        self.assertFalse(await step(0.01, 0))
+        self.assertFalse(await step(0, 0.001))
+        # a run of inline steps longer than the slice yields
+        self.assertTrue(await step(0, offload.SLICE))
+
+    async def test_loop_lag(self):
+        async with instrument.LoopLagMonitor(interval=0.01) as monitor:
+            await asyncio.sleep(0.05)
+            # block the loop
+            time.sleep(0.1)
+            await asyncio.sleep(0.05)
+        self.assertGreater(monitor.histogram.count, 2)
+        self.assertGreaterEqual(monitor.histogram.max, 0.08)
+        self.assertEqual(monitor.report()["max"], monitor.histogram.max)
+
 
 if __name__ == "__main__":
     unittest.main()
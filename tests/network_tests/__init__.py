@@ -14,10 +14,18 @@
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
 
+import asyncio
 import ipaddress
+import socket
 import unittest
 
+import httpx
+
+from pyasic import settings
+from pyasic.errors import APIError
+from pyasic.misc import health, sockets
 from pyasic.network import MinerNetwork
+from pyasic.rpc.bmminer import BMMinerRPCAPI
 
 
 class NetworkTest(unittest.TestCase):
@@ -74,5 +82,126 @@ class NetworkTest(unittest.TestCase):
         )
 
 
+class HealthTest(unittest.IsolatedAsyncioTestCase):
+    ip = "10.255.255.1"
+
+    def tearDown(self):
+        health.reset()
+
+    def open_circuit(self):
+        host = health.get_health(self.ip)
+        for _ in range(settings.get("circuit_breaker_threshold", 3)):
+            host.record(asyncio.TimeoutError())
+        return host
+
+    async def test_open_circuit_fails_fast(self):
+        host = self.open_circuit()
+        self.assertEqual(host.state, health.CircuitState.OPEN)
+        self.assertFalse(health.is_healthy(self.ip))
+
+        with self.assertRaises(APIError):
+            await asyncio.wait_for(BMMinerRPCAPI(self.ip).send_command("summary"), 1)
+        async with httpx.AsyncClient(transport=settings.transport()) as client:
+            with self.assertRaises(httpx.ConnectError):
+                await asyncio.wait_for(client.get(f"http://{self.ip}/"), 1)
+
+    async def test_probe(self):
+        host = self.open_circuit()
+        host.retry_at = 0
+        self.assertEqual(host.state, health.CircuitState.HALF_OPEN)
+        # only a single probe is let through
+        self.assertTrue(host.allow())
+        self.assertFalse(host.allow())
+        host.record_failure("still down")
+        self.assertEqual(host.state, health.CircuitState.OPEN)
+        self.assertGreater(
+            host.retry_in, settings.get("circuit_breaker_backoff", 10) * 1.5
+        )
+
+        host.retry_at = 0
+        self.assertTrue(host.allow())
+        # a refused connection means the host is up
+        host.record(ConnectionRefusedError())
+        self.assertEqual(host.state, health.CircuitState.CLOSED)
+        # recovered hosts are forgotten
+        self.assertEqual(health.unhealthy_hosts(), [])
+        self.assertNotIn(self.ip, health._hosts)
+
+    async def test_tracked_hosts_are_bounded(self):
+        settings.update("circuit_breaker_max_hosts", 100)
+        try:
+            for i in range(1000):
+                health.get_health(f"10.1.{i // 256}.{i % 256}").record(
+                    asyncio.TimeoutError()
+                )
+            self.assertEqual(len(health._hosts), 100)
+            # the hosts which failed last are kept
+            self.assertIn("10.1.3.231", health._hosts)
+            self.assertNotIn("10.1.0.0", health._hosts)
+        finally:
+            settings.update("circuit_breaker_max_hosts", 10000)
+
+    async def test_concurrent_failures_are_shared(self):
+        first = health.get_health(self.ip)
+        second = health.get_health(self.ip)
+        first.record(asyncio.TimeoutError())
+        second.record(asyncio.TimeoutError())
+        self.assertEqual(health.get_health(self.ip).failures, 2)
+
+
+class SocketsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.peers = []
+
+        async def handle(reader, writer):
+            self.peers.append(writer.get_extra_info("peername")[0])
+            try:
+                await reader.read()
+            except ConnectionResetError:
+                pass
+            writer.close()
+
+        self.server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        settings.update("socket_source_address", None)
+        settings.update("socket_probe_reset", False)
+
+    def linger(self, writer) -> int:
+        sock = writer.get_extra_info("socket")
+        return sock.getsockopt(socket.SOL_SOCKET, socket.SO_LINGER)
+
+    async def test_probe_reset(self):
+        _, writer = await sockets.open_connection("127.0.0.1", self.port, probe=True)
+        self.assertEqual(self.linger(writer), 0)
+        writer.close()
+
+        settings.update("socket_probe_reset", True)
+        _, writer = await sockets.open_connection("127.0.0.1", self.port, probe=True)
+        self.assertNotEqual(self.linger(writer), 0)
+        writer.close()
+        # only probes are reset
+        _, writer = await sockets.open_connection("127.0.0.1", self.port)
+        self.assertEqual(self.linger(writer), 0)
+        writer.close()
+
+    async def test_source_address(self):
+        settings.update("socket_source_address", "127.0.0.2")
+        _, writer = await sockets.open_connection("127.0.0.1", self.port)
+        self.assertEqual(writer.get_extra_info("sockname")[0], "127.0.0.2")
+        writer.close()
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.peers, ["127.0.0.2"])
+
+    def test_run(self):
+        async def loop_name():
+            return type(asyncio.get_running_loop()).__module__
+
+        self.assertTrue(sockets.run(loop_name()))
+
+
 if __name__ == "__main__":
     unittest.main()
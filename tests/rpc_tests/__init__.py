@@ -14,6 +14,7 @@
 #  limitations under the License.                                              -
 # ------------------------------------------------------------------------------
 import json
+import logging
 import time
 import unittest
 from unittest.mock import patch
@@ -172,5 +173,51 @@ class TestLuxOSAPI(TestAPIBase):
         self.api_str = "LuxOS"
 
 
+class TestAPILogging(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.api = CGMinerRPCAPI("10.0.0.50")
+        self.response = json.dumps(
+            {
+                "STATUS": [{"STATUS": "S", "When": 1, "Code": 11, "Msg": "Summary"}],
+                "SUMMARY": [{"Elapsed": 1}],
+                "id": 1,
+            }
+        ).encode("utf-8")
+
+    @patch("pyasic.rpc.base.BaseMinerRPCAPI._send_bytes")
+    async def test_debug_disabled_skips_formatting(self, mock_send_bytes):
+        mock_send_bytes.return_value = self.response
+        logger = logging.getLogger("pyasic.rpc.base")
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            with patch.object(
+                CGMinerRPCAPI, "__repr__", return_value="CGMinerRPCAPI"
+            ) as mock_repr:
+                await self.api.send_command("summary")
+            mock_repr.assert_not_called()
+        finally:
+            logger.setLevel(level)
+
+    @patch("pyasic.rpc.base.BaseMinerRPCAPI._send_bytes")
+    async def test_debug_enabled_logs_command(self, mock_send_bytes):
+        mock_send_bytes.return_value = self.response
+        with self.assertLogs("pyasic.rpc.base", logging.DEBUG) as logs:
+            await self.api.send_command("summary", parameters="1")
+        self.assertIn(
+            "CGMinerRPCAPI: 10.0.0.50 - (Send Command) - summary with args 1",
+            logs.output[0],
+        )
+
+    def test_module_loggers_are_unconfigured_pyasic_children(self):
+        import pyasic.logger
+
+        self.assertFalse(pyasic.logger.logger.handlers)
+        logger = logging.getLogger("pyasic.rpc.base")
+        while logger.parent is not None and logger is not pyasic.logger.logger:
+            logger = logger.parent
+        self.assertIs(logger, pyasic.logger.logger)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,109 @@
+# ------------------------------------------------------------------------------
+#  Copyright 2022 Upstream Data Inc                                            -
+#                                                                              -
+#  Licensed under the Apache License, Version 2.0 (the "License");             -
+#  you may not use this file except in compliance with the License.            -
+#  You may obtain a copy of the License at                                     -
+#                                                                              -
+#      http://www.apache.org/licenses/LICENSE-2.0                              -
+#                                                                              -
+#  Unless required by applicable law or agreed to in writing, software         -
+#  distributed under the License is distributed on an "AS IS" BASIS,           -
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    -
+#  See the License for the specific language governing permissions and         -
+#  limitations under the License.                                              -
+# ------------------------------------------------------------------------------
+import random
+import unittest
+
+from pyasic.miners.factory import MinerFactory
+from pyasic.simulator import SIMULATORS, MinerSimulator, SimulatorBehavior
+
+EXPECTED = {
+    "antminer": "BMMinerS19Pro",
+    "whatsminer": "BTMinerM30SPlusV40",
+    "boser": "BOSMinerS19Pro",
+    "vnish": "VNishS19Pro",
+    "epic": "ePICS19Pro",
+    "auradine": "AuradineFluxAT1500",
+    "avalonminer": "CGMinerAvalon1246",
+}
+
+
+class TestMinerSimulator(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        miners = [
+            SIMULATORS[kind](f"127.1.0.{idx + 1}", rng=random.Random(idx))
+            for idx, kind in enumerate(EXPECTED)
+        ]
+        self.farm = MinerSimulator(miners)
+        try:
+            await self.farm.start()
+        except OSError as e:
+            await self.farm.stop()
+            self.skipTest(f"Cannot bind simulator ports: {e}")
+
+    async def asyncTearDown(self):
+        await self.farm.stop()
+
+    async def test_identify_and_poll(self):
+        factory = MinerFactory()
+        for ip, simulated in self.farm.miners.items():
+            kind = next(k for k, v in SIMULATORS.items() if type(simulated) is v)
+            with self.subTest(kind=kind):
+                miner = await factory.get_miner(ip)
+                self.assertEqual(type(miner).__name__, EXPECTED[kind])
+                data = await miner.get_data(capture_errors=True)
+                self.assertEqual(data.field_errors, [])
+                self.assertEqual(data.mac, simulated.state.mac.upper())
+                self.assertTrue(data.is_mining)
+                self.assertGreater(float(data.hashrate), 0)
+                self.assertEqual(
+                    data.config.pools.groups[0].pools[0].url,
+                    "stratum+tcp://pool.example.com:3333",
+                )
+
+    async def test_fault_light(self):
+        ip = self.farm.ips[0]
+        miner = await MinerFactory().get_miner(ip)
+        self.assertTrue(await miner.fault_light_on())
+        self.assertTrue(self.farm.get(ip).state.fault_light)
+        await miner.fault_light_off()
+        self.assertFalse(self.farm.get(ip).state.fault_light)
+
+    async def test_failures(self):
+        simulated = self.farm.get(self.farm.ips[0])
+        miner = await MinerFactory().get_miner(simulated.ip)
+        simulated.behavior = SimulatorBehavior(error_rate=1)
+        data = await miner.get_data(include=["hashrate"], capture_errors=True)
+        self.assertIsNone(data.hashrate)
+
+    async def test_loopback_only(self):
+        # every miner is reachable, without listening on any other interface
+        addresses = {
+            sock.getsockname()[0]
+            for server in self.farm._servers
+            for sock in getattr(server, "sockets", None) or []
+        }
+        self.assertTrue(addresses)
+        self.assertTrue(all(address.startswith("127.") for address in addresses))
+
+
+class TestSimulatorGenerate(unittest.TestCase):
+    def test_mix_is_reproducible(self):
+        mix = {"antminer": 3, "whatsminer": 1}
+        farms = [MinerSimulator.generate(200, mix, seed=1) for _ in range(2)]
+        kinds = [[type(m) for m in f.miners.values()] for f in farms]
+        self.assertEqual(kinds[0], kinds[1])
+        self.assertEqual(set(kinds[0]), {SIMULATORS[k] for k in mix})
+        self.assertEqual(farms[0].ips[0], "127.1.0.1")
+
+    def test_network_too_small(self):
+        with self.assertRaises(ValueError):
+            MinerSimulator.generate(10, network="127.1.0.0/29")
+        with self.assertRaises(ValueError):
+            MinerSimulator.generate(1, miner="unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()